@@ -0,0 +1,58 @@
+"""Hashing throughput of every object hash algorithm.
+
+Hashes object encodings of a few typical sizes, from small trees and
+commits to large blobs, and reports MB/s and objects per second per
+algorithm, so the choice made at `gud init --hash` can be checked on the
+machine at hand.
+
+    python benchmarks/hashing.py [--seconds S]
+"""
+import argparse
+import os
+import sys
+import time
+
+from pathlib import Path
+from typing import List, Tuple
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from model.hashing import HASH_ALGORITHMS, HashAlgorithm
+
+# commit or small tree, source file, large blob
+OBJECT_SIZES: List[int] = [200, 16 * 1024, 8 * 1024 * 1024]
+
+
+def measure(hash_algorithm: HashAlgorithm, data: bytes, seconds: float) -> Tuple[float, float]:
+    count = 0
+    start = time.perf_counter()
+    elapsed = 0.0
+
+    while elapsed < seconds:
+        for _ in range(16):
+            hash_algorithm.hexdigest(data)
+
+        count += 16
+        elapsed = time.perf_counter() - start
+
+    return count * len(data) / elapsed / 1e6, count / elapsed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--seconds', type=float, default=0.5, help='time spent per algorithm and size')
+    args = parser.parse_args()
+
+    print(f'{"algorithm":<10} {"size":>10} {"MB/s":>10} {"objects/s":>12}')
+
+    for size in OBJECT_SIZES:
+        data = b'blob ' + str(size).encode() + b'\x00' + os.urandom(size)
+
+        for name, hash_algorithm in HASH_ALGORITHMS.items():
+            megabytes_per_second, objects_per_second = measure(hash_algorithm, data, args.seconds)
+
+            print(f'{name:<10} {size:>10} {megabytes_per_second:>10.1f} {objects_per_second:>12.0f}')
+
+
+if __name__ == '__main__':
+    main()
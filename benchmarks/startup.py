@@ -0,0 +1,137 @@
+"""Cold-start latency of every gud subcommand.
+
+Runs each subcommand in a scratch repository with ``python -X importtime``
+and reports the median wall time together with the total time spent
+importing modules, so regressions in startup cost show up per command.
+
+    python benchmarks/startup.py [--runs N]
+"""
+import argparse
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+GUD_PATH = Path(__file__).resolve().parent.parent.joinpath('gud.py')
+
+SUBCOMMANDS: Dict[str, List[str]] = {
+    'help': ['--help'],
+    'init': ['init', 'fresh'],
+    'add': ['add', 'file.txt'],
+    'commit': ['commit', 'benchmark commit'],
+    'list-head': ['list-head'],
+    'log': ['log'],
+    'checkout': ['checkout', '0'*40],
+    'status': ['status'],
+    'diff': ['diff', 'HEAD', 'HEAD'],
+    'ls-tree': ['ls-tree', 'HEAD'],
+    'show': ['show', 'HEAD:file.txt'],
+    'fsck': ['fsck'],
+    'cat-file': ['cat-file', '--batch-check'],
+    'repack': ['repack', '--codec', 'zlib'],
+    'bitmap': ['bitmap'],
+    'count-objects': ['count-objects'],
+    'fast-import': ['fast-import'],
+    'sparse-checkout': ['sparse-checkout', 'list'],
+    'fsmonitor': ['fsmonitor', 'status'],
+    'daemon': ['daemon', 'status'],
+}
+
+# stdin of the commands that read it, everything else gets an answer to
+# the checkout prompt
+SUBCOMMAND_INPUTS: Dict[str, bytes] = {
+    'fast-import': b'',
+}
+
+
+def run_gud(args: List[str], cwd: Path, import_time: bool, input: bytes = b'N\n') -> Tuple[float, str]:
+    command = [sys.executable]
+
+    if import_time:
+        command += ['-X', 'importtime']
+
+    command += [str(GUD_PATH)] + args
+
+    start = time.perf_counter()
+    completed = subprocess.run(
+        command,
+        cwd=str(cwd),
+        input=input,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.PIPE,
+    )
+    elapsed = time.perf_counter() - start
+
+    return elapsed, completed.stderr.decode('utf-8', 'replace')
+
+
+def total_import_us(importtime_output: str) -> int:
+    # Top level imports are the ones with a single space after the last '|',
+    # their cumulative column already includes everything they pulled in.
+    total = 0
+
+    for line in importtime_output.splitlines():
+        if not line.startswith('import time:'):
+            continue
+
+        columns = line[len('import time:'):].split('|')
+
+        if len(columns) != 3 or not columns[1].strip().isdigit():
+            continue
+
+        if columns[2].startswith('  '):
+            continue
+
+        total += int(columns[1])
+
+    return total
+
+
+def prepare_repo(path: Path) -> None:
+    run_gud(['init'], path, False)
+    path.joinpath('file.txt').write_text('benchmark\n')
+    run_gud(['add', 'file.txt'], path, False)
+    run_gud(['commit', 'initial'], path, False)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--runs', type=int, default=10)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        repo_path = Path(temp_dir)
+
+        prepare_repo(repo_path)
+
+        print(f'{"command":<16}{"wall ms":>10}{"import ms":>12}')
+
+        for name, gud_args in SUBCOMMANDS.items():
+            gud_input = SUBCOMMAND_INPUTS.get(name, b'N\n')
+            wall_times: List[float] = []
+            import_times: List[int] = []
+
+            for _ in range(args.runs):
+                shutil.rmtree(str(repo_path.joinpath('fresh')), ignore_errors=True)
+
+                wall_time, _ = run_gud(gud_args, repo_path, False, gud_input)
+                wall_times.append(wall_time)
+
+                shutil.rmtree(str(repo_path.joinpath('fresh')), ignore_errors=True)
+
+                _, importtime_output = run_gud(gud_args, repo_path, True, gud_input)
+                import_times.append(total_import_us(importtime_output))
+
+            wall_ms = statistics.median(wall_times) * 1000
+            import_ms = statistics.median(import_times) / 1000
+
+            print(f'{name:<16}{wall_ms:>10.1f}{import_ms:>12.1f}')
+
+
+if __name__ == '__main__':
+    main()
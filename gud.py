@@ -1,13 +1,19 @@
-import argparse
+from __future__ import annotations
 
-from handlers.init.init import handle_init
-from handlers.commit.commit import handle_commit
-from handlers.add.add import handle_add
-from handlers.list_head.list_head import handle_list_head
-from handlers.log.log import handle_log
-from handlers.checkout.checkout import handle_checkout
+import os
+import sys
+
+from typing import TYPE_CHECKING, List, Union
+
+if TYPE_CHECKING:
+    import argparse
+
+# handlers are imported in their dispatch branch, see benchmarks/startup.py
+
+
+def build_parser() -> argparse.ArgumentParser:
+    import argparse
 
-if __name__ == '__main__':
     parser: argparse.ArgumentParser = argparse.ArgumentParser()
     subparsers: argparse._SubParsersAction = parser.add_subparsers(
         dest='command',
@@ -24,6 +30,12 @@ if __name__ == '__main__':
         default='.',
         help='path to the new gud repository',
     )
+    init_subparser.add_argument(
+        '--hash',
+        choices=['sha1', 'sha256', 'blake2b'],
+        default='sha1',
+        help='object hash algorithm, cannot be changed later',
+    )
 
     commit_subparser: argparse.ArgumentParser = subparsers.add_parser(
         'commit', 
@@ -56,6 +68,11 @@ if __name__ == '__main__':
         'log', 
         help='log commits starting from current',
     )
+    log_subparser.add_argument(
+        'paths',
+        nargs='*',
+        help='only commits changing these files or directories, after --',
+    )
 
     checkout_subparser: argparse.ArgumentParser = subparsers.add_parser(
         'checkout', 
@@ -64,37 +81,316 @@ if __name__ == '__main__':
     checkout_subparser.add_argument(
         'commit_id',
         nargs=1,
-        help='id of the commit to be checked out'
+        help='id of the commit to be checked out, may be abbreviated'
+    )
+
+    status_subparser: argparse.ArgumentParser = subparsers.add_parser(
+        'status', 
+        help='show staged, modified and untracked files',
+    )
+
+    fsmonitor_subparser: argparse.ArgumentParser = subparsers.add_parser(
+        'fsmonitor', 
+        help='manage the file system monitor daemon',
+    )
+    fsmonitor_subparser.add_argument(
+        'action',
+        choices=['start', 'stop', 'run', 'status'],
+        help='start/stop the daemon in the background, run it in the foreground or show its status',
+    )
+    fsmonitor_subparser.add_argument(
+        '--poll',
+        action='store_true',
+        help='poll the working tree instead of using inotify',
+    )
+
+    sparse_checkout_subparser: argparse.ArgumentParser = subparsers.add_parser(
+        'sparse-checkout', 
+        help='restrict the working tree to a set of directories',
+    )
+    sparse_checkout_subparser.add_argument(
+        'action',
+        choices=['set', 'list', 'disable'],
+        help='set the cone, list it or check out the whole tree again',
+    )
+    sparse_checkout_subparser.add_argument(
+        'paths',
+        nargs='*',
+        help='directories of the cone',
+    )
+
+    diff_subparser: argparse.ArgumentParser = subparsers.add_parser(
+        'diff', 
+        help='compare two commits',
+    )
+    diff_subparser.add_argument(
+        'old_commit',
+        help='commit to compare from, HEAD or a possibly abbreviated oid',
+    )
+    diff_subparser.add_argument(
+        'new_commit',
+        help='commit to compare to, HEAD or a possibly abbreviated oid',
+    )
+    diff_format_group = diff_subparser.add_mutually_exclusive_group()
+    diff_format_group.add_argument(
+        '--name-only',
+        action='store_true',
+        help='show only the names of changed files',
+    )
+    diff_format_group.add_argument(
+        '--stat',
+        action='store_true',
+        help='show a summary of the changes per file',
+    )
+
+    ls_tree_subparser: argparse.ArgumentParser = subparsers.add_parser(
+        'ls-tree', 
+        help='list the entries of a tree in a commit',
+    )
+    ls_tree_subparser.add_argument(
+        'commit',
+        help='commit to list, HEAD or a possibly abbreviated oid',
     )
+    ls_tree_subparser.add_argument(
+        'path',
+        nargs='?',
+        default='',
+        help='directory or file inside the commit',
+    )
+
+    show_subparser: argparse.ArgumentParser = subparsers.add_parser(
+        'show', 
+        help='print a file from a commit',
+    )
+    show_subparser.add_argument(
+        'object',
+        help='<commit>:<path>, where commit is HEAD or a possibly abbreviated oid',
+    )
+
+    subparsers.add_parser(
+        'fsck', 
+        help='verify every object and the connectivity of the history',
+    )
+
+    cat_file_subparser: argparse.ArgumentParser = subparsers.add_parser(
+        'cat-file', 
+        help='inspect objects named by oids read from stdin',
+    )
+    cat_file_mode_group = cat_file_subparser.add_mutually_exclusive_group(required=True)
+    cat_file_mode_group.add_argument(
+        '--batch-check',
+        action='store_true',
+        help='print "oid type size" for every oid',
+    )
+    cat_file_mode_group.add_argument(
+        '--batch',
+        action='store_true',
+        help='print "oid type size", then the raw content, for every oid',
+    )
+
+    repack_subparser: argparse.ArgumentParser = subparsers.add_parser(
+        'repack', 
+        help='rewrite every object with another compression codec',
+    )
+    repack_subparser.add_argument(
+        '--codec',
+        choices=['auto', 'zlib', 'lzma', 'raw'],
+        default='lzma',
+        help='codec of the rewritten objects, lzma by default for archival',
+    )
+    repack_subparser.add_argument(
+        '--level',
+        type=int,
+        default=-1,
+        help='zlib compression level, 0-9',
+    )
+
+    subparsers.add_parser(
+        'bitmap', 
+        help='write reachability bitmaps for the history of HEAD and main',
+    )
+
+    count_objects_subparser: argparse.ArgumentParser = subparsers.add_parser(
+        'count-objects', 
+        help='count stored, reachable and unreachable objects',
+    )
+    count_objects_subparser.add_argument(
+        'commit',
+        nargs='?',
+        help='only count the objects reachable from this commit',
+    )
+
+    subparsers.add_parser(
+        'fast-import', 
+        help='append commits read from a fast-import stream on stdin',
+    )
+
+    daemon_subparser: argparse.ArgumentParser = subparsers.add_parser(
+        'daemon', 
+        help='manage the daemon that keeps the repository in memory between commands',
+    )
+    daemon_subparser.add_argument(
+        'action',
+        choices=['start', 'stop', 'run', 'status'],
+        help='start/stop the daemon in the background, run it in the foreground or show its status',
+    )
+
+    return parser
+
 
-    args: argparse.Namespace = parser.parse_args()
+def run(argv: List[str]) -> None:
+    args: argparse.Namespace = build_parser().parse_args(argv)
     command: str = args.command
     
     if command == 'init':
-        handle_init(args.path)
+        from handlers.init.init import handle_init
+
+        handle_init(args.path, args.hash)
 
         exit(0)
     elif command == 'commit':
+        from handlers.commit.commit import handle_commit
+
         handle_commit(args.m)
 
         exit(0)
     elif command == 'add':
+        from handlers.add.add import handle_add
+
         handle_add(args.paths)
 
         exit(0)
     elif command == 'list-head':
+        from handlers.list_head.list_head import handle_list_head
+
         handle_list_head()
 
         exit(0)
     elif command == 'log':
-        handle_log()
+        from handlers.log.log import handle_log
+
+        handle_log(args.paths)
 
         exit(0)
     elif command == 'checkout':
+        from handlers.checkout.checkout import handle_checkout
+
         handle_checkout(args.commit_id[0])
 
+        exit(0)
+    elif command == 'status':
+        from handlers.status.status import handle_status
+
+        handle_status()
+
+        exit(0)
+    elif command == 'fsmonitor':
+        from handlers.fsmonitor.fsmonitor import handle_fsmonitor
+
+        handle_fsmonitor(args.action, args.poll)
+
+        exit(0)
+    elif command == 'fast-import':
+        from handlers.fast_import.fast_import import handle_fast_import
+
+        handle_fast_import()
+
+        exit(0)
+    elif command == 'daemon':
+        from handlers.daemon.daemon import handle_daemon
+
+        handle_daemon(args.action, run)
+
+        exit(0)
+    elif command == 'sparse-checkout':
+        from handlers.sparse_checkout.sparse_checkout import handle_sparse_checkout
+
+        handle_sparse_checkout(args.action, args.paths)
+
+        exit(0)
+    elif command == 'diff':
+        from handlers.diff.diff import handle_diff
+
+        handle_diff(args.old_commit, args.new_commit, args.name_only, args.stat)
+
+        exit(0)
+    elif command == 'ls-tree':
+        from handlers.ls_tree.ls_tree import handle_ls_tree
+
+        handle_ls_tree(args.commit, args.path)
+
+        exit(0)
+    elif command == 'show':
+        from handlers.show.show import handle_show
+
+        handle_show(args.object)
+
+        exit(0)
+    elif command == 'fsck':
+        from handlers.fsck.fsck import handle_fsck
+
+        is_ok = handle_fsck()
+
+        exit(0 if is_ok else 1)
+    elif command == 'cat-file':
+        from handlers.cat_file.cat_file import handle_cat_file
+
+        handle_cat_file(args.batch)
+
+        exit(0)
+    elif command == 'repack':
+        from handlers.repack.repack import handle_repack
+
+        handle_repack(args.codec, args.level)
+
+        exit(0)
+    elif command == 'bitmap':
+        from handlers.bitmap.bitmap import handle_bitmap
+
+        handle_bitmap()
+
+        exit(0)
+    elif command == 'count-objects':
+        from handlers.count_objects.count_objects import handle_count_objects
+
+        handle_count_objects(args.commit)
+
         exit(0)
     else:
         print('fatal: Unsupported command')
 
-        exit(1)
\ No newline at end of file
+        exit(1)
+
+
+def find_daemon_socket(current_path: str) -> Union[str, None]:
+    # the repository is found like Repo.get_current_repo finds it, the
+    # daemon module is only imported when its socket is there
+    prev_path = None
+
+    while current_path != prev_path:
+        storage_path = os.path.join(current_path, '.gitgud')
+
+        if os.path.isdir(storage_path):
+            socket_path = os.path.join(storage_path, 'daemon', 'socket')
+
+            return socket_path if os.path.exists(socket_path) else None
+
+        prev_path = current_path
+        current_path = os.path.dirname(current_path)
+
+    return None
+
+
+if __name__ == '__main__':
+    socket_path = find_daemon_socket(os.getcwd())
+
+    if socket_path is not None:
+        from model.daemon import run_in_daemon
+
+        # forwarded to the daemon of the repository when one is running
+        exit_code = run_in_daemon(socket_path, sys.argv[1:])
+
+        if exit_code is not None:
+            sys.exit(exit_code)
+
+    run(sys.argv[1:])
@@ -0,0 +1,16 @@
+from pathlib import Path
+
+from model.bitmap import ReachabilityBitmaps
+from model.repo import Repo
+
+def handle_bitmap() -> None:
+    try:
+        current_path = Path.cwd()
+        current_repo: Repo = Repo.get_current_repo(current_path)
+        bitmaps = ReachabilityBitmaps.read_bitmaps(current_repo.storage_path)
+        tip_oids = [current_repo.read_main(), current_repo.read_head()]
+        bitmap_count = bitmaps.write(current_repo, [oid for oid in tip_oids if oid])
+
+        print(f'Wrote {bitmap_count} bitmaps over {bitmaps.object_count} objects')
+    except Exception as exception:
+        print(f'Fatal: {str(exception)}')
@@ -0,0 +1,67 @@
+import os
+import select
+import sys
+
+from pathlib import Path
+from typing import Iterator, Tuple
+
+from model.repo import Repo
+
+BATCH_READ_SIZE = 1 << 16
+
+def is_input_pending(input_fd: int) -> bool:
+    readable, _, _ = select.select([input_fd], [], [], 0)
+
+    return bool(readable)
+
+def read_batch_lines(input_fd: int) -> Iterator[Tuple[str, bool]]:
+    """Yields every input line together with whether more input is
+    already waiting, so output is flushed only when the reader would
+    otherwise block.
+    """
+    pending = b''
+
+    while True:
+        chunk = os.read(input_fd, BATCH_READ_SIZE)
+
+        if not chunk:
+            break
+
+        lines = (pending + chunk).split(b'\n')
+        pending = lines.pop()
+
+        for i, line in enumerate(lines):
+            has_more = i < len(lines) - 1 or pending != b'' or is_input_pending(input_fd)
+
+            yield line.strip().decode('utf-8', 'replace'), has_more
+
+    if pending.strip():
+        yield pending.strip().decode('utf-8', 'replace'), False
+
+def handle_cat_file(batch: bool) -> None:
+    try:
+        current_path = Path.cwd()
+        current_repo: Repo = Repo.get_current_repo(current_path)
+        output = sys.stdout.buffer
+
+        for oid, has_more in read_batch_lines(sys.stdin.fileno()):
+            try:
+                if batch:
+                    object_type, data = current_repo.read_object(oid)
+
+                    output.write(f'{oid} {object_type} {len(data)}\n'.encode('utf-8'))
+                    output.write(data)
+                    output.write(b'\n')
+                else:
+                    object_type, size = current_repo.read_object_info(oid)
+
+                    output.write(f'{oid} {object_type} {size}\n'.encode('utf-8'))
+            except Exception:
+                output.write(f'{oid} missing\n'.encode('utf-8'))
+
+            if not has_more:
+                output.flush()
+
+        output.flush()
+    except Exception as exception:
+        print(f'Fatal: {str(exception)}')
@@ -54,6 +54,7 @@ def handle_commit(commit_message: str = 'Default commit message') -> None:
         )
 
         current_repo.write_object(commit)
+        current_repo.write_changed_paths(commit)
 
         current_main = current_repo.read_main()
 
@@ -61,6 +62,7 @@ def handle_commit(commit_message: str = 'Default commit message') -> None:
             current_repo.update_main(commit.get_oid())
 
         current_repo.update_head(commit.get_oid())
+        current_repo.seed_stat_cache(commit)
         current_index.clear()
 
         print(f'Created new commit with oid {commit.get_oid()}')
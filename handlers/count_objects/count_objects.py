@@ -0,0 +1,34 @@
+from pathlib import Path
+from typing import Set, Union
+
+from model.bitmap import ReachabilityBitmaps, count_bits
+from model.repo import Repo
+
+def handle_count_objects(revision: Union[str, None]) -> None:
+    try:
+        current_path = Path.cwd()
+        current_repo: Repo = Repo.get_current_repo(current_path)
+        bitmaps = ReachabilityBitmaps.read_bitmaps(current_repo.storage_path)
+
+        if revision is not None:
+            bitmap, extra_oids = bitmaps.get_reachable(current_repo, current_repo.resolve_commit(revision).get_oid())
+
+            print(f'{count_bits(bitmap) + len(extra_oids)} objects reachable from {revision}')
+
+            return
+
+        reachable_bitmap = 0
+        reachable_extra_oids: Set[str] = set()
+
+        for root_oid in set([current_repo.read_head(), current_repo.read_main()]):
+            if root_oid:
+                bitmap, extra_oids = bitmaps.get_reachable(current_repo, root_oid)
+                reachable_bitmap |= bitmap
+                reachable_extra_oids |= extra_oids
+
+        object_count = sum(1 for _ in current_repo.list_object_oids())
+        reachable_count = count_bits(reachable_bitmap) + len(reachable_extra_oids)
+
+        print(f'{object_count} objects, {reachable_count} reachable, {object_count - reachable_count} unreachable')
+    except Exception as exception:
+        print(f'Fatal: {str(exception)}')
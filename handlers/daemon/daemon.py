@@ -0,0 +1,28 @@
+from pathlib import Path
+from typing import Callable, List
+
+from model.background import manage_background_process
+from model.daemon import DAEMON_DIR, GudDaemon
+from model.repo import Repo
+from model.repo_cache import RepoCache
+
+def handle_daemon(action: str, run_command: Callable[[List[str]], None]) -> None:
+    try:
+        current_path = Path.cwd()
+        current_repo: Repo = Repo.get_current_repo(current_path)
+
+        if action == 'run':
+            # every command run by the daemon opens its repository through
+            # the cache
+            Repo.repo_cache = RepoCache()
+            GudDaemon(current_repo.storage_path, run_command).run()
+        else:
+            manage_background_process(
+                'daemon',
+                action,
+                current_repo.storage_path.joinpath(DAEMON_DIR, 'pid'),
+                current_repo.repo_path,
+                ['daemon', 'run'],
+            )
+    except Exception as exception:
+        print(f'Fatal: {str(exception)}')
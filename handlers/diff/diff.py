@@ -0,0 +1,81 @@
+import sys
+
+from pathlib import Path
+
+from model.line_diff import count_changes, unified_diff
+from model.repo import Repo
+from model.tree_diff import TreeChange, diff_trees
+
+STAT_GRAPH_WIDTH = 50
+
+def blob_data(repo: Repo, blob_oid: str) -> bytes:
+    if not blob_oid:
+        return b''
+
+    blob = repo.read_blob(blob_oid)
+
+    return b'' if blob is None else blob.data
+
+def stat_graph(insertions: int, deletions: int) -> str:
+    total = insertions + deletions
+
+    if total > STAT_GRAPH_WIDTH:
+        insertions = insertions * STAT_GRAPH_WIDTH // total
+        deletions = STAT_GRAPH_WIDTH - insertions
+
+    return '+' * insertions + '-' * deletions
+
+def write_patch(repo: Repo, change: TreeChange) -> None:
+    output = sys.stdout.buffer
+    old_label = f'a/{change.path}' if change.old_entry is not None else '/dev/null'
+    new_label = f'b/{change.path}' if change.new_entry is not None else '/dev/null'
+
+    output.write(f'diff --git a/{change.path} b/{change.path}\n'.encode('utf-8'))
+
+    for chunk in unified_diff(
+        blob_data(repo, change.old_oid),
+        blob_data(repo, change.new_oid),
+        old_label,
+        new_label,
+    ):
+        output.write(chunk)
+
+def handle_diff(
+    old_revision: str,
+    new_revision: str,
+    name_only: bool,
+    stat: bool,
+) -> None:
+    try:
+        current_path = Path.cwd()
+        current_repo: Repo = Repo.get_current_repo(current_path)
+        old_commit = current_repo.resolve_commit(old_revision)
+        new_commit = current_repo.resolve_commit(new_revision)
+        changes_count = 0
+        total_insertions = 0
+        total_deletions = 0
+
+        for change in diff_trees(current_repo, old_commit.tree_oid, new_commit.tree_oid):
+            changes_count += 1
+
+            if name_only:
+                print(change.path)
+            elif stat:
+                insertions, deletions = count_changes(
+                    blob_data(current_repo, change.old_oid),
+                    blob_data(current_repo, change.new_oid),
+                )
+                total_insertions += insertions
+                total_deletions += deletions
+
+                print(f' {change.path} | {insertions + deletions} {stat_graph(insertions, deletions)}')
+            else:
+                sys.stdout.flush()
+                write_patch(current_repo, change)
+
+        if stat:
+            print(f' {changes_count} files changed, {total_insertions} insertions(+), {total_deletions} deletions(-)')
+
+        sys.stdout.flush()
+    except Exception as exception:
+        print(f'Fatal: {str(exception)}')
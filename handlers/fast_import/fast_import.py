@@ -0,0 +1,43 @@
+import sys
+import time
+
+from pathlib import Path
+
+from model.daemon import invalidate_daemon_repos
+from model.fast_import import FastImport, read_import_commits
+from model.repo import Repo
+
+PROGRESS_INTERVAL = 10000
+
+def handle_fast_import() -> None:
+    try:
+        current_path = Path.cwd()
+        current_repo: Repo = Repo.get_current_repo(current_path)
+        fast_import = FastImport(current_repo)
+        start_time = time.perf_counter()
+
+        try:
+            for import_commit in read_import_commits(sys.stdin.buffer):
+                fast_import.import_commit(import_commit)
+
+                if fast_import.commit_count % PROGRESS_INTERVAL == 0:
+                    elapsed = time.perf_counter() - start_time
+                    print(f'Imported {fast_import.commit_count} commits, {fast_import.commit_count / elapsed:.0f} commits/s')
+        finally:
+            # commits imported before an error stay reachable
+            fast_import.finish()
+            # the import ran outside of the daemon
+            invalidate_daemon_repos(current_repo.storage_path)
+
+        elapsed = time.perf_counter() - start_time
+        commit_rate = fast_import.commit_count / elapsed if elapsed > 0 else 0
+
+        print(
+            f'Imported {fast_import.commit_count} commits and {fast_import.object_count} objects '
+            f'in {elapsed:.2f}s, {commit_rate:.0f} commits/s'
+        )
+
+        if fast_import.commit_count > 0:
+            print(f'HEAD is now at {fast_import.parent_oid}, run gud checkout HEAD to update the working tree')
+    except Exception as exception:
+        print(f'Fatal: {str(exception)}')
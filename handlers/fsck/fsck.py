@@ -0,0 +1,19 @@
+from pathlib import Path
+
+from model.fsck import Fsck
+from model.repo import Repo
+
+def handle_fsck() -> bool:
+    try:
+        current_path = Path.cwd()
+        current_repo: Repo = Repo.get_current_repo(current_path)
+        root_oids = [current_repo.read_head(), current_repo.read_main()]
+        report = Fsck(current_repo).run(root_oids)
+
+        print(report, end='')
+
+        return report.is_ok()
+    except Exception as exception:
+        print(f'Fatal: {str(exception)}')
+
+        return False
@@ -0,0 +1,23 @@
+from pathlib import Path
+
+from model.background import manage_background_process
+from model.fsmonitor import FsMonitorClient, FsMonitorDaemon
+from model.repo import Repo
+
+def handle_fsmonitor(action: str, use_polling: bool) -> None:
+    try:
+        current_path = Path.cwd()
+        current_repo: Repo = Repo.get_current_repo(current_path)
+
+        if action == 'run':
+            FsMonitorDaemon(current_repo.repo_path, current_repo.ignore, use_polling).run()
+        else:
+            manage_background_process(
+                'fsmonitor',
+                action,
+                FsMonitorClient(current_repo.storage_path).pid_path,
+                current_repo.repo_path,
+                ['fsmonitor', 'run'] + (['--poll'] if use_polling else []),
+            )
+    except Exception as exception:
+        print(f'Fatal: {str(exception)}')
@@ -3,5 +3,5 @@ from pathlib import Path
 
 from model.repo import Repo
 
-def handle_init(repo_path: str) -> None:
-    Repo.init_repo(Path(repo_path))
+def handle_init(repo_path: str, hash_algorithm: str) -> None:
+    Repo.init_repo(Path(repo_path), hash_algorithm)
@@ -1,7 +1,8 @@
+import sys
+
 from pathlib import Path
 
 from model.repo import Repo
-from model.objects import TreeNode
 
 def handle_list_head() -> None:
     try:
@@ -14,18 +15,19 @@ def handle_list_head() -> None:
             current_tree_node = current_commit.tree_oid
             current_commit_oid = current_commit.get_oid()
 
-            current_tree = current_repo.read_tree(
-                current_tree_node,
-                [],
-                Path(''),
-                True,
-            )
+            print(f'Current commit {current_commit_oid}', flush=True)
 
-            if current_tree == None:
-                current_tree = TreeNode({})
+            # written to the buffer under stdout instead of one print per
+            # file, the daemon's stdout has no file descriptor
+            output = sys.stdout.buffer
 
-            print(f'Current commit {current_commit_oid}')
+            # trees outside of the sparse-checkout cone are never read
+            for path, _, oid in current_repo.iter_tree(
+                current_tree_node,
+                current_repo.get_path_filter(),
+            ):
+                output.write(f'{path} {oid}\n'.encode('utf-8'))
 
-            current_tree.print_tree(Path(''))
+            output.flush()
     except Exception as exception:
         print(f'Fatal: {str(exception)}')
@@ -1,18 +1,15 @@
 from pathlib import Path
+from typing import List
 
 from model.repo import Repo
 from model.objects import Commit, TreeNode, TreeNodeEntry
 
-def handle_log() -> None:
+def handle_log(paths: List[str]) -> None:
     try:
         current_path = Path.cwd()
         current_repo: Repo = Repo.get_current_repo(current_path)
-        current_head = current_repo.read_head()
-        current_commit = current_repo.read_commit(current_head)
 
-        while current_commit != None:
+        for current_commit in current_repo.log_commits(paths):
             print(f'{current_commit}')
-
-            current_commit = current_repo.read_commit(current_commit.parent)
     except Exception as exception:
         print(f'Fatal: {str(exception)}')
@@ -0,0 +1,34 @@
+from pathlib import Path
+
+from model.repo import Repo
+from model.objects import TreeNodeEntry
+from model.tree_diff import read_tree_entries
+
+def format_entry(entry: TreeNodeEntry, path: str) -> str:
+    return f'{entry.mode.zfill(6)} {entry.type} {entry.oid}\t{path}'
+
+def handle_ls_tree(revision: str, path: str) -> None:
+    try:
+        current_path = Path.cwd()
+        current_repo: Repo = Repo.get_current_repo(current_path)
+        current_commit = current_repo.resolve_commit(revision)
+        tree_path = path.strip('/')
+        tree_oid = current_commit.tree_oid
+
+        if tree_path:
+            entry = current_repo.resolve_path(tree_oid, tree_path)
+
+            if entry is None:
+                raise Exception(f'fatal: Path {path} does not exist in {revision}')
+
+            if entry.type != 'tree':
+                print(format_entry(entry, tree_path))
+
+                return
+
+            tree_oid = entry.oid
+
+        for name, entry in sorted(read_tree_entries(current_repo, tree_oid).items()):
+            print(format_entry(entry, f'{tree_path}/{name}' if tree_path else name))
+    except Exception as exception:
+        print(f'Fatal: {str(exception)}')
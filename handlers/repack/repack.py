@@ -0,0 +1,14 @@
+from pathlib import Path
+
+from model.compression import Compressor
+from model.repo import Repo
+
+def handle_repack(codec: str, level: int) -> None:
+    try:
+        current_path = Path.cwd()
+        current_repo: Repo = Repo.get_current_repo(current_path)
+        repacked_count, old_size, new_size = current_repo.repack(Compressor(codec, level))
+
+        print(f'Repacked {repacked_count} objects with {codec}, {old_size} -> {new_size} bytes')
+    except Exception as exception:
+        print(f'Fatal: {str(exception)}')
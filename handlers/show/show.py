@@ -0,0 +1,48 @@
+import shutil
+import sys
+
+from pathlib import Path
+
+from model.lfs import COPY_BLOCK_SIZE, LfsPointer
+from model.repo import Repo
+from model.tree_diff import read_tree_entries
+
+def handle_show(object_name: str) -> None:
+    try:
+        current_path = Path.cwd()
+        current_repo: Repo = Repo.get_current_repo(current_path)
+
+        if ':' not in object_name:
+            raise Exception('fatal: Expected <commit>:<path>')
+
+        revision, path = object_name.split(':', 1)
+        current_commit = current_repo.resolve_commit(revision)
+        entry = current_repo.resolve_path(current_commit.tree_oid, path)
+
+        if entry is None:
+            raise Exception(f'fatal: Path {path} does not exist in {revision}')
+
+        if entry.type == 'tree':
+            for name, child in sorted(read_tree_entries(current_repo, entry.oid).items()):
+                print(f'{name}/' if child.type == 'tree' else name)
+
+            return
+
+        # chunked blobs are written as they are read, never held whole
+        blob_data = current_repo.read_blob_data(entry.oid)
+        first_data = next(blob_data, b'')
+        lfs_pointer = LfsPointer.parse(first_data)
+        lfs_file = None if lfs_pointer is None else current_repo.lfs_store.open_file(lfs_pointer)
+
+        if lfs_file is not None:
+            with lfs_file:
+                shutil.copyfileobj(lfs_file, sys.stdout.buffer, COPY_BLOCK_SIZE)
+        else:
+            sys.stdout.buffer.write(first_data)
+
+            for data in blob_data:
+                sys.stdout.buffer.write(data)
+
+        sys.stdout.buffer.flush()
+    except Exception as exception:
+        print(f'Fatal: {str(exception)}')
@@ -0,0 +1,30 @@
+from pathlib import Path
+from typing import List
+
+from model.repo import Repo
+
+def handle_sparse_checkout(action: str, paths: List[str]) -> None:
+    try:
+        current_path = Path.cwd()
+        current_repo: Repo = Repo.get_current_repo(current_path)
+
+        if action == 'list':
+            for prefix in current_repo.sparse_checkout.prefixes:
+                print(prefix)
+        elif action == 'set':
+            prefixes: List[str] = []
+
+            for path in paths:
+                full_path = current_path.joinpath(path).resolve()
+
+                if full_path != current_repo.repo_path and \
+                   current_repo.repo_path not in full_path.parents:
+                    raise Exception(f'fatal: Arg {path} is not a part of repo')
+
+                prefixes.append(str(full_path.relative_to(current_repo.repo_path)))
+
+            current_repo.set_sparse_checkout(prefixes)
+        elif action == 'disable':
+            current_repo.set_sparse_checkout([])
+    except Exception as exception:
+        print(f'Fatal: {str(exception)}')
@@ -0,0 +1,13 @@
+from pathlib import Path
+
+from model.repo import Repo
+
+def handle_status() -> None:
+    try:
+        current_path = Path.cwd()
+        current_repo: Repo = Repo.get_current_repo(current_path)
+        status = current_repo.status()
+
+        print(str(status), end='')
+    except Exception as exception:
+        print(f'Fatal: {str(exception)}')
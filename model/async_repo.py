@@ -0,0 +1,120 @@
+from __future__ import annotations
+
+import asyncio
+import os
+
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, AsyncIterator, Callable, Dict, Iterator, List, Tuple, Union
+
+from model.objects import Blob, Commit, TreeNode, TreeNodeEntry
+from model.repo import Repo
+from model.tree_diff import PathFilter
+
+
+class AsyncRepo:
+    """Object reads of a Repo for asyncio code.
+
+    Reads and decompression run on a bounded thread pool instead of the
+    event loop. Concurrent requests for the same object share one read.
+    """
+
+    def __init__(self, repo: Repo, max_workers: int = 0):
+        self.repo = repo
+        self.executor = ThreadPoolExecutor(
+            max_workers=max_workers if max_workers > 0 else min(8, os.cpu_count() or 1) * 2,
+        )
+        self.in_flight: Dict[Tuple[str, str], asyncio.Task[Any]] = {}
+
+    async def __aenter__(self) -> AsyncRepo:
+        return self
+
+    async def __aexit__(self, *args: Any) -> None:
+        self.close()
+
+    def close(self) -> None:
+        self.executor.shutdown(wait=False)
+
+    async def run_once(self, kind: str, oid: str, read: Callable[[str], Any]) -> Any:
+        key = (kind, oid)
+        task = self.in_flight.get(key)
+
+        if task is None:
+            loop = asyncio.get_running_loop()
+            task = asyncio.ensure_future(loop.run_in_executor(self.executor, read, oid))
+            self.in_flight[key] = task
+            task.add_done_callback(lambda _: self.in_flight.pop(key, None))
+
+        # a cancelled caller must not cancel the read for the others
+        return await asyncio.shield(task)
+
+    async def read_blob(self, oid: str) -> Union[Blob, None]:
+        return await self.run_once('blob', oid, self.repo.read_blob)
+
+    async def read_commit(self, oid: str) -> Union[Commit, None]:
+        return await self.run_once('commit', oid, self.repo.read_commit)
+
+    async def read_object(self, oid: str) -> Tuple[str, bytes]:
+        return await self.run_once('object', oid, self.repo.read_object)
+
+    async def read_tree(self, oid: str) -> Union[TreeNode, None]:
+        """One level of a tree, subtree entries have no content."""
+        tree_node = await self.run_once(
+            'tree',
+            oid,
+            lambda tree_oid: self.repo.read_tree(tree_oid, [], Path(''), False),
+        )
+
+        # every caller gets its own node, the shared one is never handed out
+        return None if tree_node is None else TreeNode(dict(tree_node.entries))
+
+    async def iter_tree(
+        self,
+        tree_oid: str,
+        should_include: Union[PathFilter, None] = None,
+        current_path: str = '',
+    ) -> AsyncIterator[Tuple[str, str, str]]:
+        """Yields (path, mode, oid) of every blob depth first, like
+        Repo.iter_tree. The subtrees of a level are requested as soon as
+        the level is read, so they load while its blobs are yielded.
+        """
+        def read_level(oid: str) -> asyncio.Task[Union[TreeNode, None]]:
+            return asyncio.ensure_future(self.read_tree(oid))
+
+        async def open_level(dir_path: str, task: asyncio.Task[Union[TreeNode, None]]) -> Iterator[Tuple[str, TreeNodeEntry, Any]]:
+            tree_node = await task
+            entries = sorted(tree_node.entries.items()) if tree_node is not None else []
+            level: List[Tuple[str, TreeNodeEntry, Any]] = []
+
+            for entry_key, entry in entries:
+                entry_path = f'{dir_path}/{entry_key}' if dir_path else entry_key
+                is_tree = entry.type == 'tree'
+
+                if should_include is not None and not should_include(entry_path, is_tree):
+                    continue
+
+                level.append((entry_path, entry, read_level(entry.oid) if is_tree else None))
+
+            return iter(level)
+
+        stack: List[Iterator[Tuple[str, TreeNodeEntry, Any]]] = [
+            await open_level(current_path, read_level(tree_oid)),
+        ]
+
+        try:
+            while stack:
+                for entry_path, entry, subtree_task in stack[-1]:
+                    if subtree_task is not None:
+                        stack.append(await open_level(entry_path, subtree_task))
+
+                        break
+
+                    yield entry_path, entry.mode, entry.oid
+                else:
+                    stack.pop()
+        finally:
+            # the caller stopped early, drop the reads nobody will wait for
+            for level in stack:
+                for _, _, subtree_task in level:
+                    if subtree_task is not None:
+                        subtree_task.cancel()
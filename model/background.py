@@ -0,0 +1,80 @@
+from __future__ import annotations
+
+import os
+import time
+
+from pathlib import Path
+from typing import List, Union
+
+# how long start and stop wait for the pid file to appear or go away
+PID_WAIT_TIMEOUT = 5
+
+
+def read_pid(pid_path: Path) -> Union[int, None]:
+    try:
+        pid = int(pid_path.read_text())
+        os.kill(pid, 0)
+    except (OSError, ValueError):
+        return None
+
+    return pid
+
+
+def wait_for_pid(pid_path: Path, should_run: bool) -> None:
+    deadline = time.monotonic() + PID_WAIT_TIMEOUT
+
+    while (read_pid(pid_path) is not None) != should_run and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+
+def manage_background_process(
+    name: str,
+    action: str,
+    pid_path: Path,
+    repo_path: Path,
+    run_args: List[str],
+) -> None:
+    """start, stop or status of a process that runs `gud.py <run_args>` in
+    the background and keeps its pid in pid_path while it runs.
+    """
+    pid = read_pid(pid_path)
+
+    if action == 'start':
+        if pid is not None:
+            print(f'{name} is already running with pid {pid}')
+
+            return
+
+        import subprocess
+        import sys
+
+        gud_path = Path(__file__).resolve().parents[1].joinpath('gud.py')
+
+        subprocess.Popen(
+            [sys.executable, str(gud_path)] + run_args,
+            cwd=str(repo_path),
+            stdin=subprocess.DEVNULL,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+            start_new_session=True,
+        )
+
+        wait_for_pid(pid_path, True)
+        print(f'{name} started with pid {read_pid(pid_path)}')
+    elif action == 'stop':
+        if pid is None:
+            print(f'{name} is not running')
+
+            return
+
+        import signal
+
+        os.kill(pid, signal.SIGTERM)
+
+        wait_for_pid(pid_path, False)
+        print(f'{name} with pid {pid} stopped')
+    elif action == 'status':
+        if pid is None:
+            print(f'{name} is not running')
+        else:
+            print(f'{name} is running with pid {pid}')
@@ -0,0 +1,243 @@
+from __future__ import annotations
+
+import struct
+import zlib
+
+from pathlib import Path
+from typing import TYPE_CHECKING, Callable, Dict, Iterator, List, Set, Tuple, Union
+
+from model.hashing import get_hash_algorithm
+from model.tree_diff import read_tree_entries
+
+if TYPE_CHECKING:
+    from model.repo import Repo
+
+# one bitmap every this many commits of the history, a commit without
+# one is at most this many commits away from an indexed ancestor
+BITMAP_INTERVAL = 100
+
+BITMAPS_MAGIC = b'GBMP'
+BITMAPS_VERSION = 1
+# magic, version, digest size, number of objects, number of bitmaps
+HEADER_FORMAT = struct.Struct('>4sIIII')
+BITMAP_LENGTH_FORMAT = struct.Struct('>I')
+
+
+def walk_objects(repo: Repo, commit_oids: List[str], is_known: Callable[[str], bool]) -> Iterator[str]:
+    # known objects are not descended into, what they reach is known too
+    seen: Set[str] = set()
+    pending: List[Tuple[str, str]] = [(commit_oid, 'commit') for commit_oid in commit_oids if commit_oid]
+
+    while pending:
+        oid, object_type = pending.pop()
+
+        if oid in seen or is_known(oid):
+            continue
+
+        seen.add(oid)
+
+        yield oid
+
+        if object_type == 'commit':
+            commit = repo.read_commit(oid)
+
+            if commit is not None:
+                pending.append((commit.tree_oid, 'tree'))
+
+                if commit.parent:
+                    pending.append((commit.parent, 'commit'))
+        elif object_type == 'tree':
+            pending.extend((entry.oid, entry.type) for entry in read_tree_entries(repo, oid).values())
+        else:
+            pending.extend((chunk_oid, 'blob') for chunk_oid in repo.read_blob_chunk_oids(oid))
+
+
+def count_bits(bitmap: int) -> int:
+    return bin(bitmap).count('1')
+
+
+# bits index a sorted oid table, bitmaps are python ints stored zlib compressed
+class ReachabilityBitmaps:
+    @staticmethod
+    def read_bitmaps(storage_path: Path) -> ReachabilityBitmaps:
+        bitmaps_path = storage_path.joinpath('bitmaps')
+        digest_size = get_hash_algorithm().digest_size
+
+        try:
+            content = bitmaps_path.read_bytes()
+        except FileNotFoundError:
+            return ReachabilityBitmaps(bitmaps_path, b'', {})
+        except:
+            raise Exception('fatal: Cant read bitmaps file')
+
+        if len(content) < HEADER_FORMAT.size:
+            raise Exception('fatal: Invalid bitmaps file')
+
+        magic, version, file_digest_size, object_count, bitmap_count = HEADER_FORMAT.unpack_from(content)
+
+        if (magic, version, file_digest_size) != (BITMAPS_MAGIC, BITMAPS_VERSION, digest_size):
+            raise Exception('fatal: Invalid bitmaps file')
+
+        ptr = HEADER_FORMAT.size
+        object_table = content[ptr:ptr + object_count * digest_size]
+        ptr += object_count * digest_size
+        bitmaps: Dict[str, bytes] = {}
+
+        for _ in range(bitmap_count):
+            commit_oid = content[ptr:ptr + digest_size].hex()
+            (bitmap_length,) = BITMAP_LENGTH_FORMAT.unpack_from(content, ptr + digest_size)
+            ptr += digest_size + BITMAP_LENGTH_FORMAT.size
+            bitmaps[commit_oid] = content[ptr:ptr + bitmap_length]
+            ptr += bitmap_length
+
+        if ptr != len(content):
+            raise Exception('fatal: Invalid bitmaps file')
+
+        return ReachabilityBitmaps(bitmaps_path, object_table, bitmaps)
+
+    def __init__(self, bitmaps_path: Path, object_table: bytes, bitmaps: Dict[str, bytes]):
+        self.bitmaps_path = bitmaps_path
+        self.object_table = object_table
+        # compressed, only the bitmaps that are used get inflated
+        self.bitmaps = bitmaps
+
+    @property
+    def object_count(self) -> int:
+        return len(self.object_table) // get_hash_algorithm().digest_size
+
+    def get_oid(self, position: int) -> str:
+        digest_size = get_hash_algorithm().digest_size
+
+        return self.object_table[position * digest_size:(position + 1) * digest_size].hex()
+
+    def get_position(self, oid: str) -> Union[int, None]:
+        digest_size = get_hash_algorithm().digest_size
+        object_table = self.object_table
+        raw_oid = bytes.fromhex(oid)
+        low = 0
+        high = self.object_count
+
+        while low < high:
+            middle = (low + high) // 2
+
+            if object_table[middle * digest_size:(middle + 1) * digest_size] < raw_oid:
+                low = middle + 1
+            else:
+                high = middle
+
+        if object_table[low * digest_size:(low + 1) * digest_size] == raw_oid:
+            return low
+
+        return None
+
+    def get_bitmap(self, commit_oid: str) -> Union[int, None]:
+        if commit_oid not in self.bitmaps:
+            return None
+
+        return int.from_bytes(zlib.decompress(self.bitmaps[commit_oid]), 'little')
+
+    def get_reachable(self, repo: Repo, commit_oid: str) -> Tuple[int, Set[str]]:
+        # objects stored after the table was written are returned as oids
+        new_commit_oids: List[str] = []
+        current_oid = commit_oid
+        base_bitmap: Union[int, None] = None
+
+        while current_oid:
+            base_bitmap = self.get_bitmap(current_oid)
+
+            if base_bitmap is not None:
+                break
+
+            commit = repo.read_commit(current_oid)
+
+            if commit is None:
+                break
+
+            new_commit_oids.append(current_oid)
+            current_oid = commit.parent
+
+        # set bit by bit in a bytearray, every change to an int copies it
+        bits = bytearray((base_bitmap or 0).to_bytes((self.object_count + 7) // 8, 'little'))
+        extra_oids: Set[str] = set()
+
+        def is_known(oid: str) -> bool:
+            position = self.get_position(oid)
+
+            return position is not None and bool(bits[position >> 3] >> (position & 7) & 1)
+
+        for oid in walk_objects(repo, new_commit_oids, is_known):
+            position = self.get_position(oid)
+
+            if position is None:
+                extra_oids.add(oid)
+            else:
+                bits[position >> 3] |= 1 << (position & 7)
+
+        return int.from_bytes(bits, 'little'), extra_oids
+
+    def write(self, repo: Repo, tip_oids: List[str]) -> int:
+        # bitmaps for the tips and every BITMAP_INTERVAL commits of their history
+        digest_size = get_hash_algorithm().digest_size
+        object_oids = sorted(repo.list_object_oids())
+        positions = dict((oid, position) for position, oid in enumerate(object_oids))
+        selected_bits: Dict[str, bytes] = {}
+
+        for tip_oid in tip_oids:
+            chain: List[str] = []
+            current_oid = tip_oid
+
+            while current_oid and current_oid not in selected_bits:
+                commit = repo.read_commit(current_oid)
+
+                if commit is None:
+                    break
+
+                chain.append(current_oid)
+                current_oid = commit.parent
+
+            bits = bytearray(selected_bits.get(current_oid, bytes((len(object_oids) + 7) // 8)))
+
+            def is_known(oid: str) -> bool:
+                position = positions.get(oid)
+
+                return position is not None and bool(bits[position >> 3] >> (position & 7) & 1)
+
+            # oldest first, each commit only adds what its parent lacks
+            for index, chain_oid in enumerate(reversed(chain)):
+                for oid in walk_objects(repo, [chain_oid], is_known):
+                    position = positions.get(oid)
+
+                    if position is not None:
+                        bits[position >> 3] |= 1 << (position & 7)
+
+                if chain_oid == tip_oid or (index + 1) % BITMAP_INTERVAL == 0:
+                    selected_bits[chain_oid] = bytes(bits)
+
+        self.object_table = b''.join(bytes.fromhex(oid) for oid in object_oids)
+        self.bitmaps = dict(
+            (commit_oid, zlib.compress(commit_bits))
+            for commit_oid, commit_bits in selected_bits.items()
+        )
+
+        temp_bitmaps_path = self.bitmaps_path.parent.joinpath('temp_bitmaps')
+
+        try:
+            with open(str(temp_bitmaps_path), 'wb') as file:
+                file.write(HEADER_FORMAT.pack(
+                    BITMAPS_MAGIC,
+                    BITMAPS_VERSION,
+                    digest_size,
+                    len(object_oids),
+                    len(self.bitmaps),
+                ))
+                file.write(self.object_table)
+
+                for commit_oid, compressed_bitmap in self.bitmaps.items():
+                    file.write(bytes.fromhex(commit_oid) + BITMAP_LENGTH_FORMAT.pack(len(compressed_bitmap)))
+                    file.write(compressed_bitmap)
+
+            temp_bitmaps_path.replace(self.bitmaps_path)
+        except OSError:
+            raise Exception('fatal: Cant write bitmaps file')
+
+        return len(self.bitmaps)
@@ -0,0 +1,133 @@
+from __future__ import annotations
+
+import hashlib
+import struct
+
+from pathlib import Path
+from typing import Dict, Iterable, List, Set
+
+from model.hashing import get_hash_algorithm
+
+# same parameters as git's changed-path filters, about 1% false positives
+BITS_PER_PATH = 10
+HASH_COUNT = 7
+
+# commits changing more paths get a filter that matches everything, they
+# are rare and always diffed
+MAX_CHANGED_PATHS = 512
+
+CHANGED_PATHS_MAGIC = b'GCPF'
+CHANGED_PATHS_VERSION = 1
+HEADER_FORMAT = struct.Struct('>4sII')
+FILTER_LENGTH_FORMAT = struct.Struct('>H')
+
+
+def get_paths_with_parents(paths: Iterable[str]) -> Set[str]:
+    """Every path and every directory above it, so a filter answers for
+    directories as well as files.
+    """
+    paths_with_parents: Set[str] = set()
+
+    for path in paths:
+        while path and path not in paths_with_parents:
+            paths_with_parents.add(path)
+            path = path.rpartition('/')[0]
+
+    return paths_with_parents
+
+
+# paths changed by a commit, might_contain has no false negatives
+class BloomFilter:
+    @staticmethod
+    def from_paths(paths: Iterable[str]) -> BloomFilter:
+        all_paths = get_paths_with_parents(paths)
+
+        if len(all_paths) > MAX_CHANGED_PATHS:
+            return BloomFilter(b'\xff')
+
+        bloom_filter = BloomFilter(bytes(max(1, (len(all_paths) * BITS_PER_PATH + 7) // 8)))
+
+        for path in all_paths:
+            bloom_filter.add(path)
+
+        return bloom_filter
+
+    @staticmethod
+    def get_bit_positions(path: str, bit_count: int) -> List[int]:
+        # double hashing, every position comes from one digest
+        digest = hashlib.blake2b(path.encode('utf-8'), digest_size=8).digest()
+        first_hash = int.from_bytes(digest[:4], 'big')
+        second_hash = int.from_bytes(digest[4:], 'big')
+
+        return [(first_hash + index * second_hash) % bit_count for index in range(HASH_COUNT)]
+
+    def __init__(self, data: bytes):
+        self.data = bytearray(data)
+
+    def add(self, path: str) -> None:
+        for position in self.get_bit_positions(path, len(self.data) * 8):
+            self.data[position >> 3] |= 1 << (position & 7)
+
+    def might_contain(self, path: str) -> bool:
+        data = self.data
+
+        for position in self.get_bit_positions(path, len(data) * 8):
+            if not data[position >> 3] & (1 << (position & 7)):
+                return False
+
+        return True
+
+
+# a header then one record per commit: raw oid, filter length, filter
+class ChangedPathsFile:
+    def __init__(self, storage_path: Path):
+        self.file_path = storage_path.joinpath('changed-paths')
+
+    def append(self, commit_oid: str, bloom_filter: BloomFilter) -> None:
+        digest_size = get_hash_algorithm().digest_size
+
+        try:
+            with open(str(self.file_path), 'ab') as file:
+                if file.tell() == 0:
+                    file.write(HEADER_FORMAT.pack(CHANGED_PATHS_MAGIC, CHANGED_PATHS_VERSION, digest_size))
+
+                file.write(
+                    bytes.fromhex(commit_oid)
+                    + FILTER_LENGTH_FORMAT.pack(len(bloom_filter.data))
+                    + bytes(bloom_filter.data)
+                )
+        except OSError:
+            raise Exception('fatal: Cant write changed-paths file')
+
+    def read_filters(self) -> Dict[str, BloomFilter]:
+        """Filters by commit oid, commits without one have to be diffed."""
+        digest_size = get_hash_algorithm().digest_size
+        filters: Dict[str, BloomFilter] = {}
+
+        try:
+            content = self.file_path.read_bytes()
+        except FileNotFoundError:
+            return filters
+
+        if len(content) < HEADER_FORMAT.size \
+           or HEADER_FORMAT.unpack_from(content) != (CHANGED_PATHS_MAGIC, CHANGED_PATHS_VERSION, digest_size):
+            # the filters are only an optimisation, without them every
+            # commit is diffed
+            return filters
+
+        ptr = HEADER_FORMAT.size
+        record_header_size = digest_size + FILTER_LENGTH_FORMAT.size
+
+        # a record cut short by an interrupted append is ignored
+        while ptr + record_header_size <= len(content):
+            commit_oid = content[ptr:ptr + digest_size].hex()
+            (filter_length,) = FILTER_LENGTH_FORMAT.unpack_from(content, ptr + digest_size)
+            ptr += record_header_size
+
+            if ptr + filter_length > len(content):
+                break
+
+            filters[commit_oid] = BloomFilter(content[ptr:ptr + filter_length])
+            ptr += filter_length
+
+        return filters
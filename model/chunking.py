@@ -0,0 +1,76 @@
+from __future__ import annotations
+
+import hashlib
+
+from typing import Iterator, List
+
+# FastCDC sizes, chunks are cut between the minimum and maximum size and
+# average around the middle one
+MIN_CHUNK_SIZE = 16 * 1024
+AVERAGE_CHUNK_SIZE = 64 * 1024
+MAX_CHUNK_SIZE = 256 * 1024
+
+# normalized chunking: a stricter mask before the average size and a
+# looser one after it keep chunk sizes close to the average
+MASK_SMALL = (1 << 18) - 1
+MASK_LARGE = (1 << 14) - 1
+
+# only the low bits of the hash are ever tested, keeping it below 2**30
+# keeps it a single digit int and the loop fast
+HASH_MASK = (1 << 30) - 1
+
+
+def make_gear_table() -> List[int]:
+    # derived from sha1 so boundaries are the same for every process and
+    # every version of python
+    return [
+        int.from_bytes(hashlib.sha1(bytes([value])).digest()[:4], 'big') & HASH_MASK
+        for value in range(256)
+    ]
+
+
+GEAR = make_gear_table()
+
+
+def find_boundary(data: bytes, start: int) -> int:
+    """End of the chunk starting at start, following FastCDC with a gear
+    rolling hash. The first MIN_CHUNK_SIZE bytes are never looked at.
+    """
+    remaining = len(data) - start
+
+    if remaining <= MIN_CHUNK_SIZE:
+        return len(data)
+
+    end = start + min(remaining, MAX_CHUNK_SIZE)
+    normal_end = start + min(remaining, AVERAGE_CHUNK_SIZE)
+    gear = GEAR
+    rolling_hash = 0
+    scan_start = start + MIN_CHUNK_SIZE
+
+    for offset, value in enumerate(data[scan_start:normal_end]):
+        rolling_hash = ((rolling_hash << 1) + gear[value]) & HASH_MASK
+
+        if not rolling_hash & MASK_SMALL:
+            return scan_start + offset + 1
+
+    for offset, value in enumerate(data[normal_end:end]):
+        rolling_hash = ((rolling_hash << 1) + gear[value]) & HASH_MASK
+
+        if not rolling_hash & MASK_LARGE:
+            return normal_end + offset + 1
+
+    return end
+
+
+def split_chunks(data: bytes) -> Iterator[bytes]:
+    """Content defined chunks of data, an insertion or deletion only
+    changes the chunks around it.
+    """
+    start = 0
+
+    while start < len(data):
+        end = find_boundary(data, start)
+
+        yield data[start:end]
+
+        start = end
@@ -0,0 +1,146 @@
+from __future__ import annotations
+
+import zlib
+
+from typing import BinaryIO, List
+
+CODEC_AUTO = 'auto'
+CODEC_ZLIB = 'zlib'
+CODEC_LZMA = 'lzma'
+CODEC_RAW = 'raw'
+CODECS: List[str] = [CODEC_AUTO, CODEC_ZLIB, CODEC_LZMA, CODEC_RAW]
+
+# zlib streams start with a CMF byte whose low nibble is 8, so neither of
+# these prefixes can be mistaken for one and plain zlib files stay as is
+RAW_MAGIC = b'\x00'
+LZMA_MAGIC = b'\xfd7zXZ\x00'
+
+# only the first block is compressed to decide whether the rest is worth it
+TRIAL_BLOCK_SIZE = 1 << 16
+TRIAL_MIN_SIZE = 1024
+TRIAL_MAX_RATIO = 0.9
+
+HEADER_READ_SIZE = 64
+
+
+def is_incompressible(data: bytes) -> bool:
+    """Guesses from a fast trial compression of the first block, already
+    compressed formats (JPEG, zip, parquet) barely shrink.
+    """
+    if len(data) < TRIAL_MIN_SIZE:
+        return False
+
+    block = data[:TRIAL_BLOCK_SIZE]
+
+    return len(zlib.compress(block, 1)) > len(block) * TRIAL_MAX_RATIO
+
+
+def detect_codec(prefix: bytes) -> str:
+    if prefix.startswith(RAW_MAGIC):
+        return CODEC_RAW
+
+    if prefix.startswith(LZMA_MAGIC):
+        return CODEC_LZMA
+
+    return CODEC_ZLIB
+
+
+class Compressor:
+    """Compresses object files with the codec chosen for the repository.
+
+    'auto' is zlib, except for content that a trial compression shows to
+    be incompressible, which is stored raw.
+    """
+
+    def __init__(self, codec: str = CODEC_AUTO, level: int = zlib.Z_DEFAULT_COMPRESSION):
+        if codec not in CODECS:
+            raise Exception(f'fatal: Unknown compression codec {codec}')
+
+        self.codec = codec
+        self.level = level
+
+    def compress(self, encoded_data: bytes) -> bytes:
+        codec = self.codec
+
+        if codec == CODEC_AUTO:
+            codec = CODEC_RAW if is_incompressible(encoded_data) else CODEC_ZLIB
+
+        if codec == CODEC_RAW:
+            return RAW_MAGIC + encoded_data
+
+        if codec == CODEC_LZMA:
+            # lzma is slow to import and only repositories that chose it
+            # need it
+            import lzma
+
+            return lzma.compress(encoded_data, format=lzma.FORMAT_XZ)
+
+        return zlib.compress(encoded_data, self.level)
+
+
+def decompress_object(data: bytes) -> bytes:
+    codec = detect_codec(data[:len(LZMA_MAGIC)])
+
+    if codec == CODEC_RAW:
+        return data[len(RAW_MAGIC):]
+
+    if codec == CODEC_LZMA:
+        import lzma
+
+        try:
+            return lzma.decompress(data, format=lzma.FORMAT_XZ)
+        except lzma.LZMAError as exception:
+            raise Exception(f'fatal: Cannot decompress object, {exception}')
+
+    try:
+        return zlib.decompress(data)
+    except zlib.error as exception:
+        raise Exception(f'fatal: Cannot decompress object, {exception}')
+
+
+def read_lzma_header(data: bytes, file: BinaryIO, max_length: int) -> bytes:
+    import lzma
+
+    lzma_decompressor = lzma.LZMADecompressor(format=lzma.FORMAT_XZ)
+    header = b''
+
+    try:
+        while b'\x00' not in header and len(header) < max_length and not lzma_decompressor.eof:
+            if lzma_decompressor.needs_input:
+                if not data:
+                    break
+
+                header += lzma_decompressor.decompress(data, max_length - len(header))
+                data = file.read(HEADER_READ_SIZE)
+            else:
+                header += lzma_decompressor.decompress(b'', max_length - len(header))
+    except lzma.LZMAError as exception:
+        raise Exception(f'fatal: Cannot decompress object, {exception}')
+
+    return header
+
+
+def read_object_header(file: BinaryIO, max_length: int) -> bytes:
+    """Decompresses at most max_length bytes from the start of an object
+    file, reading the compressed data in small steps.
+    """
+    data = file.read(HEADER_READ_SIZE)
+    codec = detect_codec(data[:len(LZMA_MAGIC)])
+
+    if codec == CODEC_RAW:
+        return data[len(RAW_MAGIC):len(RAW_MAGIC) + max_length]
+
+    if codec == CODEC_LZMA:
+        return read_lzma_header(data, file, max_length)
+
+    header = b''
+    zlib_decompressor = zlib.decompressobj()
+
+    try:
+        while b'\x00' not in header and len(header) < max_length and data:
+            header += zlib_decompressor.decompress(data, max_length - len(header))
+            data = zlib_decompressor.unconsumed_tail or file.read(HEADER_READ_SIZE)
+    except zlib.error as exception:
+        raise Exception(f'fatal: Cannot decompress object, {exception}')
+
+    return header
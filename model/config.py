@@ -0,0 +1,51 @@
+from __future__ import annotations
+
+from pathlib import Path
+from typing import Dict
+
+
+class Config:
+    """Settings from .gitgud/config, one `key = value` per line, lines
+    starting with '#' are comments.
+    """
+
+    @staticmethod
+    def read_config(storage_path: Path) -> Config:
+        config_path = storage_path.joinpath('config')
+
+        try:
+            lines = config_path.read_text('utf-8').splitlines()
+        except FileNotFoundError:
+            lines = []
+        except:
+            raise Exception('fatal: Cant read config file')
+
+        values: Dict[str, str] = {}
+
+        for line in lines:
+            line = line.strip()
+
+            if line == '' or line.startswith('#') or '=' not in line:
+                continue
+
+            key, value = line.split('=', 1)
+            values[key.strip()] = value.strip()
+
+        return Config(values)
+
+    def __init__(self, values: Dict[str, str]):
+        self.values = values
+
+    def get(self, key: str, default: str) -> str:
+        return self.values.get(key, default)
+
+    def get_int(self, key: str, default: int) -> int:
+        value = self.values.get(key)
+
+        if value is None:
+            return default
+
+        try:
+            return int(value)
+        except ValueError:
+            raise Exception(f'fatal: Invalid integer for {key} in config')
@@ -0,0 +1,265 @@
+from __future__ import annotations
+
+import io
+import os
+import socket
+import struct
+import sys
+import time
+
+from typing import TYPE_CHECKING, Callable, List, Tuple, Union
+
+# only light modules are imported here, the client runs before the
+# command whenever a daemon socket exists
+if TYPE_CHECKING:
+    from pathlib import Path
+
+DAEMON_DIR = 'daemon'
+SOCKET_NAME = 'socket'
+# rewritten by local commands that change the repository, see RepoCache
+GENERATION_NAME = 'generation'
+
+# commands that manage daemons, create repositories or stream stdin always
+# run in the calling process
+LOCAL_COMMANDS: List[str] = ['init', 'daemon', 'fsmonitor', 'cat-file', 'fast-import']
+
+# frame type, length of the payload that follows
+FRAME_HEADER = struct.Struct('>cI')
+EXIT_CODE = struct.Struct('>i')
+
+FRAME_REQUEST = b'R'
+FRAME_STDOUT = b'O'
+FRAME_STDERR = b'E'
+FRAME_INPUT = b'I'
+FRAME_EXIT = b'X'
+
+OUTPUT_BUFFER_SIZE = 64 * 1024
+
+
+def send_frame(connection: socket.socket, frame_type: bytes, payload: bytes = b'') -> None:
+    connection.sendall(FRAME_HEADER.pack(frame_type, len(payload)) + payload)
+
+
+def receive_exactly(connection: socket.socket, size: int) -> bytes:
+    data = b''
+
+    while len(data) < size:
+        chunk = connection.recv(size - len(data))
+
+        if not chunk:
+            raise ConnectionError('daemon connection closed')
+
+        data += chunk
+
+    return data
+
+
+def receive_frame(connection: socket.socket) -> Tuple[bytes, bytes]:
+    frame_type, length = FRAME_HEADER.unpack(receive_exactly(connection, FRAME_HEADER.size))
+
+    return frame_type, receive_exactly(connection, length)
+
+
+def encode_request(cwd: str, argv: List[str]) -> bytes:
+    return b'\x00'.join(os.fsencode(part) for part in [cwd] + argv)
+
+
+def decode_request(payload: bytes) -> Tuple[str, List[str]]:
+    parts = [os.fsdecode(part) for part in payload.split(b'\x00')]
+
+    return parts[0], parts[1:]
+
+
+def invalidate_daemon_repos(storage_path: Path) -> None:
+    daemon_path = storage_path.joinpath(DAEMON_DIR)
+
+    if daemon_path.is_dir():
+        daemon_path.joinpath(GENERATION_NAME).write_text(f'{time.time_ns()}\n')
+
+
+def run_in_daemon(socket_path: str, argv: List[str]) -> Union[int, None]:
+    # None when the command has to run in this process
+    if not argv or argv[0] in LOCAL_COMMANDS or argv[0].startswith('-'):
+        return None
+
+    cwd = os.getcwd()
+    connection = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+
+    try:
+        connection.connect(socket_path)
+    except OSError:
+        # left behind by a daemon that was killed
+        connection.close()
+
+        return None
+
+    with connection:
+        send_frame(connection, FRAME_REQUEST, encode_request(cwd, argv))
+
+        try:
+            while True:
+                frame_type, payload = receive_frame(connection)
+
+                if frame_type == FRAME_STDOUT:
+                    sys.stdout.buffer.write(payload)
+                    sys.stdout.buffer.flush()
+                elif frame_type == FRAME_STDERR:
+                    sys.stderr.buffer.write(payload)
+                    sys.stderr.buffer.flush()
+                elif frame_type == FRAME_INPUT:
+                    send_frame(connection, FRAME_INPUT, sys.stdin.buffer.readline())
+                elif frame_type == FRAME_EXIT:
+                    return EXIT_CODE.unpack(payload)[0]
+        except (ConnectionError, struct.error):
+            print('fatal: gud daemon stopped while running the command', file=sys.stderr)
+
+            return 1
+
+
+# output stream of a command, sent to the client as frames
+class FrameWriter(io.RawIOBase):
+    def __init__(self, connection: socket.socket, frame_type: bytes):
+        self.connection = connection
+        self.frame_type = frame_type
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        send_frame(self.connection, self.frame_type, bytes(data))
+
+        return len(data)
+
+
+# output is flushed before every read, so prompts show up first
+class FrameReader(io.RawIOBase):
+    def __init__(self, connection: socket.socket, output_streams: List[io.TextIOWrapper]):
+        self.connection = connection
+        self.output_streams = output_streams
+        self.pending = b''
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        if not self.pending:
+            for output_stream in self.output_streams:
+                output_stream.flush()
+
+            send_frame(self.connection, FRAME_INPUT)
+            frame_type, self.pending = receive_frame(self.connection)
+
+            if frame_type != FRAME_INPUT:
+                raise ConnectionError('unexpected frame from the client')
+
+        # an empty line from the client is the end of its stdin
+        size = min(len(buffer), len(self.pending))
+        buffer[:size] = self.pending[:size]
+        self.pending = self.pending[size:]
+
+        return size
+
+
+# runs commands one at a time with the working directory and streams of
+# the client
+class GudDaemon:
+    def __init__(self, storage_path: Path, run_command: Callable[[List[str]], None]):
+        self.daemon_path = storage_path.joinpath(DAEMON_DIR)
+        self.socket_path = self.daemon_path.joinpath(SOCKET_NAME)
+        self.pid_path = self.daemon_path.joinpath('pid')
+        self.run_command = run_command
+        self.should_stop = False
+
+    def stop(self, *_) -> None:
+        self.should_stop = True
+
+    def serve(self, connection: socket.socket) -> None:
+        frame_type, payload = receive_frame(connection)
+
+        if frame_type != FRAME_REQUEST:
+            return
+
+        cwd, argv = decode_request(payload)
+        stdout = io.TextIOWrapper(
+            io.BufferedWriter(FrameWriter(connection, FRAME_STDOUT), OUTPUT_BUFFER_SIZE),
+            encoding='utf-8',
+            errors='surrogateescape',
+        )
+        stderr = io.TextIOWrapper(
+            io.BufferedWriter(FrameWriter(connection, FRAME_STDERR), OUTPUT_BUFFER_SIZE),
+            encoding='utf-8',
+            errors='backslashreplace',
+        )
+        stdin = io.TextIOWrapper(io.BufferedReader(FrameReader(connection, [stdout, stderr])), encoding='utf-8')
+        saved_streams = sys.stdin, sys.stdout, sys.stderr
+        saved_cwd = os.getcwd()
+        exit_code = 0
+
+        try:
+            os.chdir(cwd)
+            sys.stdin, sys.stdout, sys.stderr = stdin, stdout, stderr
+
+            try:
+                self.run_command(argv)
+            except SystemExit as exit:
+                if isinstance(exit.code, int):
+                    exit_code = exit.code
+                elif exit.code is not None:
+                    print(exit.code, file=sys.stderr)
+                    exit_code = 1
+            except Exception:
+                import traceback
+
+                traceback.print_exc()
+                exit_code = 1
+
+            stdout.flush()
+            stderr.flush()
+        finally:
+            sys.stdin, sys.stdout, sys.stderr = saved_streams
+            os.chdir(saved_cwd)
+
+        send_frame(connection, FRAME_EXIT, EXIT_CODE.pack(exit_code))
+
+    def run(self) -> None:
+        import signal
+
+        self.daemon_path.mkdir(parents=True, exist_ok=True)
+        signal.signal(signal.SIGTERM, self.stop)
+        signal.signal(signal.SIGINT, self.stop)
+
+        try:
+            self.socket_path.unlink()
+        except FileNotFoundError:
+            pass
+
+        server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        server.bind(str(self.socket_path))
+        server.listen()
+        # wakes up regularly to notice a stop request
+        server.settimeout(0.5)
+        self.pid_path.write_text(str(os.getpid()))
+
+        try:
+            while not self.should_stop:
+                try:
+                    connection, _ = server.accept()
+                except socket.timeout:
+                    continue
+
+                with connection:
+                    connection.settimeout(None)
+
+                    try:
+                        self.serve(connection)
+                    except OSError:
+                        # the client went away, the next one is unaffected
+                        continue
+        finally:
+            server.close()
+
+            for path in [self.socket_path, self.pid_path]:
+                try:
+                    path.unlink()
+                except FileNotFoundError:
+                    pass
@@ -0,0 +1,341 @@
+from __future__ import annotations
+
+import re
+
+from datetime import datetime
+from pathlib import Path
+from typing import TYPE_CHECKING, BinaryIO, Dict, Iterator, List, Set, Tuple, Union
+
+from model.bloom import BloomFilter
+from model.objects import Blob, Commit, Object, TreeNode, TreeNodeEntry, parse_utc_offset
+from model.tree_diff import read_tree_entries
+
+if TYPE_CHECKING:
+    from model.repo import Repo
+
+AUTHOR_PATTERN = re.compile(r'^(?:author|committer) (.*) <(.*)> (\d+)(?: ([+-]\d{4}))?$')
+
+# objects are written in batches of this many objects or bytes, whichever
+# fills up first
+OBJECT_BATCH_COUNT = 4096
+OBJECT_BATCH_SIZE = 64 * 1024 * 1024
+
+FILE_MODES = {
+    '100644': False,
+    '644': False,
+    '100755': True,
+    '755': True,
+}
+
+# (path parts, is executable, data) for a modification, (path parts, None,
+# None) for a deletion
+FileChange = Tuple[Tuple[str, ...], Union[bool, None], Union[bytes, None]]
+
+
+class ImportCommit:
+    def __init__(
+        self,
+        name: str,
+        email: str,
+        timestamp: int,
+        message: str,
+        changes: List[FileChange],
+        offset: str = '+0000',
+    ):
+        self.name = name
+        self.email = email
+        self.timestamp = timestamp
+        self.offset = offset
+        self.message = message
+        self.changes = changes
+
+
+def split_import_path(path: str) -> Tuple[str, ...]:
+    parts = tuple(path.split('/'))
+
+    if any(part in ['', '.', '..', '.gitgud'] for part in parts):
+        raise Exception(f'fatal: Invalid path {path} in fast-import stream')
+
+    return parts
+
+
+def read_data(stream: BinaryIO, length: int) -> bytes:
+    data = stream.read(length)
+
+    if len(data) != length:
+        raise Exception('fatal: Unexpected end of fast-import stream')
+
+    # the line feed after the data is optional, when present it is read
+    # as an empty line
+    return data
+
+
+def read_import_commits(stream: BinaryIO) -> Iterator[ImportCommit]:
+    """Parses a fast-import stream:
+
+        commit
+        author <name> <<email>> <unix time> [<offset>]
+        data <length>
+        <message>
+        M <mode> <path> <length>
+        <content>
+        D <path>
+
+    Commits follow each other, a line with done ends the stream early.
+    """
+    current: Union[ImportCommit, None] = None
+
+    while True:
+        raw_line = stream.readline()
+
+        if not raw_line:
+            break
+
+        line = raw_line.rstrip(b'\n').decode('utf-8')
+
+        if line == '':
+            continue
+
+        if line == 'done':
+            break
+
+        if line == 'commit' or line.startswith('commit '):
+            if current is not None:
+                yield current
+
+            current = ImportCommit('', '', -1, '', [])
+
+            continue
+
+        if current is None:
+            raise Exception(f'fatal: Expected commit in fast-import stream, got {line}')
+
+        if line.startswith('author ') or line.startswith('committer '):
+            match = AUTHOR_PATTERN.match(line)
+
+            if match is None:
+                raise Exception(f'fatal: Invalid author line {line}')
+
+            # gud stores a single author, the committer only fills in for a
+            # missing one
+            if line.startswith('author ') or current.timestamp < 0:
+                current.name, current.email = match.group(1), match.group(2)
+                current.timestamp = int(match.group(3))
+                current.offset = match.group(4) or '+0000'
+        elif line.startswith('data '):
+            current.message = read_data(stream, int(line[len('data '):])).decode('utf-8').rstrip('\n')
+        elif line.startswith('M '):
+            try:
+                mode, rest = line[len('M '):].split(' ', 1)
+                path, length = rest.rsplit(' ', 1)
+                data_length = int(length)
+            except ValueError:
+                raise Exception(f'fatal: Invalid file modification {line}')
+
+            if mode not in FILE_MODES:
+                raise Exception(f'fatal: Unsupported file mode {mode}')
+
+            current.changes.append((split_import_path(path), FILE_MODES[mode], read_data(stream, data_length)))
+        elif line.startswith('D '):
+            current.changes.append((split_import_path(line[len('D '):]), None, None))
+        else:
+            raise Exception(f'fatal: Unsupported fast-import command {line}')
+
+    if current is not None:
+        yield current
+
+
+class FastImport:
+    """Appends commits to the history of HEAD.
+
+    The tree of the last commit stays in memory between commits. A change
+    only invalidates the trees on its path, so a commit hashes and writes
+    those trees once and every other subtree keeps its oid. Refs are
+    updated once, when the import ends.
+    """
+
+    def __init__(self, repo: Repo):
+        self.repo = repo
+        self.head_oid = repo.read_head()
+        self.parent_oid = self.head_oid
+        parent_commit = repo.read_commit(self.parent_oid)
+        self.root = TreeNode({})
+
+        if parent_commit is not None:
+            self.root = TreeNode(read_tree_entries(repo, parent_commit.tree_oid))
+
+        # objects written by this import, repeated content is written once
+        self.written_oids: Set[str] = set()
+        # encoded, trees in memory keep changing after they are written
+        self.pending_objects: Dict[str, Tuple[bytes, str]] = {}
+        self.pending_size = 0
+        # blobs of the current commit, only those still in its tree at the
+        # end of the commit are written
+        self.new_blobs: Dict[str, Blob] = {}
+        self.commit_count = 0
+
+    @property
+    def object_count(self) -> int:
+        return len(self.written_oids)
+
+    def write_object(self, oid: str, object: Object) -> None:
+        if oid in self.written_oids:
+            return
+
+        self.written_oids.add(oid)
+
+        if isinstance(object, Blob) and self.repo.is_chunk_size(len(object.data)):
+            # split into chunks and a manifest by the repository
+            self.repo.write_object(object)
+
+            return
+
+        encoded_data = object.encode()
+        self.pending_objects[oid] = (encoded_data, object.type)
+        self.pending_size += len(encoded_data)
+
+        if len(self.pending_objects) >= OBJECT_BATCH_COUNT or self.pending_size >= OBJECT_BATCH_SIZE:
+            self.flush_objects()
+
+    def flush_objects(self) -> None:
+        self.repo.write_encoded_objects(self.pending_objects)
+        self.pending_objects = {}
+        self.pending_size = 0
+
+    def get_subtree(self, tree: TreeNode, name: str, should_create: bool) -> Union[TreeNode, None]:
+        entry = tree.entries.get(name)
+
+        if entry is None or entry.type != 'tree':
+            if not should_create:
+                return None
+
+            entry = TreeNodeEntry(Path(name), '', 'tree', False, None)
+            entry.content = TreeNode({})
+            tree.entries[name] = entry
+        elif entry.content is None:
+            # read from the store the first time a change reaches it
+            entry.content = TreeNode(read_tree_entries(self.repo, entry.oid))
+
+        assert isinstance(entry.content, TreeNode)
+
+        return entry.content
+
+    def get_file_paths(self, entry: TreeNodeEntry, path: str) -> Iterator[str]:
+        if entry.type != 'tree':
+            yield path
+
+            return
+
+        entries = entry.content.entries if isinstance(entry.content, TreeNode) \
+            else read_tree_entries(self.repo, entry.oid)
+
+        for name, child_entry in entries.items():
+            yield from self.get_file_paths(child_entry, f'{path}/{name}')
+
+    def apply_change(self, change: FileChange, changed_paths: List[str]) -> None:
+        path_parts, is_executable, data = change
+        path = '/'.join(path_parts)
+        trees: List[TreeNode] = [self.root]
+
+        for i, part in enumerate(path_parts[:-1]):
+            old_entry = trees[-1].entries.get(part)
+
+            # a file replaced by a directory
+            if data is not None and old_entry is not None and old_entry.type != 'tree':
+                changed_paths.append('/'.join(path_parts[:i + 1]))
+
+            subtree = self.get_subtree(trees[-1], part, data is not None)
+
+            if subtree is None:
+                return
+
+            trees.append(subtree)
+
+        name = path_parts[-1]
+        parent_tree = trees[-1]
+        old_entry = parent_tree.entries.get(name)
+
+        if data is None:
+            if old_entry is None:
+                return
+
+            del parent_tree.entries[name]
+            changed_paths.extend(self.get_file_paths(old_entry, path))
+
+            # directories left empty are dropped, like git does
+            for i in range(len(trees) - 1, 0, -1):
+                if trees[i].entries:
+                    break
+
+                del trees[i - 1].entries[path_parts[i - 1]]
+        else:
+            if self.repo.is_lfs_size(len(data)):
+                data = self.repo.lfs_store.store_data(data).encode()
+
+            blob = Blob(data)
+            blob_oid = blob.get_oid()
+            entry = TreeNodeEntry(Path(name), blob_oid, 'blob', bool(is_executable), None)
+
+            if entry == old_entry:
+                return
+
+            self.new_blobs[blob_oid] = blob
+            parent_tree.entries[name] = entry
+            changed_paths.append(path)
+
+            if old_entry is not None and old_entry.type == 'tree':
+                changed_paths.extend(self.get_file_paths(old_entry, path))
+
+        for tree in trees:
+            tree.cached_encoded_data = None
+
+    def write_tree(self, tree: TreeNode) -> str:
+        for entry in tree.entries.values():
+            if isinstance(entry.content, TreeNode) and entry.content.cached_encoded_data is None:
+                entry.oid = self.write_tree(entry.content)
+            elif entry.oid in self.new_blobs:
+                self.write_object(entry.oid, self.new_blobs.pop(entry.oid))
+
+        tree_oid = tree.get_oid()
+        self.write_object(tree_oid, tree)
+
+        return tree_oid
+
+    def import_commit(self, import_commit: ImportCommit) -> Commit:
+        if import_commit.timestamp < 0:
+            raise Exception('fatal: Commit without author in fast-import stream')
+
+        changed_paths: List[str] = []
+
+        for change in import_commit.changes:
+            self.apply_change(change, changed_paths)
+
+        commit = Commit(
+            import_commit.name,
+            import_commit.email,
+            import_commit.message,
+            self.write_tree(self.root),
+            datetime.fromtimestamp(import_commit.timestamp, parse_utc_offset(import_commit.offset)),
+            self.parent_oid,
+        )
+        commit_oid = commit.get_oid()
+
+        self.new_blobs.clear()
+        self.write_object(commit_oid, commit)
+        # the changed paths are known, no need to diff the trees again
+        self.repo.changed_paths.append(commit_oid, BloomFilter.from_paths(changed_paths))
+        self.parent_oid = commit_oid
+        self.commit_count += 1
+
+        return commit
+
+    def finish(self) -> None:
+        self.flush_objects()
+
+        if self.parent_oid == self.head_oid:
+            return
+
+        if self.repo.read_main() == self.head_oid:
+            self.repo.update_main(self.parent_oid)
+
+        self.repo.update_head(self.parent_oid)
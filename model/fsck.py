@@ -0,0 +1,223 @@
+from __future__ import annotations
+
+import itertools
+import os
+
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import TYPE_CHECKING, Deque, Dict, Iterator, List, Set, Tuple, Union
+
+from model.compression import decompress_object
+from model.hashing import get_hash_algorithm, set_hash_algorithm
+from model.objects import Blob, BlobManifest, Commit, Object, TreeNode
+
+if TYPE_CHECKING:
+    from model.repo import Repo
+
+# objects verified in the calling process, smaller stores never pay for
+# starting the pool
+PARALLEL_THRESHOLD = 2048
+
+# objects handed to a worker at once, keeps the pickling overhead per
+# object low
+BATCH_SIZE = 512
+
+# oid, type
+ObjectReference = Tuple[str, str]
+
+
+class ObjectCheck:
+    """Outcome of verifying a single object file."""
+
+    def __init__(
+        self,
+        oid: str,
+        type: Union[str, None],
+        error: Union[str, None],
+        references: List[ObjectReference],
+    ):
+        self.oid = oid
+        self.type = type
+        self.error = error
+        self.references = references
+
+
+def verify_object(object_path: str) -> ObjectCheck:
+    """Decompresses the object, re-hashes it against its file name and
+    decodes it with the decoder of its type.
+    """
+    path = Path(object_path)
+    oid = path.parent.name + path.name
+
+    try:
+        encoded_data = decompress_object(path.read_bytes())
+    except Exception as exception:
+        return ObjectCheck(oid, None, f'cannot read object: {exception}', [])
+
+    if encoded_data.startswith(b'manifest '):
+        return verify_manifest(path.parent.parent, oid, encoded_data)
+
+    if get_hash_algorithm().hexdigest(encoded_data) != oid:
+        return ObjectCheck(oid, None, 'hash mismatch', [])
+
+    try:
+        header = Object.decode_header(encoded_data.split(b'\x00', 1)[0])
+        object_type = header['type']
+        references: List[ObjectReference] = []
+
+        if object_type == 'blob':
+            Blob.decode(encoded_data)
+        elif object_type == 'tree':
+            tree = TreeNode.decode(encoded_data)
+            references = [(entry.oid, entry.type) for entry in tree.entries.values()]
+        else:
+            commit = Commit.decode(encoded_data)
+            references = [(commit.tree_oid, 'tree')]
+
+            if commit.parent:
+                references.append((commit.parent, 'commit'))
+    except Exception as exception:
+        return ObjectCheck(oid, None, f'cannot decode object: {exception}', [])
+
+    return ObjectCheck(oid, object_type, None, references)
+
+
+def verify_manifest(objects_path: Path, oid: str, encoded_data: bytes) -> ObjectCheck:
+    """A chunked blob is hashed over its chunks, read from the store in
+    order, as the blob it stands for.
+    """
+    try:
+        manifest = BlobManifest.decode(encoded_data)
+        blob_hash = get_hash_algorithm().new(f'blob {manifest.size}\x00'.encode('utf-8'))
+
+        for chunk_oid, size in manifest.chunks:
+            chunk_path = objects_path.joinpath(chunk_oid[:2], chunk_oid[2:])
+            chunk = Blob.decode(decompress_object(chunk_path.read_bytes()))
+
+            if len(chunk.data) != size:
+                raise Exception(f'chunk {chunk_oid} has the wrong size')
+
+            blob_hash.update(chunk.data)
+    except Exception as exception:
+        return ObjectCheck(oid, None, f'cannot read chunked blob: {exception}', [])
+
+    if blob_hash.hexdigest() != oid:
+        return ObjectCheck(oid, None, 'hash mismatch', [])
+
+    return ObjectCheck(oid, 'blob', None, [(chunk_oid, 'blob') for chunk_oid, _ in manifest.chunks])
+
+
+def verify_batch(object_paths: List[str], hash_algorithm_name: str) -> List[ObjectCheck]:
+    # workers may be fresh processes that never opened the repository
+    set_hash_algorithm(hash_algorithm_name)
+
+    return [verify_object(object_path) for object_path in object_paths]
+
+
+class FsckReport:
+    def __init__(self):
+        self.checked_count = 0
+        self.corrupt: Dict[str, str] = {}
+        # oid, expected type, oid of the object pointing to it
+        self.missing: List[Tuple[str, str, str]] = []
+        self.unreachable: List[ObjectReference] = []
+
+    def is_ok(self) -> bool:
+        return not self.corrupt and not self.missing
+
+    def __str__(self) -> str:
+        lines = [f'error in object {oid}: {error}' for oid, error in sorted(self.corrupt.items())]
+        lines.extend(
+            f'missing {expected_type} {oid} (referenced by {referenced_by})'
+            for oid, expected_type, referenced_by in self.missing
+        )
+        lines.extend(f'dangling {object_type} {oid}' for oid, object_type in sorted(self.unreachable))
+        lines.append(f'checked {self.checked_count} objects')
+
+        return '\n'.join(lines) + '\n'
+
+
+class Fsck:
+    """Verifies every object of a repository and the connectivity of the
+    history, spreading the object checks over a process pool.
+    """
+
+    def __init__(self, repo: Repo, max_workers: int = 0):
+        self.repo = repo
+        self.max_workers = max_workers if max_workers > 0 else (os.cpu_count() or 1)
+
+    def list_object_paths(self) -> List[str]:
+        return [str(self.repo.get_object_path(oid)) for oid in self.repo.list_object_oids()]
+
+    def check_objects(self, object_paths: List[str]) -> Iterator[ObjectCheck]:
+        if len(object_paths) < PARALLEL_THRESHOLD or self.max_workers < 2:
+            yield from verify_batch(object_paths, get_hash_algorithm().name)
+
+            return
+
+        batches = [
+            object_paths[start:start + BATCH_SIZE]
+            for start in range(0, len(object_paths), BATCH_SIZE)
+        ]
+
+        with ProcessPoolExecutor(max_workers=self.max_workers) as executor:
+            for checks in executor.map(verify_batch, batches, itertools.repeat(get_hash_algorithm().name)):
+                yield from checks
+
+    def run(self, root_oids: List[str]) -> FsckReport:
+        report = FsckReport()
+        object_types: Dict[str, str] = {}
+        references: Dict[str, List[ObjectReference]] = {}
+
+        for check in self.check_objects(self.list_object_paths()):
+            report.checked_count += 1
+
+            if check.error is not None or check.type is None:
+                report.corrupt[check.oid] = check.error or 'unknown object type'
+
+                continue
+
+            object_types[check.oid] = check.type
+
+            if check.references:
+                references[check.oid] = check.references
+
+        reachable: Set[str] = set()
+        pending: Deque[Tuple[str, str, str]] = deque(
+            (root_oid, 'commit', 'a ref') for root_oid in root_oids if root_oid
+        )
+
+        while pending:
+            oid, expected_type, referenced_by = pending.popleft()
+
+            if oid in reachable:
+                continue
+
+            if oid in report.corrupt:
+                reachable.add(oid)
+
+                continue
+
+            if oid not in object_types:
+                report.missing.append((oid, expected_type, referenced_by))
+                reachable.add(oid)
+
+                continue
+
+            if object_types[oid] != expected_type:
+                report.corrupt[oid] = f'expected {expected_type}, found {object_types[oid]}'
+
+            reachable.add(oid)
+            pending.extend(
+                (reference_oid, reference_type, oid)
+                for reference_oid, reference_type in references.get(oid, [])
+            )
+
+        report.unreachable = [
+            (oid, object_type)
+            for oid, object_type in object_types.items()
+            if oid not in reachable
+        ]
+
+        return report
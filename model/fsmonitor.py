@@ -0,0 +1,509 @@
+from __future__ import annotations
+
+import ctypes
+import ctypes.util
+import os
+import select
+import signal
+import struct
+import sys
+import time
+
+from pathlib import Path
+from typing import Dict, List, Set, Tuple, Union
+
+from model.background import read_pid
+from model.ignore import IGNORE_FILE_NAME, GudIgnore
+
+IN_MODIFY = 0x00000002
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+
+WATCH_MASK = \
+    IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | \
+    IN_CREATE | IN_DELETE | IN_DELETE_SELF | IN_MOVE_SELF | IN_ONLYDIR
+COOKIE_WATCH_MASK = IN_CREATE | IN_MOVED_TO | IN_ONLYDIR
+
+# wd, mask, cookie, len of the name that follows
+INOTIFY_EVENT = struct.Struct('iIII')
+
+MONITOR_DIR = 'fsmonitor'
+COOKIE_PREFIX = 'cookie-'
+MAX_JOURNAL_EVENTS = 100000
+
+
+# one inotify watch per directory that is not ignored
+class InotifyWatcher:
+    @staticmethod
+    def load_libc():
+        if not sys.platform.startswith('linux'):
+            return None
+
+        try:
+            libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+            libc.inotify_init1
+            libc.inotify_add_watch
+        except (OSError, AttributeError):
+            return None
+
+        libc.inotify_add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+
+        return libc
+
+    def __init__(self, repo_path: Path, ignore: List[str], libc):
+        self.repo_path = repo_path
+        self.gud_ignore = GudIgnore(str(repo_path), ignore)
+        self.libc = libc
+        self.watches: Dict[int, str] = {}
+        self.fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+
+        if self.fd < 0:
+            raise Exception(f'fatal: inotify_init1 failed, errno {ctypes.get_errno()}')
+
+        self.cookie_dir = str(Path('.gitgud').joinpath(MONITOR_DIR))
+        self.add_watch(self.cookie_dir, COOKIE_WATCH_MASK)
+        self.watch_tree('')
+
+    def add_watch(self, relative_path: str, mask: int = WATCH_MASK) -> None:
+        full_path = os.path.join(str(self.repo_path), relative_path)
+        wd = self.libc.inotify_add_watch(self.fd, os.fsencode(full_path), mask)
+
+        if wd >= 0:
+            self.watches[wd] = relative_path
+
+    def watch_tree(self, relative_path: str) -> None:
+        self.add_watch(relative_path)
+
+        try:
+            dir_entries = list(os.scandir(os.path.join(str(self.repo_path), relative_path)))
+        except OSError:
+            return
+
+        for dir_entry in dir_entries:
+            entry_path = os.path.join(relative_path, dir_entry.name)
+
+            if dir_entry.is_dir(follow_symlinks=False) \
+               and not self.gud_ignore.is_ignored(entry_path, dir_entry.name, True):
+                self.watch_tree(entry_path)
+
+    def poll(self, timeout: float) -> Union[List[str], None]:
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+
+        if not ready:
+            return []
+
+        try:
+            data = os.read(self.fd, 1 << 16)
+        except BlockingIOError:
+            return []
+
+        changed_paths: List[str] = []
+        offset = 0
+
+        while offset < len(data):
+            wd, mask, _, name_len = INOTIFY_EVENT.unpack_from(data, offset)
+            offset += INOTIFY_EVENT.size
+            name = os.fsdecode(data[offset:offset + name_len].rstrip(b'\x00'))
+            offset += name_len
+
+            if mask & IN_Q_OVERFLOW:
+                return None
+
+            if mask & IN_IGNORED:
+                self.watches.pop(wd, None)
+
+                continue
+
+            if wd not in self.watches:
+                continue
+
+            relative_path = os.path.join(self.watches[wd], name) if name else self.watches[wd]
+
+            if name == IGNORE_FILE_NAME:
+                # directories the new rules no longer ignore are watched
+                self.gud_ignore.forget(self.watches[wd])
+                self.watch_tree(self.watches[wd])
+            elif name and self.watches[wd] != self.cookie_dir \
+                 and self.gud_ignore.is_ignored(relative_path, name, bool(mask & IN_ISDIR)):
+                continue
+
+            if mask & IN_ISDIR and mask & (IN_CREATE | IN_MOVED_TO):
+                self.gud_ignore.forget(relative_path)
+                self.watch_tree(relative_path)
+
+            changed_paths.append(relative_path)
+
+        return changed_paths
+
+    def close(self) -> None:
+        os.close(self.fd)
+
+
+# fallback without inotify, only directories whose mtime changed are listed again
+class PollingWatcher:
+    def __init__(self, repo_path: Path, ignore: List[str], interval: float = 1.0):
+        self.repo_path = repo_path
+        self.gud_ignore = GudIgnore(str(repo_path), ignore)
+        self.interval = interval
+        self.cookie_path = repo_path.joinpath('.gitgud', MONITOR_DIR)
+        self.directories: Dict[str, Tuple[int, List[str]]] = {}
+        self.files: Dict[str, Tuple[int, int, int]] = {}
+        self.last_scan = 0.0
+
+        self.scan()
+
+    def list_directory(self, relative_path: str, changed_paths: List[str]) -> None:
+        full_path = os.path.join(str(self.repo_path), relative_path)
+
+        try:
+            mtime_ns = os.stat(full_path).st_mtime_ns
+            dir_entries = list(os.scandir(full_path))
+        except OSError:
+            return
+
+        names: List[str] = []
+
+        for dir_entry in dir_entries:
+            entry_path = os.path.join(relative_path, dir_entry.name)
+            is_dir = dir_entry.is_dir(follow_symlinks=False)
+
+            if dir_entry.name != IGNORE_FILE_NAME \
+               and self.gud_ignore.is_ignored(entry_path, dir_entry.name, is_dir):
+                continue
+
+            names.append(dir_entry.name)
+
+            if is_dir:
+                if entry_path not in self.directories:
+                    changed_paths.append(entry_path)
+                    self.list_directory(entry_path, changed_paths)
+            elif entry_path not in self.files:
+                changed_paths.append(entry_path)
+                self.stat_file(entry_path, changed_paths)
+
+        self.directories[relative_path] = (mtime_ns, names)
+
+    def stat_file(self, relative_path: str, changed_paths: List[str]) -> None:
+        try:
+            stat = os.lstat(os.path.join(str(self.repo_path), relative_path))
+        except OSError:
+            if self.files.pop(relative_path, None) is not None:
+                changed_paths.append(relative_path)
+
+            return
+
+        file_state = (stat.st_mtime_ns, stat.st_size, stat.st_ino)
+
+        if self.files.get(relative_path, file_state) != file_state:
+            changed_paths.append(relative_path)
+
+        self.files[relative_path] = file_state
+
+    def relist_directory(self, relative_path: str, changed_paths: List[str]) -> None:
+        # the ignore rules changed, everything below is listed again
+        prefix = relative_path + '/' if relative_path else ''
+        self.gud_ignore.forget(relative_path)
+
+        for directory in list(self.directories):
+            if directory == relative_path or directory.startswith(prefix):
+                del self.directories[directory]
+
+        for file in list(self.files):
+            if file.startswith(prefix):
+                del self.files[file]
+
+        self.list_directory(relative_path, changed_paths)
+
+    def scan(self) -> List[str]:
+        changed_paths: List[str] = []
+
+        for relative_path in list(self.directories):
+            if relative_path not in self.directories:
+                continue
+
+            mtime_ns, names = self.directories[relative_path]
+            full_path = os.path.join(str(self.repo_path), relative_path)
+
+            try:
+                current_mtime_ns = os.stat(full_path).st_mtime_ns
+            except OSError:
+                current_mtime_ns = -1
+
+            if current_mtime_ns == mtime_ns:
+                for name in names:
+                    entry_path = os.path.join(relative_path, name)
+
+                    if entry_path in self.files:
+                        self.stat_file(entry_path, changed_paths)
+
+                continue
+
+            del self.directories[relative_path]
+
+            for name in names:
+                entry_path = os.path.join(relative_path, name)
+
+                if entry_path in self.files:
+                    self.stat_file(entry_path, changed_paths)
+                elif entry_path in self.directories and current_mtime_ns == -1:
+                    changed_paths.append(entry_path)
+
+            if current_mtime_ns != -1:
+                self.list_directory(relative_path, changed_paths)
+
+        if not self.directories:
+            self.list_directory('', changed_paths)
+
+        for changed_path in list(changed_paths):
+            if os.path.basename(changed_path) == IGNORE_FILE_NAME:
+                self.relist_directory(os.path.dirname(changed_path), changed_paths)
+
+        self.last_scan = time.monotonic()
+
+        return changed_paths
+
+    def poll(self, timeout: float) -> Union[List[str], None]:
+        deadline = time.monotonic() + timeout
+
+        while True:
+            cookies = [
+                str(Path('.gitgud').joinpath(MONITOR_DIR, name))
+                for name in os.listdir(str(self.cookie_path))
+                if name.startswith(COOKIE_PREFIX)
+            ]
+
+            if cookies or time.monotonic() - self.last_scan >= self.interval:
+                return self.scan() + cookies
+
+            if time.monotonic() >= deadline:
+                return []
+
+            time.sleep(0.02)
+
+    def close(self) -> None:
+        pass
+
+
+# journal lines are "<seq> <path>" after a generation line, tokens are
+# "<generation>:<seq>"
+class FsMonitorDaemon:
+    def __init__(self, repo_path: Path, ignore: List[str], use_polling: bool = False):
+        self.repo_path = repo_path
+        self.ignore = ignore
+        self.monitor_path = repo_path.joinpath('.gitgud', MONITOR_DIR)
+        self.journal_path = self.monitor_path.joinpath('journal')
+        self.pid_path = self.monitor_path.joinpath('pid')
+        self.use_polling = use_polling
+        self.should_stop = False
+        self.generation = ''
+        self.seq = 0
+        self.journal_events = 0
+
+    def start_generation(self) -> None:
+        self.generation = f'{os.getpid()}-{time.time_ns()}'
+        self.seq = 0
+        self.journal_events = 0
+        temp_path = self.monitor_path.joinpath('.journal.tmp')
+
+        with open(str(temp_path), 'w') as file:
+            file.write(f'{self.generation}\n')
+            file.close()
+
+        temp_path.rename(self.journal_path)
+
+    def create_watcher(self):
+        libc = None if self.use_polling else InotifyWatcher.load_libc()
+
+        if libc is not None:
+            return InotifyWatcher(self.repo_path, self.ignore, libc)
+
+        return PollingWatcher(self.repo_path, self.ignore)
+
+    def record(self, changed_paths: List[str]) -> None:
+        cookie_dir = str(Path('.gitgud').joinpath(MONITOR_DIR))
+        cookies: List[str] = []
+        lines: List[str] = []
+
+        for changed_path in changed_paths:
+            if os.path.dirname(changed_path) == cookie_dir:
+                if os.path.basename(changed_path).startswith(COOKIE_PREFIX):
+                    cookies.append(changed_path)
+
+                continue
+
+            if '\n' in changed_path:
+                # can't be journaled, make every client rescan instead
+                self.start_generation()
+                lines = []
+
+                continue
+
+            self.seq += 1
+            lines.append(f'{self.seq} {changed_path}\n')
+
+        if lines:
+            with open(str(self.journal_path), 'a') as file:
+                file.write(''.join(lines))
+                file.close()
+
+            self.journal_events += len(lines)
+
+        # cookies are acknowledged only once everything seen before them
+        # is in the journal
+        for cookie in cookies:
+            try:
+                self.repo_path.joinpath(cookie).unlink()
+            except FileNotFoundError:
+                pass
+
+        if self.journal_events > MAX_JOURNAL_EVENTS:
+            self.start_generation()
+
+    def stop(self, *_) -> None:
+        self.should_stop = True
+
+    def run(self) -> None:
+        self.monitor_path.mkdir(parents=True, exist_ok=True)
+        signal.signal(signal.SIGTERM, self.stop)
+        signal.signal(signal.SIGINT, self.stop)
+
+        watcher = self.create_watcher()
+        self.start_generation()
+        self.pid_path.write_text(str(os.getpid()))
+
+        try:
+            while not self.should_stop:
+                changed_paths = watcher.poll(0.5)
+
+                if changed_paths is None:
+                    watcher.close()
+                    watcher = self.create_watcher()
+                    self.start_generation()
+
+                    continue
+
+                if changed_paths:
+                    self.record(changed_paths)
+        finally:
+            watcher.close()
+
+            try:
+                self.pid_path.unlink()
+            except FileNotFoundError:
+                pass
+
+
+# paths that were not clean at the token are looked at again next time
+class FsMonitorState:
+    def __init__(self, token: str, pending_paths: Set[str]):
+        self.token = token
+        self.pending_paths = pending_paths
+
+
+class FsMonitorClient:
+    def __init__(self, storage_path: Path):
+        self.monitor_path = storage_path.joinpath(MONITOR_DIR)
+        self.journal_path = self.monitor_path.joinpath('journal')
+        self.pid_path = self.monitor_path.joinpath('pid')
+        self.state_path = self.monitor_path.joinpath('state')
+
+    def read_pid(self) -> Union[int, None]:
+        return read_pid(self.pid_path)
+
+    def is_running(self) -> bool:
+        return self.read_pid() is not None
+
+    def sync(self, timeout: float = 2.0) -> bool:
+        cookie_path = self.monitor_path.joinpath(f'{COOKIE_PREFIX}{os.getpid()}-{time.time_ns()}')
+
+        try:
+            with open(str(cookie_path), 'w'):
+                pass
+        except OSError:
+            return False
+
+        deadline = time.monotonic() + timeout
+
+        while time.monotonic() < deadline:
+            if not cookie_path.exists():
+                return True
+
+            time.sleep(0.001)
+
+        try:
+            cookie_path.unlink()
+        except FileNotFoundError:
+            pass
+
+        return False
+
+    def query(self, token: str) -> Tuple[Union[str, None], Union[Set[str], None]]:
+        # no paths when the monitor can't tell, the caller scans everything
+        if not self.is_running() or not self.sync():
+            return None, None
+
+        try:
+            journal = self.journal_path.read_bytes()
+        except OSError:
+            return None, None
+
+        lines = journal.split(b'\n')
+        # the last element is either empty or a line being written
+        complete_lines = lines[:-1]
+
+        if len(complete_lines) == 0:
+            return None, None
+
+        generation = complete_lines[0].decode('utf-8')
+        token_generation, _, token_seq_str = token.partition(':')
+        token_seq = int(token_seq_str) if token_seq_str.isdigit() else -1
+        is_token_valid = token_generation == generation and token_seq >= 0
+        changed_paths: Set[str] = set()
+        last_seq = 0
+
+        for line in complete_lines[1:]:
+            seq_bytes, _, path_bytes = line.partition(b' ')
+            last_seq = int(seq_bytes)
+
+            if is_token_valid and last_seq > token_seq:
+                changed_paths.add(os.fsdecode(path_bytes))
+
+        new_token = f'{generation}:{last_seq}'
+
+        if not is_token_valid:
+            return new_token, None
+
+        return new_token, changed_paths
+
+    def read_state(self) -> FsMonitorState:
+        try:
+            lines = self.state_path.read_text().split('\n')
+        except OSError:
+            return FsMonitorState('', set())
+
+        return FsMonitorState(lines[0], set(line for line in lines[1:] if line))
+
+    def write_state(self, state: FsMonitorState) -> None:
+        temp_path = self.monitor_path.joinpath('.state.tmp')
+
+        try:
+            with open(str(temp_path), 'w') as file:
+                file.write('\n'.join([state.token] + sorted(state.pending_paths)) + '\n')
+                file.close()
+
+            temp_path.rename(self.state_path)
+        except OSError:
+            # losing the state only costs a full scan next time
+            pass
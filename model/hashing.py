@@ -0,0 +1,66 @@
+from __future__ import annotations
+
+import hashlib
+
+from typing import Any, Callable, Dict
+
+
+class HashAlgorithm:
+    """Object hash of a repository, every oid codec takes its digest
+    length from here.
+    """
+
+    def __init__(self, name: str, digest_size: int, constructor: Callable[[bytes], Any]):
+        self.name = name
+        self.digest_size = digest_size
+        self.hex_length = digest_size * 2
+        self.constructor = constructor
+
+    def new(self, data: bytes = b'') -> Any:
+        return self.constructor(data)
+
+    def hexdigest(self, data: bytes) -> str:
+        return self.constructor(data).hexdigest()
+
+    def is_valid_oid(self, oid: str) -> bool:
+        if len(oid) != self.hex_length:
+            return False
+
+        try:
+            bytes.fromhex(oid)
+        except ValueError:
+            return False
+
+        return True
+
+
+def new_blake2b(data: bytes = b'') -> Any:
+    return hashlib.blake2b(data, digest_size=32)
+
+
+HASH_ALGORITHMS: Dict[str, HashAlgorithm] = {
+    'sha1': HashAlgorithm('sha1', 20, hashlib.sha1),
+    'sha256': HashAlgorithm('sha256', 32, hashlib.sha256),
+    'blake2b': HashAlgorithm('blake2b', 32, new_blake2b),
+}
+
+DEFAULT_HASH_ALGORITHM = 'sha1'
+
+# like git's the_hash_algo, a process works with the objects of a single
+# repository, opening it selects the algorithm for everything else
+current_hash_algorithm = HASH_ALGORITHMS[DEFAULT_HASH_ALGORITHM]
+
+
+def get_hash_algorithm() -> HashAlgorithm:
+    return current_hash_algorithm
+
+
+def set_hash_algorithm(name: str) -> HashAlgorithm:
+    global current_hash_algorithm
+
+    if name not in HASH_ALGORITHMS:
+        raise Exception(f'fatal: Unknown hash algorithm {name}')
+
+    current_hash_algorithm = HASH_ALGORITHMS[name]
+
+    return current_hash_algorithm
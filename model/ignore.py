@@ -0,0 +1,265 @@
+from __future__ import annotations
+
+import re
+
+from pathlib import Path
+from typing import Dict, List, Pattern, Set, Tuple, Union
+
+IGNORE_FILE_NAME = '.gudignore'
+GLOB_CHARS = '*?[\\'
+
+# never part of the working tree, whatever the ignore files say
+FORCED_IGNORE = ['.gitgud']
+
+
+def translate_glob(pattern: str) -> str:
+    """Translates a gitignore glob into a regex over '/' separated paths."""
+    regex = ''
+    i = 0
+
+    while i < len(pattern):
+        char = pattern[i]
+
+        if pattern.startswith('**/', i) and (i == 0 or pattern[i - 1] == '/'):
+            regex += '(?:.*/)?'
+            i += 3
+        elif pattern.startswith('**', i) and i + 2 == len(pattern) and (i == 0 or pattern[i - 1] == '/'):
+            regex += '.*'
+            i += 2
+        elif char == '*':
+            regex += '[^/]*'
+            i += 1
+        elif char == '?':
+            regex += '[^/]'
+            i += 1
+        elif char == '[':
+            end = pattern.find(']', i + 2)
+
+            if end == -1:
+                regex += re.escape(char)
+                i += 1
+
+                continue
+
+            char_class = pattern[i + 1:end]
+
+            if char_class.startswith('!'):
+                char_class = '^' + char_class[1:]
+
+            regex += '[' + char_class.replace('\\', '\\\\') + ']'
+            i = end + 1
+        elif char == '\\' and i + 1 < len(pattern):
+            regex += re.escape(pattern[i + 1])
+            i += 2
+        else:
+            regex += re.escape(char)
+            i += 1
+
+    return regex
+
+
+class IgnoreRule:
+    @staticmethod
+    def parse(line: str) -> Union[IgnoreRule, None]:
+        if line.endswith('\n'):
+            line = line[:-1]
+
+        while line.endswith(' ') and not line.endswith('\\ '):
+            line = line[:-1]
+
+        if line == '' or line.startswith('#'):
+            return None
+
+        is_negated = line.startswith('!')
+
+        if is_negated:
+            line = line[1:]
+        elif line.startswith('\\!') or line.startswith('\\#'):
+            line = line[1:]
+
+        is_dir_only = line.endswith('/')
+        line = line.rstrip('/')
+        is_anchored = '/' in line
+        line = line.lstrip('/')
+
+        if line == '':
+            return None
+
+        return IgnoreRule(line, is_negated, is_dir_only, is_anchored)
+
+    def __init__(
+        self,
+        pattern: str,
+        is_negated: bool,
+        is_dir_only: bool,
+        is_anchored: bool,
+    ):
+        self.pattern = pattern
+        self.is_negated = is_negated
+        self.is_dir_only = is_dir_only
+        self.is_anchored = is_anchored
+        self.is_literal = not any(char in pattern for char in GLOB_CHARS)
+
+    def to_regex(self) -> str:
+        if self.is_anchored:
+            return translate_glob(self.pattern)
+
+        return '(?:.*/)?' + translate_glob(self.pattern)
+
+
+class IgnoreRuleBlock:
+    """Consecutive rules of the same sign, checked with set lookups for
+    literal patterns and one combined regex for the globs.
+    """
+
+    def __init__(self, is_negated: bool):
+        self.is_negated = is_negated
+        self.names: Tuple[Set[str], Set[str]] = (set(), set())
+        self.paths: Tuple[Set[str], Set[str]] = (set(), set())
+        self.regexes: Tuple[List[str], List[str]] = ([], [])
+        self.compiled: List[Union[Pattern[str], None]] = [None, None]
+
+    def add(self, rule: IgnoreRule) -> None:
+        # index 0 holds the rules for any entry, 1 the directory only ones
+        kind = 1 if rule.is_dir_only else 0
+
+        if rule.is_literal and rule.is_anchored:
+            self.paths[kind].add(rule.pattern)
+        elif rule.is_literal:
+            self.names[kind].add(rule.pattern)
+        else:
+            self.regexes[kind].append(rule.to_regex())
+
+    def compile(self) -> None:
+        for kind in (0, 1):
+            if self.regexes[kind]:
+                self.compiled[kind] = re.compile('(?:' + '|'.join(self.regexes[kind]) + r')\Z', re.DOTALL)
+
+    def matches(self, relative_path: str, name: str, is_dir: bool) -> bool:
+        for kind in ((0, 1) if is_dir else (0,)):
+            if name in self.names[kind] or relative_path in self.paths[kind]:
+                return True
+
+            compiled = self.compiled[kind]
+
+            if compiled is not None and compiled.match(relative_path):
+                return True
+
+        return False
+
+
+class IgnoreMatcher:
+    """Compiled rules of a single ignore file, paths are relative to the
+    directory the file lives in.
+    """
+
+    @staticmethod
+    def from_lines(lines: List[str]) -> IgnoreMatcher:
+        matcher = IgnoreMatcher()
+
+        for line in lines:
+            rule = IgnoreRule.parse(line)
+
+            if rule is not None:
+                matcher.add(rule)
+
+        matcher.compile()
+
+        return matcher
+
+    def __init__(self):
+        self.blocks: List[IgnoreRuleBlock] = []
+
+    def add(self, rule: IgnoreRule) -> None:
+        if not self.blocks or self.blocks[-1].is_negated != rule.is_negated:
+            self.blocks.append(IgnoreRuleBlock(rule.is_negated))
+
+        self.blocks[-1].add(rule)
+
+    def compile(self) -> None:
+        for block in self.blocks:
+            block.compile()
+
+    def match(self, relative_path: str, name: str, is_dir: bool) -> Union[bool, None]:
+        """True if ignored, False if re-included, None if no rule matches."""
+        # the last matching rule wins
+        for block in reversed(self.blocks):
+            if block.matches(relative_path, name, is_dir):
+                return not block.is_negated
+
+        return None
+
+
+class GudIgnore:
+    """Ignore rules of a working tree.
+
+    The .gudignore of every directory is read and compiled the first time
+    an entry of that directory is looked at. Rules of deeper files take
+    precedence, the default patterns come last.
+    """
+
+    def __init__(self, repo_path: str, default_patterns: List[str]):
+        self.repo_path = repo_path
+        self.default_matcher = IgnoreMatcher.from_lines(default_patterns)
+        self.matchers: Dict[str, Union[IgnoreMatcher, None]] = {}
+
+    def get_matcher(self, relative_dir: str) -> Union[IgnoreMatcher, None]:
+        if relative_dir in self.matchers:
+            return self.matchers[relative_dir]
+
+        ignore_file_path = Path(self.repo_path).joinpath(relative_dir, IGNORE_FILE_NAME)
+
+        try:
+            lines = ignore_file_path.read_text('utf-8').splitlines()
+            matcher: Union[IgnoreMatcher, None] = IgnoreMatcher.from_lines(lines)
+        except (FileNotFoundError, NotADirectoryError, IsADirectoryError):
+            matcher = None
+
+        self.matchers[relative_dir] = matcher
+
+        return matcher
+
+    def forget(self, relative_dir: str) -> None:
+        """Drops the rules read for a directory and the ones below it."""
+        prefix = relative_dir + '/' if relative_dir else ''
+
+        for matcher_dir in list(self.matchers):
+            if matcher_dir == relative_dir or matcher_dir.startswith(prefix):
+                del self.matchers[matcher_dir]
+
+    def is_ignored(self, relative_path: str, name: str, is_dir: bool) -> bool:
+        """Decides for an entry whose parent directories are not ignored."""
+        if name in FORCED_IGNORE:
+            return True
+
+        relative_dir = relative_path[:-len(name) - 1] if relative_path != name else ''
+
+        while True:
+            matcher = self.get_matcher(relative_dir)
+
+            if matcher is not None:
+                path_from_dir = relative_path[len(relative_dir) + 1:] if relative_dir else relative_path
+                result = matcher.match(path_from_dir, name, is_dir)
+
+                if result is not None:
+                    return result
+
+            if relative_dir == '':
+                break
+
+            separator = relative_dir.rfind('/')
+            relative_dir = relative_dir[:separator] if separator != -1 else ''
+
+        return self.default_matcher.match(relative_path, name, is_dir) == True
+
+    def is_path_ignored(self, relative_path: str, is_dir: bool) -> bool:
+        """Decides for any path, checking its parent directories as well."""
+        parts = relative_path.split('/')
+
+        for i in range(len(parts)):
+            is_last = i == len(parts) - 1
+
+            if self.is_ignored('/'.join(parts[:i + 1]), parts[i], is_dir or not is_last):
+                return True
+
+        return False
@@ -1,14 +1,30 @@
 from __future__ import annotations
 
-import hashlib
+import struct
 from os import stat_result
 from pathlib import Path
-from typing import Dict
+from typing import Dict, List, Set, Union
+
+from model.hashing import get_hash_algorithm
+
+ENTRY_FORMATS: Dict[int, struct.Struct] = {}
+EXECUTABLE_MODE = int('100755', 8)
+REGULAR_MODE = int('100644', 8)
+
+def get_entry_format() -> struct.Struct:
+    # ctime_s, ctime_ns, mtime_s, mtime_ns, dev, ino, mode, uid, gid, size,
+    # oid, path length
+    digest_size = get_hash_algorithm().digest_size
+
+    if digest_size not in ENTRY_FORMATS:
+        ENTRY_FORMATS[digest_size] = struct.Struct(f'>10I{digest_size}sH')
+
+    return ENTRY_FORMATS[digest_size]
 
 class IndexEntry:
     def __init__(
         self,
-        path: Path,
+        path: Union[Path, str],
         is_executable: bool,
         oid: str,
         st_ctime: int,
@@ -30,25 +46,52 @@ class IndexEntry:
         self.file_size = st_size
 
         if is_executable:
-            self.mode = int('100755', 8)
+            self.mode = EXECUTABLE_MODE
         else:
-            self.mode = int('100644', 8)
+            self.mode = REGULAR_MODE
 
         self.oid = oid
         self.path = str(path)
 
+    @staticmethod
+    def from_stat(
+        path: Path,
+        oid: str,
+        stat: stat_result,
+        is_executable: bool,
+    ) -> IndexEntry:
+        return IndexEntry(
+            path,
+            is_executable,
+            oid,
+            int(stat.st_ctime) & 0xFFFFFFFF,
+            int(stat.st_mtime) & 0xFFFFFFFF,
+            stat.st_dev & 0xFFFFFFFF,
+            stat.st_ino & 0xFFFFFFFF,
+            stat.st_uid & 0xFFFFFFFF,
+            stat.st_gid & 0xFFFFFFFF,
+            stat.st_size & 0xFFFFFFFF
+        )
+
+    def matches_stat(self, stat: stat_result) -> bool:
+        return \
+            self.mtime_s == int(stat.st_mtime) & 0xFFFFFFFF and \
+            self.file_size == stat.st_size & 0xFFFFFFFF and \
+            self.ino == stat.st_ino & 0xFFFFFFFF and \
+            (self.mode == EXECUTABLE_MODE) == bool(stat.st_mode & 0o100)
+
     @staticmethod
     def validate_data(data: bytes) -> bool:
-        fixed_meta_info_len = 62
+        fixed_meta_info_len = get_entry_format().size
         fixed_meta_info = data[0:fixed_meta_info_len]
 
         if len(fixed_meta_info) != fixed_meta_info_len:
             return False
 
-        mode = int(data[24:28].hex(), 16)
-        path_len = int(data[60:62].hex(), 16)
+        mode = int.from_bytes(data[24:28], 'big')
+        path_len = int.from_bytes(data[fixed_meta_info_len - 2:fixed_meta_info_len], 'big')
 
-        if mode != int('100644', 8) and mode != int('100755', 8):
+        if mode != REGULAR_MODE and mode != EXECUTABLE_MODE:
             return False
 
         total_len_without_padding = fixed_meta_info_len + path_len
@@ -66,22 +109,24 @@ class IndexEntry:
         return True
 
     def encode(self) -> bytes:
-        encoded_without_pads = \
-            self.ctime_s.to_bytes(4, 'big') + \
-            self.ctime_ns.to_bytes(4, 'big') + \
-            self.mtime_s.to_bytes(4, 'big') + \
-            self.mtime_ns.to_bytes(4, 'big') + \
-            self.dev.to_bytes(4, 'big') + \
-            self.ino.to_bytes(4, 'big') + \
-            self.mode.to_bytes(4, 'big') + \
-            self.uid.to_bytes(4, 'big') + \
-            self.gid.to_bytes(4, 'big') + \
-            self.file_size.to_bytes(4, 'big') + \
-            bytes.fromhex(self.oid) + \
-            bytes(len(self.path).to_bytes(2, 'big')) + \
-            bytes(self.path, 'utf-8')
-
-        len_without_pads = 62 + len(str(self.path))
+        path_bytes = bytes(self.path, 'utf-8')
+        entry_format = get_entry_format()
+        encoded_without_pads = entry_format.pack(
+            self.ctime_s,
+            self.ctime_ns,
+            self.mtime_s,
+            self.mtime_ns,
+            self.dev,
+            self.ino,
+            self.mode,
+            self.uid,
+            self.gid,
+            self.file_size,
+            bytes.fromhex(self.oid),
+            len(self.path),
+        ) + path_bytes
+
+        len_without_pads = entry_format.size + len(str(self.path))
 
         encoded_with_pads = encoded_without_pads + b'\x00'*(8 - len_without_pads % 8)
 
@@ -92,26 +137,26 @@ class IndexEntry:
         if not IndexEntry.validate_data(data):
             raise Exception('fatal: Corrupted IndexEntry')
 
-        ctime = int(data[0:4].hex(), 16)
-        ctime_ns = int(data[4:8].hex(), 16)
-        mtime = int(data[8:12].hex(), 16)
-        mtime_ns = int(data[12:16].hex(), 16)
-        dev = int(data[16:20].hex(), 16)
-        ino = int(data[20:24].hex(), 16)
-        mode = int(data[24:28].hex(), 16)
-        uid = int(data[28:32].hex(), 16)
-        gid = int(data[32:36].hex(), 16)
-        file_size = int(data[36:40].hex(), 16)
-        oid = data[40:60].hex()
-        path_len = int(data[60:62].hex(), 16)
-        path = data[62:(62 + path_len)].decode('utf-8')
-
-        is_executable = True if mode == int('100755', 8) else False
+        return IndexEntry.unpack_from(data, 0)
+
+    @staticmethod
+    def unpack_from(
+        data: bytes,
+        offset: int,
+        entry_format: Union[struct.Struct, None] = None,
+    ) -> IndexEntry:
+        entry_format = entry_format or get_entry_format()
+        (
+            ctime, ctime_ns, mtime, mtime_ns, dev, ino, mode, uid, gid,
+            file_size, oid_bytes, path_len,
+        ) = entry_format.unpack_from(data, offset)
+        path_start = offset + entry_format.size
+        path = data[path_start:path_start + path_len].decode('utf-8')
 
         return IndexEntry(
-            Path(path),
-            is_executable,
-            oid,
+            path,
+            mode == EXECUTABLE_MODE,
+            oid_bytes.hex(),
             ctime,
             mtime,
             dev,
@@ -148,15 +193,16 @@ class Index:
             return False
 
         current_byte_offset = 12
+        hash_algorithm = get_hash_algorithm()
 
         for _ in range(number_of_entries):
-            fixed_entry_info_len = 62
+            fixed_entry_info_len = get_entry_format().size
             fixed_entry_info = data[current_byte_offset:current_byte_offset + fixed_entry_info_len]
 
             if len(fixed_entry_info) != fixed_entry_info_len:
                 return False
 
-            path_len = int(fixed_entry_info[-2:].hex(), 16)
+            path_len = int.from_bytes(fixed_entry_info[-2:], 'big')
             total_len_without_padding = fixed_entry_info_len + path_len
             total_len = total_len_without_padding + (8 - total_len_without_padding % 8)
             entry_info = data[current_byte_offset:current_byte_offset + total_len]
@@ -169,12 +215,12 @@ class Index:
             
             current_byte_offset += total_len
 
-        if len(data) != current_byte_offset + 20:
+        if len(data) != current_byte_offset + hash_algorithm.digest_size:
             return False
 
-        checksum = data[current_byte_offset:current_byte_offset + 20].hex()
+        checksum = data[current_byte_offset:current_byte_offset + hash_algorithm.digest_size].hex()
         content_without_checksum = data[0: current_byte_offset]
-        actual_checksum = hashlib.sha1(content_without_checksum).hexdigest()
+        actual_checksum = hash_algorithm.hexdigest(content_without_checksum)
 
         if checksum != actual_checksum:
             return False
@@ -191,9 +237,61 @@ class Index:
         except:
             raise Exception('fatal: Cant read index file')
 
-        if not Index.validate_data(index_file_content):
+        return Index.decode_verified(index_file_content, index_path)
+
+    @staticmethod
+    def decode_verified(index_file_content: bytes, index_path: Path) -> Index:
+        """Same checks as validate_data followed by decode, done in a single
+        pass over the entries.
+        """
+        index = Index(index_path)
+
+        if len(index_file_content) == 0:
+            return index
+
+        hash_algorithm = get_hash_algorithm()
+        content_end = len(index_file_content) - hash_algorithm.digest_size
+
+        if content_end < 12 or index_file_content[0:4] != b'DIRC' or \
+           hash_algorithm.hexdigest(index_file_content[:content_end]) != index_file_content[content_end:].hex():
+            raise Exception('fatal: Corrupted index file')
+
+        number_of_entries = int.from_bytes(index_file_content[8:12], 'big')
+        current_byte_offset = 12
+        entry_format = get_entry_format()
+        fixed_entry_info_len = entry_format.size
+
+        try:
+            for _ in range(number_of_entries):
+                path_len = int.from_bytes(
+                    index_file_content[
+                        current_byte_offset + fixed_entry_info_len - 2:current_byte_offset + fixed_entry_info_len
+                    ],
+                    'big',
+                )
+                total_len_without_padding = fixed_entry_info_len + path_len
+                total_len = total_len_without_padding + (8 - total_len_without_padding % 8)
+
+                if current_byte_offset + total_len > content_end:
+                    raise Exception('fatal: Corrupted index file')
+
+                entry = IndexEntry.unpack_from(index_file_content, current_byte_offset, entry_format)
+
+                if entry.mode != REGULAR_MODE and entry.mode != EXECUTABLE_MODE:
+                    raise Exception('fatal: Corrupted index file')
+
+                current_byte_offset += total_len
+                index.entries[entry.path] = entry
+        except UnicodeDecodeError:
             raise Exception('fatal: Corrupted index file')
 
+        if current_byte_offset != content_end:
+            raise Exception('fatal: Corrupted index file')
+
+        return index
+
+    @staticmethod
+    def decode(index_file_content: bytes, index_path: Path) -> Index:
         index = Index(index_path)
 
         if len(index_file_content) == 0:
@@ -203,20 +301,26 @@ class Index:
         number_of_entries = int(header[8:12].hex(), 16)
 
         current_byte_offset = 12
+        entry_format = get_entry_format()
+        fixed_entry_info_len = entry_format.size
 
         for _ in range(number_of_entries):
-            fixed_entry_info_len = 62
-            fixed_entry_info = index_file_content[current_byte_offset:current_byte_offset + fixed_entry_info_len]
-            path_len = int(fixed_entry_info[-2:].hex(), 16)
+            path_len = int.from_bytes(
+                index_file_content[
+                    current_byte_offset + fixed_entry_info_len - 2:current_byte_offset + fixed_entry_info_len
+                ],
+                'big',
+            )
             total_len_without_padding = fixed_entry_info_len + path_len
             total_len = total_len_without_padding + (8 - total_len_without_padding % 8)
-            entry_info = index_file_content[current_byte_offset:current_byte_offset + total_len]
 
-            entry = IndexEntry.decode(entry_info)
+            entry = IndexEntry.unpack_from(index_file_content, current_byte_offset, entry_format)
 
             current_byte_offset += total_len
 
-            index._add_entry(entry)
+            # entries of a written index never conflict with each other,
+            # so skip the O(n) discard_conflicts scan per entry
+            index.entries[entry.path] = entry
 
         return index
 
@@ -247,35 +351,56 @@ class Index:
         stat: stat_result,
         is_executable: bool,
     ) -> None:
-        entry = IndexEntry(
-            path,
-            is_executable,
-            oid,
-            int(stat.st_ctime),
-            int(stat.st_mtime),
-            stat.st_dev,
-            stat.st_ino,
-            stat.st_uid,
-            stat.st_gid,
-            stat.st_size
-        )
+        entry = IndexEntry.from_stat(path, oid, stat, is_executable)
 
         self.discard_conflicts(entry)
 
         self.entries[str(entry.path)] = entry
 
+    def add_entries(self, entries: List[IndexEntry]) -> None:
+        # same as add_entry for every entry, but conflicts are resolved in
+        # a single pass over the index instead of one pass per entry
+        new_paths = set(entry.path for entry in entries)
+        new_parents: Set[str] = set()
+
+        for new_path in new_paths:
+            separator = new_path.rfind('/')
+
+            while separator != -1:
+                new_parents.add(new_path[:separator])
+                separator = new_path.rfind('/', 0, separator)
+
+        for key in list(self.entries):
+            if key in new_parents:
+                del self.entries[key]
+
+                continue
+
+            separator = key.rfind('/')
+
+            while separator != -1:
+                if key[:separator] in new_paths:
+                    del self.entries[key]
+
+                    break
+
+                separator = key.rfind('/', 0, separator)
+
+        for entry in entries:
+            self.entries[entry.path] = entry
+
     def encode(self) -> bytes:
         signature = b'DIRC'
         version = 2
-        data = \
+        header = \
             signature + \
             version.to_bytes(4, 'big') + \
             len(self.entries).to_bytes(4, 'big')
-        
-        for entry_key in self.entries:
-            data += self.entries[entry_key].encode()
+        data = header + b''.join(
+            self.entries[entry_key].encode() for entry_key in self.entries
+        )
 
-        checksum = bytes.fromhex(hashlib.sha1(data).hexdigest())
+        checksum = bytes.fromhex(get_hash_algorithm().hexdigest(data))
 
         return data + checksum
 
@@ -286,7 +411,7 @@ class Index:
 
     def write(self) -> None:
         encoded_data = self.encode()
-        temp_path = self.index_path.parent.joinpath('.index.tmp')
+        temp_path = self.index_path.parent.joinpath(f'.{self.index_path.name}.tmp')
 
         try:
             temp_path.parent.mkdir(parents=True, exist_ok=True)
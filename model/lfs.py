@@ -0,0 +1,173 @@
+from __future__ import annotations
+
+import hashlib
+import os
+import shutil
+
+from pathlib import Path
+from typing import BinaryIO, Tuple, Union
+
+# same pointer format as git-lfs, so pointers stay readable by other tools
+POINTER_VERSION = 'https://git-lfs.github.com/spec/v1'
+POINTER_MAX_SIZE = 200
+
+COPY_BLOCK_SIZE = 1 << 20
+
+
+class LfsPointer:
+    """Small blob committed in place of a large file, naming its content
+    in the large-file store by sha256 and size.
+    """
+
+    @staticmethod
+    def parse(data: bytes) -> Union[LfsPointer, None]:
+        if len(data) > POINTER_MAX_SIZE or not data.startswith(b'version '):
+            return None
+
+        try:
+            lines = data.decode('utf-8').splitlines()
+        except UnicodeDecodeError:
+            return None
+
+        if len(lines) != 3 or lines[0] != f'version {POINTER_VERSION}' \
+           or not lines[1].startswith('oid sha256:') or not lines[2].startswith('size '):
+            return None
+
+        oid = lines[1][len('oid sha256:'):]
+        size = lines[2][len('size '):]
+
+        if len(oid) != 64 or not size.isdigit():
+            return None
+
+        return LfsPointer(oid, int(size))
+
+    def __init__(self, oid: str, size: int):
+        self.oid = oid
+        self.size = size
+
+    def encode(self) -> bytes:
+        return f'version {POINTER_VERSION}\noid sha256:{self.oid}\nsize {self.size}\n'.encode('utf-8')
+
+
+def hash_file(path: Path) -> Tuple[str, int]:
+    file_hash = hashlib.sha256()
+    size = 0
+
+    with open(str(path), 'rb') as file:
+        while True:
+            block = file.read(COPY_BLOCK_SIZE)
+
+            if not block:
+                break
+
+            file_hash.update(block)
+            size += len(block)
+
+    return file_hash.hexdigest(), size
+
+
+def copy_file_data(source: BinaryIO, destination: BinaryIO) -> None:
+    """Copies inside the kernel with copy_file_range where available, which
+    also shares extents on copy on write file systems.
+    """
+    # only Linux has it, and only from Python 3.8
+    copy_file_range = getattr(os, 'copy_file_range', None)
+
+    if copy_file_range is not None:
+        try:
+            while copy_file_range(source.fileno(), destination.fileno(), COPY_BLOCK_SIZE * 16) > 0:
+                pass
+
+            return
+        except OSError:
+            # not supported between these file systems, nothing was copied
+            # if it fails on the first call
+            source.seek(0)
+            destination.seek(0)
+            destination.truncate()
+
+    shutil.copyfileobj(source, destination, COPY_BLOCK_SIZE)
+
+
+class LfsStore:
+    """Large files kept whole and uncompressed in .gitgud/lfs, addressed
+    by the sha256 of their content.
+    """
+
+    def __init__(self, storage_path: Path):
+        self.lfs_path = storage_path.joinpath('lfs')
+
+    def get_object_path(self, oid: str) -> Path:
+        return self.lfs_path.joinpath(oid[:2], oid[2:])
+
+    def contains(self, oid: str) -> bool:
+        return self.get_object_path(oid).is_file()
+
+    def store_file(self, path: Path) -> LfsPointer:
+        oid, size = hash_file(path)
+
+        if self.contains(oid):
+            return LfsPointer(oid, size)
+
+        object_path = self.get_object_path(oid)
+        temp_object_path = object_path.parent.joinpath(f'temp_obj_{object_path.name}')
+        object_path.parent.mkdir(parents=True, exist_ok=True)
+        copy_hash = hashlib.sha256()
+
+        # hashed again while copying, the file may change between the passes
+        with open(str(path), 'rb') as source, open(str(temp_object_path), 'wb') as destination:
+            while True:
+                block = source.read(COPY_BLOCK_SIZE)
+
+                if not block:
+                    break
+
+                copy_hash.update(block)
+                destination.write(block)
+
+        if copy_hash.hexdigest() != oid:
+            temp_object_path.unlink()
+
+            raise Exception(f'fatal: {path} changed while it was added')
+
+        temp_object_path.chmod(0o444)
+        temp_object_path.rename(object_path)
+
+        return LfsPointer(oid, size)
+
+    def store_data(self, data: bytes) -> LfsPointer:
+        oid = hashlib.sha256(data).hexdigest()
+
+        if self.contains(oid):
+            return LfsPointer(oid, len(data))
+
+        object_path = self.get_object_path(oid)
+        temp_object_path = object_path.parent.joinpath(f'temp_obj_{object_path.name}')
+        object_path.parent.mkdir(parents=True, exist_ok=True)
+        temp_object_path.write_bytes(data)
+        temp_object_path.chmod(0o444)
+        temp_object_path.rename(object_path)
+
+        return LfsPointer(oid, len(data))
+
+    def restore_file(self, pointer: LfsPointer, path: Path) -> bool:
+        """Writes the content of the pointer to path, False if the store
+        does not have it.
+        """
+        object_path = self.get_object_path(pointer.oid)
+
+        try:
+            source = open(str(object_path), 'rb')
+        except FileNotFoundError:
+            return False
+
+        with source, open(str(path), 'wb') as destination:
+            copy_file_data(source, destination)
+
+        return True
+
+    def open_file(self, pointer: LfsPointer) -> Union[BinaryIO, None]:
+        try:
+            return open(str(self.get_object_path(pointer.oid)), 'rb')
+        except FileNotFoundError:
+            return None
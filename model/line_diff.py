@@ -0,0 +1,313 @@
+from __future__ import annotations
+
+from typing import Dict, Iterator, List, Sequence, Tuple, Union
+
+# tag ('equal', 'delete', 'insert'), old start, old end, new start, new end
+Opcode = Tuple[str, int, int, int, int]
+
+BINARY_SNIFF_LEN = 8000
+
+
+def is_binary(data: bytes) -> bool:
+    # same heuristic as git, a NUL byte in the first few kilobytes
+    return b'\x00' in data[:BINARY_SNIFF_LEN]
+
+
+def hash_lines(
+    old_lines: Sequence[bytes],
+    new_lines: Sequence[bytes],
+) -> Tuple[List[int], List[int]]:
+    """Maps every distinct line to an integer once, so the diff compares
+    ints instead of byte strings.
+    """
+    line_ids: Dict[bytes, int] = {}
+    old_ids = [line_ids.setdefault(line, len(line_ids)) for line in old_lines]
+    new_ids = [line_ids.setdefault(line, len(line_ids)) for line in new_lines]
+
+    return old_ids, new_ids
+
+
+def find_middle_snake(
+    old: List[int],
+    old_lo: int,
+    old_hi: int,
+    new: List[int],
+    new_lo: int,
+    new_hi: int,
+) -> Tuple[int, int, int, int]:
+    """Middle snake of Myers' linear space refinement.
+
+    Runs the greedy forward and backward searches at the same time until
+    they overlap. Only two vectors of size O(N + M) are kept around.
+    """
+    n = old_hi - old_lo
+    m = new_hi - new_lo
+    delta = n - m
+    is_odd = delta & 1
+    max_d = (n + m + 1) // 2
+    offset = max_d + 1
+    forward = [0] * (2 * max_d + 3)
+    backward = [0] * (2 * max_d + 3)
+
+    for d in range(max_d + 1):
+        for k in range(-d, d + 1, 2):
+            if k == -d or (k != d and forward[offset + k - 1] < forward[offset + k + 1]):
+                x = forward[offset + k + 1]
+            else:
+                x = forward[offset + k - 1] + 1
+
+            y = x - k
+            start_x, start_y = x, y
+
+            while x < n and y < m and old[old_lo + x] == new[new_lo + y]:
+                x += 1
+                y += 1
+
+            forward[offset + k] = x
+
+            if is_odd and delta - (d - 1) <= k <= delta + (d - 1):
+                if x + backward[offset + delta - k] >= n:
+                    return old_lo + start_x, new_lo + start_y, old_lo + x, new_lo + y
+
+        for k in range(-d, d + 1, 2):
+            if k == -d or (k != d and backward[offset + k - 1] < backward[offset + k + 1]):
+                x = backward[offset + k + 1]
+            else:
+                x = backward[offset + k - 1] + 1
+
+            y = x - k
+            start_x, start_y = x, y
+
+            while x < n and y < m and old[old_hi - 1 - x] == new[new_hi - 1 - y]:
+                x += 1
+                y += 1
+
+            backward[offset + k] = x
+
+            if not is_odd and -d <= delta - k <= d:
+                if x + forward[offset + delta - k] >= n:
+                    return old_hi - x, new_hi - y, old_hi - start_x, new_hi - start_y
+
+    raise Exception('fatal: No middle snake found')
+
+
+def diff_ranges(
+    old: List[int],
+    old_lo: int,
+    old_hi: int,
+    new: List[int],
+    new_lo: int,
+    new_hi: int,
+) -> Iterator[Opcode]:
+    """Yields opcodes for the two ranges in order, as they are found."""
+    prefix_end_old, prefix_end_new = old_lo, new_lo
+
+    while prefix_end_old < old_hi and prefix_end_new < new_hi \
+          and old[prefix_end_old] == new[prefix_end_new]:
+        prefix_end_old += 1
+        prefix_end_new += 1
+
+    suffix_start_old, suffix_start_new = old_hi, new_hi
+
+    while suffix_start_old > prefix_end_old and suffix_start_new > prefix_end_new \
+          and old[suffix_start_old - 1] == new[suffix_start_new - 1]:
+        suffix_start_old -= 1
+        suffix_start_new -= 1
+
+    if prefix_end_old > old_lo:
+        yield 'equal', old_lo, prefix_end_old, new_lo, prefix_end_new
+
+    if prefix_end_old == suffix_start_old:
+        if prefix_end_new < suffix_start_new:
+            yield 'insert', prefix_end_old, prefix_end_old, prefix_end_new, suffix_start_new
+    elif prefix_end_new == suffix_start_new:
+        yield 'delete', prefix_end_old, suffix_start_old, prefix_end_new, prefix_end_new
+    else:
+        snake_old, snake_new, snake_old_end, snake_new_end = find_middle_snake(
+            old, prefix_end_old, suffix_start_old,
+            new, prefix_end_new, suffix_start_new,
+        )
+
+        yield from diff_ranges(old, prefix_end_old, snake_old, new, prefix_end_new, snake_new)
+
+        if snake_old_end > snake_old:
+            yield 'equal', snake_old, snake_old_end, snake_new, snake_new_end
+
+        yield from diff_ranges(old, snake_old_end, suffix_start_old, new, snake_new_end, suffix_start_new)
+
+    if suffix_start_old < old_hi:
+        yield 'equal', suffix_start_old, old_hi, suffix_start_new, new_hi
+
+
+def split_change(old_start: int, old_end: int, new_start: int, new_end: int) -> Iterator[Opcode]:
+    if old_end > old_start:
+        yield 'delete', old_start, old_end, new_start, new_start
+
+    if new_end > new_start:
+        yield 'insert', old_end, old_end, new_start, new_end
+
+
+def diff_lines(old_lines: Sequence[bytes], new_lines: Sequence[bytes]) -> Iterator[Opcode]:
+    """Streams opcodes covering both sequences. Adjacent equal runs are
+    merged, and so are adjacent changes, which come out as a delete of
+    the old lines followed by an insert of the new ones.
+    """
+    old_ids, new_ids = hash_lines(old_lines, new_lines)
+    equal: Union[Opcode, None] = None
+    change: Union[Tuple[int, int, int, int], None] = None
+
+    for tag, old_start, old_end, new_start, new_end in diff_ranges(
+        old_ids, 0, len(old_ids), new_ids, 0, len(new_ids),
+    ):
+        if tag == 'equal':
+            if change is not None:
+                yield from split_change(*change)
+                change = None
+
+            if equal is None:
+                equal = (tag, old_start, old_end, new_start, new_end)
+            else:
+                equal = (tag, equal[1], old_end, equal[3], new_end)
+        else:
+            if equal is not None:
+                yield equal
+                equal = None
+
+            if change is None:
+                change = (old_start, old_end, new_start, new_end)
+            else:
+                change = (change[0], old_end, change[2], new_end)
+
+    if change is not None:
+        yield from split_change(*change)
+
+    if equal is not None:
+        yield equal
+
+
+def group_opcodes(opcodes: Iterator[Opcode], context: int = 3) -> Iterator[List[Opcode]]:
+    """Groups opcodes into hunks with at most `context` equal lines around
+    each change, yielding every hunk as soon as it is complete.
+    """
+    group: List[Opcode] = []
+    leading: List[Opcode] = []
+
+    for tag, old_start, old_end, new_start, new_end in opcodes:
+        if tag != 'equal':
+            if not group:
+                group.extend(leading)
+
+            group.append((tag, old_start, old_end, new_start, new_end))
+
+            continue
+
+        if group and old_end - old_start > 2 * context:
+            group.append((tag, old_start, old_start + context, new_start, new_start + context))
+
+            yield group
+
+            group = []
+
+        if group:
+            group.append((tag, old_start, old_end, new_start, new_end))
+        else:
+            leading = [(
+                tag,
+                max(old_start, old_end - context),
+                old_end,
+                max(new_start, new_end - context),
+                new_end,
+            )]
+
+    if group:
+        tag, old_start, old_end, new_start, new_end = group[-1]
+
+        if tag == 'equal':
+            group[-1] = (tag, old_start, min(old_end, old_start + context), new_start, min(new_end, new_start + context))
+
+        yield group
+
+
+def split_lines(data: bytes) -> List[bytes]:
+    # only \n ends a line, splitlines would also split on \r and others
+    lines = [line + b'\n' for line in data.split(b'\n')]
+    lines[-1] = lines[-1][:-1]
+
+    return lines if lines[-1] else lines[:-1]
+
+
+def format_range(start: int, end: int) -> str:
+    length = end - start
+
+    if length == 1:
+        return f'{start + 1}'
+
+    if length == 0:
+        return f'{start},0'
+
+    return f'{start + 1},{length}'
+
+
+def format_line(prefix: bytes, line: bytes) -> bytes:
+    if line.endswith(b'\n'):
+        return prefix + line
+
+    return prefix + line + b'\n\\ No newline at end of file\n'
+
+
+def unified_diff(
+    old_data: bytes,
+    new_data: bytes,
+    old_label: str,
+    new_label: str,
+    context: int = 3,
+) -> Iterator[bytes]:
+    """Streams a unified diff of two blobs, hunk by hunk."""
+    if old_data == new_data:
+        return
+
+    yield f'--- {old_label}\n'.encode('utf-8')
+    yield f'+++ {new_label}\n'.encode('utf-8')
+
+    if is_binary(old_data) or is_binary(new_data):
+        yield b'Binary files differ\n'
+
+        return
+
+    old_lines = split_lines(old_data)
+    new_lines = split_lines(new_data)
+
+    for group in group_opcodes(diff_lines(old_lines, new_lines), context):
+        old_range = format_range(group[0][1], group[-1][2])
+        new_range = format_range(group[0][3], group[-1][4])
+        hunk_lines = [f'@@ -{old_range} +{new_range} @@\n'.encode('utf-8')]
+
+        for tag, old_start, old_end, new_start, new_end in group:
+            if tag == 'equal':
+                hunk_lines.extend(format_line(b' ', line) for line in old_lines[old_start:old_end])
+            elif tag == 'delete':
+                hunk_lines.extend(format_line(b'-', line) for line in old_lines[old_start:old_end])
+            else:
+                hunk_lines.extend(format_line(b'+', line) for line in new_lines[new_start:new_end])
+
+        yield b''.join(hunk_lines)
+
+
+def count_changes(old_data: bytes, new_data: bytes) -> Tuple[int, int]:
+    """Number of inserted and deleted lines, (0, 0) for binary content."""
+    if old_data == new_data or is_binary(old_data) or is_binary(new_data):
+        return 0, 0
+
+    insertions = 0
+    deletions = 0
+
+    for tag, old_start, old_end, new_start, new_end in diff_lines(
+        split_lines(old_data),
+        split_lines(new_data),
+    ):
+        if tag == 'insert':
+            insertions += new_end - new_start
+        elif tag == 'delete':
+            deletions += old_end - old_start
+
+    return insertions, deletions
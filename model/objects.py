@@ -1,12 +1,23 @@
 from __future__ import annotations
 
-import hashlib
-import pytz
+import struct
 
-from datetime import datetime
+from datetime import datetime, timedelta, timezone
 from pathlib import Path
 from typing import Dict, List, Tuple, Union
 
+from model.hashing import get_hash_algorithm
+
+
+def parse_utc_offset(offset: str) -> timezone:
+    # '+HHMM' or '-HHMM' like git
+    if len(offset) != 5 or offset[0] not in '+-' or not offset[1:].isdigit():
+        raise Exception(f'fatal: Invalid time zone offset {offset}')
+
+    minutes = int(offset[1:3]) * 60 + int(offset[3:])
+
+    return timezone(timedelta(minutes=-minutes if offset[0] == '-' else minutes))
+
 
 class Object:
     @staticmethod
@@ -27,7 +38,7 @@ class Object:
         type = split_header[0].decode('utf-8')
         len_of_data = int(split_header[1].decode('utf-8'))
 
-        if type not in ['tree', 'blob', 'commit']:
+        if type not in ['tree', 'blob', 'commit', 'manifest']:
             raise Exception('fatal: Invalid object type in header')
 
         return {'type': type, 'len_of_data': len_of_data}
@@ -48,7 +59,7 @@ class Object:
         pass
 
     def get_oid(self) -> str:
-        return hashlib.sha1(self.encode()).hexdigest()
+        return get_hash_algorithm().hexdigest(self.encode())
 
 
 class Blob(Object):
@@ -152,7 +163,7 @@ class TreeNodeEntry:
     def decode(encoded_data: bytes) -> TreeNodeEntry:
         split_data = encoded_data.split(b'\x00', 1)
 
-        if len(split_data) != 2 or len(split_data[1]) != 20:
+        if len(split_data) != 2 or len(split_data[1]) != get_hash_algorithm().digest_size:
             raise Exception('fatal: Invalid byte sequence')
 
         [mode_bytes, name_bytes] = split_data[0].split(b' ')
@@ -217,29 +228,31 @@ class TreeNode(Object):
         if header['type'] != 'tree':
             raise Exception('fatal: Invalid data')
 
+        if len(split_data[1]) != header['len_of_data']:
+            raise Exception('fatal: length doesn\'t match')
+
+        return TreeNode.decode_entries(split_data[1])
+
+    @staticmethod
+    def decode_entries(encoded_entries: bytes) -> TreeNode:
         ptr = 0
-        encoded_entries = split_data[1]
-        actual_len_of_data = 0
+        digest_size = get_hash_algorithm().digest_size
         entries: Dict[str, TreeNodeEntry] = {}
 
         while ptr < len(encoded_entries):
             split_encoded_entry = encoded_entries[ptr:].split(b'\x00', 1)
 
-            if len(split_encoded_entry) != 2 or len(split_encoded_entry[1]) < 20:
+            if len(split_encoded_entry) != 2 or len(split_encoded_entry[1]) < digest_size:
                 raise Exception('fatal: Invalid data')
 
-            entry_bytes = b'\x00'.join([split_encoded_entry[0], split_encoded_entry[1][:20]])
+            entry_bytes = b'\x00'.join([split_encoded_entry[0], split_encoded_entry[1][:digest_size]])
             entry = TreeNodeEntry.decode(entry_bytes)
             len_of_encoded_entry = len(entry_bytes)     
    
             entries[entry.name] = entry
 
-            actual_len_of_data += len(entry_bytes)
             ptr += len_of_encoded_entry
 
-        if actual_len_of_data != header['len_of_data']:
-            raise Exception('fatal: length doesn\'t match')
-
         return TreeNode(entries)
 
     def add(self, entry: TreeNodeEntry, path_parts: Tuple[str, ...]):
@@ -297,7 +310,10 @@ class Commit(Object):
         self.email = email
         self.message = message
         self.tree_oid = tree_oid
-        self.timestamp = pytz.utc.localize(date).strftime('%s %z')
+        # naive dates are local time and stored as UTC, aware ones keep
+        # their offset
+        offset = '+0000' if date.tzinfo is None else date.strftime('%z')
+        self.timestamp = f'{int(date.timestamp())} {offset}'
         self.parent = parent
 
     def __eq__(self, other):
@@ -373,10 +389,11 @@ class Commit(Object):
         message = ''
         parent = ''
 
+        hex_length = get_hash_algorithm().hex_length
         tree_line_split = split_content[0].split(b' ')
 
         if len(tree_line_split) != 2 or tree_line_split[0] != b'tree' or \
-           len(tree_line_split[1]) != 40:
+           len(tree_line_split[1]) != hex_length:
             raise Exception('fatal: Invalid tree line in commit') 
         
         tree_oid = tree_line_split[1].decode('utf-8')
@@ -385,7 +402,7 @@ class Commit(Object):
             parent_line_split = split_content[1].split(b' ')
 
             if len(parent_line_split) != 2 or parent_line_split[0] != b'parent' or \
-               len(parent_line_split[1]) != 40:
+               len(parent_line_split[1]) != hex_length:
                 raise Exception('fatal: Invalid parent line in commit') 
 
             parent = parent_line_split[1].decode('utf-8')
@@ -405,7 +422,10 @@ class Commit(Object):
         name = author_data[:email_start - 2].decode('utf-8')
         email = author_data[email_start:timestamp_start - 2].decode('utf-8')
         timestamp = author_data[timestamp_start:].decode('utf-8')
-        timestamp_int = int(timestamp.split(' ')[0])
+        timestamp_parts = timestamp.split(' ')
+        timestamp_int = int(timestamp_parts[0])
+        date = datetime.fromtimestamp(timestamp_int) if len(timestamp_parts) < 2 \
+            else datetime.fromtimestamp(timestamp_int, parse_utc_offset(timestamp_parts[1]))
 
         message = split_content[4].decode('utf-8')
 
@@ -414,6 +434,61 @@ class Commit(Object):
             email,
             message,
             tree_oid,
-            datetime.fromtimestamp(timestamp_int),
+            date,
             parent
-        )
\ No newline at end of file
+        )
+
+
+class BlobManifest(Object):
+    """Stored in place of a large blob, at the oid of that blob.
+
+    Lists the blobs holding the content defined chunks of the data, in
+    order, so an edit only adds the chunks around it.
+    """
+
+    @staticmethod
+    def get_chunk_format() -> struct.Struct:
+        # chunk oid, chunk size
+        return struct.Struct(f'>{get_hash_algorithm().digest_size}sI')
+
+    @staticmethod
+    def decode(encoded_data: bytes) -> BlobManifest:
+        split_data = encoded_data.split(b'\x00', 1)
+        header = Object.decode_header(split_data[0])
+
+        if header['type'] != 'manifest':
+            raise Exception('fatal: Invalid manifest data')
+
+        data = split_data[1]
+        chunk_format = BlobManifest.get_chunk_format()
+
+        if len(data) != header['len_of_data'] or len(data) % chunk_format.size != 0:
+            raise Exception('fatal: Invalid manifest length')
+
+        chunks = [
+            (oid_bytes.hex(), size)
+            for oid_bytes, size in chunk_format.iter_unpack(data)
+        ]
+
+        return BlobManifest(chunks)
+
+    def __init__(self, chunks: List[Tuple[str, int]]):
+        super().__init__('manifest')
+
+        self.chunks = chunks
+
+    @property
+    def size(self) -> int:
+        return sum(size for _, size in self.chunks)
+
+    def encode(self) -> bytes:
+        if self.cached_encoded_data == None:
+            chunk_format = BlobManifest.get_chunk_format()
+            self.cached_encoded_data = self.encode_with_header(b''.join(
+                chunk_format.pack(bytes.fromhex(oid), size)
+                for oid, size in self.chunks
+            ))
+
+        assert not self.cached_encoded_data is None
+
+        return self.cached_encoded_data
@@ -0,0 +1,194 @@
+from __future__ import annotations
+
+import bisect
+import os
+import struct
+import time
+
+from pathlib import Path
+from typing import BinaryIO, List, Tuple, Union
+
+from model.hashing import get_hash_algorithm
+
+# abbreviations shorter than this are too likely to be ambiguous
+MIN_PREFIX_LENGTH = 4
+
+OID_INDEX_MAGIC = b'GOID'
+OID_INDEX_VERSION = 1
+HEADER_FORMAT = struct.Struct('>4sII')
+# mtime of the fanout directory, position of its first oid, number of oids
+FANOUT_FORMAT = struct.Struct('>qII')
+FANOUT_SIZE = 256
+FANOUT_TABLE_SIZE = FANOUT_FORMAT.size * FANOUT_SIZE
+
+# directories modified this recently could change again within the same
+# mtime tick, they are rescanned on the next lookup
+RACY_MTIME_NS = 2 * 10 ** 9
+
+FanoutEntry = Tuple[int, int, int]
+
+
+# sorted oids per fanout directory, each fanout is listed again only when
+# its mtime changed
+class OidIndex:
+    def __init__(self, storage_path: Path):
+        self.index_path = storage_path.joinpath('oid-index')
+        self.objects_path = storage_path.joinpath('objects')
+
+    def get_fanout_mtime(self, fanout: int) -> int:
+        try:
+            return os.stat(self.objects_path.joinpath(f'{fanout:02x}')).st_mtime_ns
+        except FileNotFoundError:
+            return 0
+
+    def list_fanout_oids(self, fanout: int) -> Tuple[int, List[bytes]]:
+        """mtime of the fanout directory and its sorted oids, the mtime is
+        taken first so objects added while listing make it stale.
+        """
+        dir_name = f'{fanout:02x}'
+        mtime_ns = self.get_fanout_mtime(fanout)
+        hex_length = get_hash_algorithm().hex_length
+        oids: List[bytes] = []
+
+        try:
+            file_names = os.listdir(self.objects_path.joinpath(dir_name))
+        except FileNotFoundError:
+            return 0, oids
+
+        for file_name in file_names:
+            if len(file_name) + 2 != hex_length or file_name.startswith('temp_obj_'):
+                continue
+
+            try:
+                oids.append(bytes.fromhex(dir_name + file_name))
+            except ValueError:
+                continue
+
+        if time.time_ns() - mtime_ns < RACY_MTIME_NS:
+            mtime_ns = -1
+
+        return mtime_ns, sorted(oids)
+
+    def read_fanout_table(self, file: BinaryIO, digest_size: int) -> Union[List[FanoutEntry], None]:
+        header = file.read(HEADER_FORMAT.size)
+
+        if len(header) != HEADER_FORMAT.size \
+           or HEADER_FORMAT.unpack(header) != (OID_INDEX_MAGIC, OID_INDEX_VERSION, digest_size):
+            return None
+
+        table_data = file.read(FANOUT_TABLE_SIZE)
+
+        if len(table_data) != FANOUT_TABLE_SIZE:
+            return None
+
+        return [(mtime, start, count) for mtime, start, count in FANOUT_FORMAT.iter_unpack(table_data)]
+
+    def read_index(self) -> Union[Tuple[List[FanoutEntry], bytes], None]:
+        digest_size = get_hash_algorithm().digest_size
+
+        try:
+            with open(str(self.index_path), 'rb') as file:
+                fanout_table = self.read_fanout_table(file, digest_size)
+
+                if fanout_table is None:
+                    return None
+
+                return fanout_table, file.read()
+        except FileNotFoundError:
+            return None
+
+    def write_index(self, fanout_oids: List[Tuple[int, List[bytes]]]) -> None:
+        digest_size = get_hash_algorithm().digest_size
+        fanout_table = b''
+        position = 0
+
+        for mtime_ns, oids in fanout_oids:
+            fanout_table += FANOUT_FORMAT.pack(mtime_ns, position, len(oids))
+            position += len(oids)
+
+        temp_index_path = self.index_path.parent.joinpath('temp_oid-index')
+
+        try:
+            with open(str(temp_index_path), 'wb') as file:
+                file.write(HEADER_FORMAT.pack(OID_INDEX_MAGIC, OID_INDEX_VERSION, digest_size))
+                file.write(fanout_table)
+
+                for _, oids in fanout_oids:
+                    file.write(b''.join(oids))
+
+            temp_index_path.replace(self.index_path)
+        except OSError:
+            # the index is only an optimisation, read only stores still
+            # resolve abbreviations, they just list the directory each time
+            pass
+
+    def update(self, fanout: int) -> List[bytes]:
+        """Lists the stale fanout directory again and rewrites the index, a
+        missing or outdated index is rebuilt from every directory.
+        """
+        digest_size = get_hash_algorithm().digest_size
+        index = self.read_index()
+        fanout_oids: List[Tuple[int, List[bytes]]] = []
+
+        if index is None:
+            fanout_oids = [self.list_fanout_oids(current_fanout) for current_fanout in range(FANOUT_SIZE)]
+            self.write_index(fanout_oids)
+
+            return fanout_oids[fanout][1]
+
+        for current_fanout in range(FANOUT_SIZE):
+            mtime_ns, position, count = index[0][current_fanout]
+            oids_data = index[1][position * digest_size:(position + count) * digest_size]
+            fanout_oids.append((
+                mtime_ns,
+                [oids_data[offset:offset + digest_size] for offset in range(0, len(oids_data), digest_size)],
+            ))
+
+        listed_fanout = self.list_fanout_oids(fanout)
+
+        # a racy directory is listed on every lookup until it settles, the
+        # index is only rewritten once something actually changed
+        if listed_fanout != fanout_oids[fanout]:
+            fanout_oids[fanout] = listed_fanout
+            self.write_index(fanout_oids)
+
+        return listed_fanout[1]
+
+    def read_fanout_oids(self, fanout: int) -> List[bytes]:
+        digest_size = get_hash_algorithm().digest_size
+
+        try:
+            with open(str(self.index_path), 'rb') as file:
+                fanout_table = self.read_fanout_table(file, digest_size)
+
+                if fanout_table is not None and fanout_table[fanout][0] == self.get_fanout_mtime(fanout):
+                    _, position, count = fanout_table[fanout]
+                    file.seek(HEADER_FORMAT.size + FANOUT_TABLE_SIZE + position * digest_size)
+                    oids_data = file.read(count * digest_size)
+
+                    return [oids_data[offset:offset + digest_size] for offset in range(0, len(oids_data), digest_size)]
+        except FileNotFoundError:
+            pass
+
+        return self.update(fanout)
+
+    def find(self, prefix: str) -> List[str]:
+        """Every oid starting with prefix, found by binary search over the
+        sorted oids of its fanout directory.
+        """
+        prefix = prefix.lower()
+        oids = self.read_fanout_oids(int(prefix[:2], 16))
+        # an odd number of hex digits can't be converted to bytes, searching
+        # from the prefix padded with zeros finds the same first match
+        start = bisect.bisect_left(oids, bytes.fromhex(prefix.ljust(len(prefix) + len(prefix) % 2, '0')))
+        matches: List[str] = []
+
+        for oid in oids[start:]:
+            oid_hex = oid.hex()
+
+            if not oid_hex.startswith(prefix):
+                break
+
+            matches.append(oid_hex)
+
+        return matches
@@ -1,17 +1,57 @@
-import zlib
+from __future__ import annotations
+
+import itertools
 import os
+import string
 
+from functools import cached_property
 from pathlib import Path
-from typing import List, Union
-
-from model.index import Index
-from model.objects import Commit, Object, TreeNode, Blob, TreeNodeEntry, TreeNode
+from stat import S_ISDIR, S_ISREG
+from typing import TYPE_CHECKING, Dict, Iterable, Iterator, List, Set, Tuple, Union
+
+from model.compression import CODEC_AUTO, Compressor, decompress_object, read_object_header
+from model.config import Config
+from model.hashing import DEFAULT_HASH_ALGORITHM, get_hash_algorithm, set_hash_algorithm
+from model.ignore import IGNORE_FILE_NAME, GudIgnore
+from model.index import EXECUTABLE_MODE, Index, IndexEntry
+from model.objects import BlobManifest, Commit, Object, TreeNode, Blob, TreeNodeEntry, TreeNode
 from model.misc import RepoObjPath
+from model.status import StatCache, Status
+from model.sparse import SparseCheckout
+from model.tree_diff import PathFilter, diff_trees, read_tree_entries
+from model.walker import WorkingTreeWalker
+
+# features that most commands never touch are imported where they are used
+if TYPE_CHECKING:
+    from concurrent.futures import Future
+
+    from model.bloom import ChangedPathsFile
+    from model.fsmonitor import FsMonitorClient
+    from model.lfs import LfsStore
+    from model.oid_index import OidIndex
+    from model.repo_cache import ObjectCache, RepoCache
+
+# '<type> <size>\x00' always fits, large objects are never inflated past
+# their header
+OBJECT_HEADER_MAX_LEN = 64
+
+MANIFEST_PREFIX = b'manifest '
+
+# read_objects keeps this many reads in flight ahead of the consumer, zlib
+# and lzma release the GIL so the pool decompresses them in parallel
+READ_WORKERS = min(8, os.cpu_count() or 1)
+READ_AHEAD = 64
+
+# smaller batches are read inline, starting the threads costs more
+PARALLEL_READ_THRESHOLD = 8
 
 
 class Repo:
+    # set by gud daemon, which keeps repositories open between commands
+    repo_cache: Union[RepoCache, None] = None
+
     @staticmethod
-    def init_repo(path: Path):
+    def init_repo(path: Path, hash_algorithm: str = DEFAULT_HASH_ALGORITHM):
         path = path.resolve()
 
         storage_path = path.joinpath('.gitgud')
@@ -19,6 +59,9 @@ class Repo:
         if storage_path.is_dir():
             raise Exception('fatal: already a git repository')
 
+        # fails before anything is created for an unknown name
+        set_hash_algorithm(hash_algorithm)
+
         objects_to_create: List[RepoObjPath] = [
             RepoObjPath(storage_path.joinpath('objects'), 'dir'),
             RepoObjPath(storage_path.joinpath('ref'), 'dir'),
@@ -36,6 +79,9 @@ class Repo:
 
                 exit(1)
 
+        # fixed for the lifetime of the repository, every oid depends on it
+        storage_path.joinpath('config').write_text(f'core.hash = {hash_algorithm}\n', 'utf-8')
+
         print(f'Initialized empty git repository in {str(path)}')
 
     @staticmethod
@@ -45,6 +91,9 @@ class Repo:
 
         while current_path_obj != prev_path_obj:
             if current_path_obj.joinpath('.gitgud').is_dir():
+                if Repo.repo_cache is not None:
+                    return Repo.repo_cache.get(current_path_obj)
+
                 return Repo(current_path_obj)
             
             prev_path_obj = current_path_obj
@@ -56,6 +105,9 @@ class Repo:
         self.repo_path = path
         self.storage_path: Path = self.repo_path.resolve().joinpath('.gitgud')
         self.head_path: Path = self.storage_path.joinpath('HEAD')
+        self.config = Config.read_config(self.storage_path)
+        # repositories without the setting predate it and use sha1
+        self.hash_algorithm = set_hash_algorithm(self.config.get('core.hash', DEFAULT_HASH_ALGORITHM))
         self.index: Index = Index.read_index(self.storage_path.joinpath('index'))
 
         self.ignore: List[str] = [
@@ -66,9 +118,47 @@ class Repo:
             '.git',
         ]
 
+        self.gud_ignore = GudIgnore(str(self.repo_path), self.ignore)
+
         if not self.storage_path.is_dir(): 
             raise Exception('fatal: not a git repository (or any of the parent directories): .git')
 
+        self.sparse_checkout = SparseCheckout.read_sparse_checkout(self.storage_path)
+        self.compressor = Compressor(
+            self.config.get('compression.codec', CODEC_AUTO),
+            self.config.get_int('compression.level', -1),
+        )
+        # blobs of at least this size are stored in chunks, 0 turns it off
+        self.chunk_threshold = self.config.get_int('chunking.threshold', 0)
+        # files of at least this size go to the large-file store, 0 turns it off
+        self.lfs_threshold = self.config.get_int('lfs.threshold', 0)
+        # decompressed objects kept between commands by gud daemon
+        self.object_cache: Union[ObjectCache, None] = None
+
+    @cached_property
+    def lfs_store(self) -> LfsStore:
+        from model.lfs import LfsStore
+
+        return LfsStore(self.storage_path)
+
+    @cached_property
+    def oid_index(self) -> OidIndex:
+        from model.oid_index import OidIndex
+
+        return OidIndex(self.storage_path)
+
+    @cached_property
+    def changed_paths(self) -> ChangedPathsFile:
+        from model.bloom import ChangedPathsFile
+
+        return ChangedPathsFile(self.storage_path)
+
+    def get_path_filter(self) -> Union[PathFilter, None]:
+        if not self.sparse_checkout.is_enabled:
+            return None
+
+        return self.sparse_checkout.matches
+
     def read_head(self) -> str:
         try:
             head_content = self.head_path.read_text()
@@ -108,9 +198,15 @@ class Repo:
             raise Exception('fatal: cant write to HEAD')
 
     def write_object(self, object: Object) -> None:
-        encoded_data = object.encode()
-        object_id = object.get_oid()
-        compressed_encoded_data = zlib.compress(encoded_data)
+        if isinstance(object, Blob) and self.is_chunk_size(len(object.data)):
+            self.write_chunked_blob(object)
+
+            return
+
+        self.write_encoded_object(object.get_oid(), object.encode(), object.type)
+
+    def write_encoded_object(self, object_id: str, encoded_data: bytes, object_type: str) -> None:
+        compressed_encoded_data = self.compressor.compress(encoded_data)
         dir_name = object_id[0:2]
         file_name = object_id[2:]
         objects_path = self.storage_path.joinpath('objects').joinpath(dir_name)
@@ -125,7 +221,95 @@ class Repo:
 
             temp_object_path.rename(objects_path.joinpath(file_name))
         except: 
-            raise Exception(f'fatal: cannot write object with type {object.type} and oid {object.get_oid()}')
+            raise Exception(f'fatal: cannot write object with type {object_type} and oid {object_id}')
+
+    def write_encoded_objects(self, objects: Dict[str, Tuple[bytes, str]]) -> None:
+        """Writes (encoded data, type) by oid in one pass, every object
+        directory is created once instead of once per object.
+        """
+        objects_path = str(self.storage_path.joinpath('objects'))
+        object_dirs: Set[str] = set()
+
+        for object_id, (encoded_data, object_type) in objects.items():
+            dir_path = os.path.join(objects_path, object_id[0:2])
+            temp_object_path = os.path.join(dir_path, f'temp_obj_{object_id[2:]}')
+
+            try:
+                if dir_path not in object_dirs:
+                    os.makedirs(dir_path, exist_ok=True)
+                    object_dirs.add(dir_path)
+
+                with open(temp_object_path, 'wb') as file:
+                    file.write(self.compressor.compress(encoded_data))
+
+                os.rename(temp_object_path, os.path.join(dir_path, object_id[2:]))
+            except OSError:
+                raise Exception(f'fatal: cannot write object with type {object_type} and oid {object_id}')
+
+    def write_chunked_blob(self, blob: Blob) -> None:
+        """Stores the blob as content defined chunks plus a manifest at the
+        oid of the blob. Chunks that are already stored, like the unchanged
+        parts of an edited file, are not written again.
+        """
+        blob_oid = blob.get_oid()
+
+        if self.get_object_path(blob_oid).exists():
+            return
+
+        from model.chunking import split_chunks
+
+        chunks: List[Tuple[str, int]] = []
+
+        for chunk_data in split_chunks(blob.data):
+            chunk = Blob(chunk_data)
+            chunk_oid = chunk.get_oid()
+
+            if not self.get_object_path(chunk_oid).exists():
+                self.write_encoded_object(chunk_oid, chunk.encode(), chunk.type)
+
+            chunks.append((chunk_oid, len(chunk_data)))
+
+        manifest = BlobManifest(chunks)
+
+        self.write_encoded_object(blob_oid, manifest.encode(), manifest.type)
+
+    def list_object_oids(self) -> Iterator[str]:
+        with os.scandir(self.storage_path.joinpath('objects')) as object_dirs:
+            for object_dir in object_dirs:
+                if len(object_dir.name) != 2 or not object_dir.is_dir(follow_symlinks=False):
+                    continue
+
+                with os.scandir(object_dir.path) as object_files:
+                    for object_file in object_files:
+                        # leftovers of interrupted writes are not objects yet
+                        if not object_file.name.startswith('temp_obj_'):
+                            yield object_dir.name + object_file.name
+
+    def repack(self, compressor: Compressor) -> Tuple[int, int, int]:
+        """Rewrites every object file with another codec, returns the number
+        of objects and the total size before and after.
+        """
+        repacked_count = 0
+        old_size = 0
+        new_size = 0
+
+        for oid in list(self.list_object_oids()):
+            object_path = self.get_object_path(oid)
+            temp_object_path = object_path.parent.joinpath(f'temp_obj_{object_path.name}')
+            compressed_data = object_path.read_bytes()
+            recompressed_data = compressor.compress(decompress_object(compressed_data))
+
+            try:
+                temp_object_path.write_bytes(recompressed_data)
+                temp_object_path.replace(object_path)
+            except:
+                raise Exception(f'fatal: cannot rewrite object {oid}')
+
+            repacked_count += 1
+            old_size += len(compressed_data)
+            new_size += len(recompressed_data)
+
+        return repacked_count, old_size, new_size
 
     def read_blob(
         self,
@@ -134,7 +318,7 @@ class Repo:
         if len(blob_oid) == 0:
             return None
 
-        if len(blob_oid) != 40:
+        if len(blob_oid) != get_hash_algorithm().hex_length:
             raise Exception('fatal: Invalid blob_oid')
 
         try:
@@ -142,20 +326,58 @@ class Repo:
         except:
             raise Exception('fatal: Invalid blob_oid')
 
-        blob_dir = blob_oid[:2]
-        blob_file = blob_oid[2:]
-        blob_path = self.storage_path \
-                .joinpath('objects') \
-                .joinpath(blob_dir) \
-                .joinpath(blob_file)
-
         try:
-            blob_content = zlib.decompress(blob_path.read_bytes())
+            blob_content = self.load_object(blob_oid)
         except:
             raise Exception('fatal: Cannot open blob file')
 
+        if blob_content.startswith(MANIFEST_PREFIX):
+            return Blob(b''.join(self.read_manifest_chunks(BlobManifest.decode(blob_content))))
+
         return Blob.decode(blob_content)
 
+    def read_manifest_chunks(self, manifest: BlobManifest) -> Iterator[bytes]:
+        for chunk_oid, size in manifest.chunks:
+            chunk = self.read_blob(chunk_oid)
+
+            if chunk is None or len(chunk.data) != size:
+                raise Exception(f'fatal: Invalid blob chunk {chunk_oid}')
+
+            yield chunk.data
+
+    def read_blob_data(self, blob_oid: str) -> Iterator[bytes]:
+        """Content of a blob in pieces, one chunk at a time for blobs that
+        are stored as a manifest.
+        """
+        try:
+            blob_content = self.load_object(blob_oid)
+        except:
+            raise Exception('fatal: Cannot open blob file')
+
+        if blob_content.startswith(MANIFEST_PREFIX):
+            yield from self.read_manifest_chunks(BlobManifest.decode(blob_content))
+        else:
+            yield Blob.decode(blob_content).data
+
+    def read_blob_chunk_oids(self, blob_oid: str) -> List[str]:
+        """Oids of the chunks of a blob stored as a manifest, nothing for a
+        plain blob, whose content is never inflated past the header.
+        """
+        object_path = self.get_object_path(blob_oid)
+
+        try:
+            with open(str(object_path), 'rb') as file:
+                header = read_object_header(file, len(MANIFEST_PREFIX))
+        except OSError:
+            raise Exception(f'fatal: Cannot open object {blob_oid}')
+
+        if header != MANIFEST_PREFIX:
+            return []
+
+        manifest = BlobManifest.decode(decompress_object(object_path.read_bytes()))
+
+        return [chunk_oid for chunk_oid, _ in manifest.chunks]
+
     def read_commit(
         self,
         commit_oid: str,
@@ -163,7 +385,7 @@ class Repo:
         if len(commit_oid) == 0:
             return None
 
-        if len(commit_oid) != 40:
+        if len(commit_oid) != get_hash_algorithm().hex_length:
             raise Exception('fatal: Invalid commit_oid')
 
         try:
@@ -171,20 +393,232 @@ class Repo:
         except:
             raise Exception('fatal: Invalid commit_oid')
 
-        commit_dir = commit_oid[:2]
-        commit_file = commit_oid[2:]
-        commit_path = self.storage_path \
-                .joinpath('objects') \
-                .joinpath(commit_dir) \
-                .joinpath(commit_file)
-
         try:
-            commit_content = zlib.decompress(commit_path.read_bytes())
+            commit_content = self.load_object(commit_oid)
         except:
             raise Exception('fatal: Cannot open commit file')
 
         return Commit.decode(commit_content)
 
+    def resolve_oid(self, revision: str) -> str:
+        """Full oid of HEAD, of a full oid or of a unique abbreviation of at
+        least MIN_PREFIX_LENGTH hex digits.
+        """
+        if revision == 'HEAD':
+            return self.read_head()
+
+        hex_length = get_hash_algorithm().hex_length
+
+        if len(revision) == hex_length:
+            return revision
+
+        from model.oid_index import MIN_PREFIX_LENGTH
+
+        is_hex = all(character in string.hexdigits for character in revision)
+
+        if not is_hex or not MIN_PREFIX_LENGTH <= len(revision) < hex_length:
+            raise Exception(f'fatal: Unknown revision {revision}')
+
+        candidates = self.oid_index.find(revision)
+
+        if len(candidates) > 1:
+            # like git, an abbreviation naming a single commit is not
+            # ambiguous for commands that expect a commit
+            commit_oids = [oid for oid in candidates if self.read_object_info(oid)[0] == 'commit']
+
+            if len(commit_oids) == 1:
+                return commit_oids[0]
+
+            raise Exception(f'fatal: Ambiguous revision {revision}, candidates are {", ".join(candidates)}')
+
+        if not candidates:
+            raise Exception(f'fatal: Unknown revision {revision}')
+
+        return candidates[0]
+
+    def resolve_commit(self, revision: str) -> Commit:
+        commit_oid = self.resolve_oid(revision)
+        commit = self.read_commit(commit_oid)
+
+        if commit is None:
+            raise Exception(f'fatal: Unknown revision {revision}')
+
+        return commit
+
+    def write_changed_paths(self, commit: Commit) -> None:
+        """Records the Bloom filter of the paths commit changed against its
+        parent, for path limited logs.
+        """
+        from model.bloom import BloomFilter
+
+        parent_commit = self.read_commit(commit.parent)
+        parent_tree_oid = '' if parent_commit is None else parent_commit.tree_oid
+        changed_paths = [change.path for change in diff_trees(self, parent_tree_oid, commit.tree_oid)]
+
+        self.changed_paths.append(commit.get_oid(), BloomFilter.from_paths(changed_paths))
+
+    @staticmethod
+    def get_prefix_filter(prefixes: List[str]) -> PathFilter:
+        def should_include(relative_path: str, is_tree: bool) -> bool:
+            if Repo.is_under_prefixes(relative_path, prefixes):
+                return True
+
+            # trees leading to a prefix have to be read as well
+            return is_tree and any(prefix.startswith(relative_path + '/') for prefix in prefixes)
+
+        return should_include
+
+    def log_commits(self, paths: Union[List[str], None] = None) -> Iterator[Commit]:
+        """Commits from HEAD to the root, only those that changed something
+        under paths when paths are given.
+
+        The changed-path filters rule out most commits without reading a
+        tree, the rest are diffed against their parent to weed out false
+        positives. Commits without a filter are always diffed.
+        """
+        prefixes = self.normalize_prefixes([SparseCheckout.normalize_prefix(path) for path in paths or []])
+
+        if '' in prefixes:
+            prefixes = []
+
+        filters = self.changed_paths.read_filters() if prefixes else {}
+        should_include = self.get_prefix_filter(prefixes)
+        commit = self.read_commit(self.read_head())
+
+        while commit is not None:
+            parent_commit = self.read_commit(commit.parent)
+
+            if not prefixes:
+                yield commit
+            else:
+                bloom_filter = filters.get(commit.get_oid())
+
+                if bloom_filter is None or any(bloom_filter.might_contain(prefix) for prefix in prefixes):
+                    parent_tree_oid = '' if parent_commit is None else parent_commit.tree_oid
+                    changes = diff_trees(self, parent_tree_oid, commit.tree_oid, '', should_include)
+
+                    if next(changes, None) is not None:
+                        yield commit
+
+            commit = parent_commit
+
+    def load_object(self, oid: str) -> bytes:
+        """Decompressed content of an object file, served from the object
+        cache when there is one.
+        """
+        if self.object_cache is not None:
+            cached_data = self.object_cache.get(oid)
+
+            if cached_data is not None:
+                return cached_data
+
+        encoded_data = decompress_object(self.get_object_path(oid).read_bytes())
+
+        if self.object_cache is not None:
+            self.object_cache.put(oid, encoded_data)
+
+        return encoded_data
+
+    def get_object_path(self, oid: str) -> Path:
+        if len(oid) != get_hash_algorithm().hex_length:
+            raise Exception('fatal: Invalid oid')
+
+        try:
+            bytes.fromhex(oid)
+        except:
+            raise Exception('fatal: Invalid oid')
+
+        return self.storage_path \
+                .joinpath('objects') \
+                .joinpath(oid[:2]) \
+                .joinpath(oid[2:])
+
+    def read_object_info(self, oid: str) -> Tuple[str, int]:
+        """Type and size of an object, inflating only as much of the file
+        as the header needs.
+        """
+        object_path = self.get_object_path(oid)
+
+        try:
+            with open(str(object_path), 'rb') as file:
+                header = read_object_header(file, OBJECT_HEADER_MAX_LEN)
+        except OSError:
+            raise Exception(f'fatal: Cannot open object {oid}')
+
+        if b'\x00' not in header:
+            raise Exception(f'fatal: Invalid object header in {oid}')
+
+        decoded_header = Object.decode_header(header.split(b'\x00', 1)[0])
+
+        if decoded_header['type'] == 'manifest':
+            manifest = BlobManifest.decode(decompress_object(object_path.read_bytes()))
+
+            return 'blob', manifest.size
+
+        return decoded_header['type'], decoded_header['len_of_data']
+
+    def read_object(self, oid: str) -> Tuple[str, bytes]:
+        """Type and raw content of an object of any type."""
+        try:
+            encoded_data = self.load_object(oid)
+        except OSError:
+            raise Exception(f'fatal: Cannot open object {oid}')
+
+        split_data = encoded_data.split(b'\x00', 1)
+
+        if len(split_data) != 2:
+            raise Exception(f'fatal: Invalid object header in {oid}')
+
+        decoded_header = Object.decode_header(split_data[0])
+
+        if decoded_header['len_of_data'] != len(split_data[1]):
+            raise Exception(f'fatal: Invalid object length in {oid}')
+
+        if decoded_header['type'] == 'manifest':
+            return 'blob', b''.join(self.read_manifest_chunks(BlobManifest.decode(encoded_data)))
+
+        return decoded_header['type'], split_data[1]
+
+    def read_objects(self, oids: Iterable[str]) -> Iterator[Tuple[str, str, bytes]]:
+        """Yields (oid, type, raw content) of every object as soon as it is
+        read, in no particular order.
+
+        Requests are sorted by object path, so each fanout directory is
+        visited once, and are read and decompressed on a thread pool at
+        most READ_AHEAD objects ahead of the consumer.
+        """
+        sorted_oids = sorted(set(oids))
+
+        def read(oid: str) -> Tuple[str, str, bytes]:
+            object_type, data = self.read_object(oid)
+
+            return oid, object_type, data
+
+        if len(sorted_oids) < PARALLEL_READ_THRESHOLD or READ_WORKERS < 2:
+            for oid in sorted_oids:
+                yield read(oid)
+
+            return
+
+        from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+        pending_oids = iter(sorted_oids)
+
+        with ThreadPoolExecutor(max_workers=READ_WORKERS) as executor:
+            futures: Set[Future[Tuple[str, str, bytes]]] = set(
+                executor.submit(read, oid)
+                for oid in itertools.islice(pending_oids, READ_AHEAD)
+            )
+
+            while futures:
+                done, futures = wait(futures, return_when=FIRST_COMPLETED)
+
+                for oid in itertools.islice(pending_oids, len(done)):
+                    futures.add(executor.submit(read, oid))
+
+                for future in done:
+                    yield future.result()
+
     def read_tree(
         self,
         tree_oid: str,
@@ -192,10 +626,13 @@ class Repo:
         current_path: Path,
         should_include_all: bool,
     ) -> Union[TreeNode, None]:
+        """Reads a tree and the subtrees leading to paths_to_include, or all
+        of them. Subtrees are read one level at a time with read_objects.
+        """
         if len(tree_oid) == 0:
             return None
 
-        if len(tree_oid) != 40:
+        if len(tree_oid) != get_hash_algorithm().hex_length:
             raise Exception('fatal: Invalid tree_oid')
 
         try:
@@ -203,51 +640,52 @@ class Repo:
         except:
             raise Exception('fatal: Invalid tree_oid')
 
-        tree_dir = tree_oid[0:2]
-        tree_file = tree_oid[2:]
-
         try:
-            tree_file_path = self.storage_path \
-                .joinpath('objects') \
-                .joinpath(tree_dir) \
-                .joinpath(tree_file)
-
-            tree_content = zlib.decompress(tree_file_path.read_bytes())
+            tree_content = self.load_object(tree_oid)
         except:
             raise Exception('fatal: Cannot open tree file')
 
         tree_node = TreeNode.decode(tree_content)
+        level: List[Tuple[TreeNode, Path]] = [(tree_node, current_path)]
 
-        for entry_key in tree_node.entries:
-            entry = tree_node.entries[entry_key]
+        while level:
+            # the same subtree can appear in several places of the level
+            subtrees: Dict[str, List[Tuple[TreeNode, str, Path]]] = {}
 
-            if entry.type == 'tree':
-                should_include_entry = should_include_all
-                entry_full_path = current_path.joinpath(entry_key)
-
-                for path_to_include in paths_to_include:
-                    should_include_entry = should_include_entry or \
-                        str(path_to_include).startswith(
-                            str(entry_full_path)
-                        )
-
-                if should_include_entry:
-                    entry_tree_node = self.read_tree(
-                        entry.oid,
-                        paths_to_include,
-                        current_path.joinpath(entry_key),
-                        should_include_all
-                    )
+            for level_node, level_path in level:
+                for entry_key, entry in level_node.entries.items():
+                    if entry.type != 'tree':
+                        continue
+
+                    should_include_entry = should_include_all
+                    entry_full_path = level_path.joinpath(entry_key)
+
+                    for path_to_include in paths_to_include:
+                        should_include_entry = should_include_entry or \
+                            str(path_to_include).startswith(
+                                str(entry_full_path)
+                            )
+
+                    if should_include_entry:
+                        subtrees.setdefault(entry.oid, []).append((level_node, entry_key, entry_full_path))
+
+            level = []
 
-                    entry_tree_node_entry = TreeNodeEntry(
+            for oid, object_type, data in self.read_objects(subtrees):
+                if object_type != 'tree':
+                    raise Exception(f'fatal: Invalid tree {oid}')
+
+                for parent_node, entry_key, entry_full_path in subtrees[oid]:
+                    entry_tree_node = TreeNode.decode_entries(data)
+
+                    parent_node.entries[entry_key] = TreeNodeEntry(
                         Path(entry_key),
-                        entry.oid,
+                        oid,
                         'tree',
                         False,
                         entry_tree_node,
                     )
-
-                    tree_node.entries[entry_key] = entry_tree_node_entry
+                    level.append((entry_tree_node, entry_full_path))
 
         return tree_node
 
@@ -259,81 +697,586 @@ class Repo:
                 self.write_tree(tree.entries[entry_key].content)
 
     def add_to_index(self, paths: List[Path]):
-        resolved_paths: List[Path] = []
+        repo_path_str = str(self.repo_path)
+        prefixes: List[str] = []
 
         for path in paths:
             path_str = str(path)
-            repo_path_str = str(self.repo_path)
 
             if not path_str.startswith(repo_path_str):
                 raise Exception(f'fatal: Arg {path} is not a part of repo')
 
-            if path.is_dir():
-                resolved_paths.extend(path.glob('**/*'))
-            elif path.is_file():
-                resolved_paths.append(path)
+            prefix = path_str[len(repo_path_str + '/'):]
 
-        for resolved_path in resolved_paths:
-            relative_path = Path(str(resolved_path)[len(repo_path_str + '/'):])
+            if prefix != '' and not self.sparse_checkout.may_contain(prefix):
+                raise Exception(f'fatal: Arg {path} is outside of the sparse-checkout cone')
 
-            if resolved_path.is_dir() or resolved_path.name in self.ignore:
-                continue
+            prefixes.append(prefix)
 
-            should_ignore = False
+        # only files that differ from the index or HEAD need to be hashed
+        # and stored, status knows which ones do without reading the rest
+        status = self.status(prefixes)
+        entries: List[IndexEntry] = []
 
-            for parent in relative_path.parents:
-                if parent.name in self.ignore:           
-                    should_ignore = True
-                    break
+        for relative_path in status.modified + status.untracked:
+            if not self.sparse_checkout.includes(relative_path):
+                continue
 
-            if not should_ignore:
-                current_object = Blob(resolved_path.read_bytes())
+            resolved_path = self.repo_path.joinpath(relative_path)
+            current_object = self.store_working_file(resolved_path)
 
-                self.write_object(current_object)
-                self.index.add_entry(
-                    relative_path,
-                    current_object.get_oid(),
-                    resolved_path.stat(),
-                    os.access(str(resolved_path), os.X_OK)
-                )
+            entries.append(IndexEntry.from_stat(
+                Path(relative_path),
+                current_object.get_oid(),
+                resolved_path.stat(),
+                os.access(str(resolved_path), os.X_OK)
+            ))
 
+        self.index.add_entries(entries)
         self.index.write()
 
+    def is_lfs_size(self, size: int) -> bool:
+        return 0 < self.lfs_threshold <= size
+
+    def is_chunk_size(self, size: int) -> bool:
+        return 0 < self.chunk_threshold <= size
+
+    def hash_working_file(self, path: Path, size: int) -> str:
+        """Oid the file would get when added, large files are hashed as the
+        pointer that stands for them.
+        """
+        if self.is_lfs_size(size):
+            from model.lfs import LfsPointer, hash_file
+
+            oid, size = hash_file(path)
+
+            return Blob(LfsPointer(oid, size).encode()).get_oid()
+
+        return Blob(path.read_bytes()).get_oid()
+
+    def store_working_file(self, path: Path) -> Blob:
+        if self.is_lfs_size(path.stat().st_size):
+            blob = Blob(self.lfs_store.store_file(path).encode())
+        else:
+            blob = Blob(path.read_bytes())
+
+        self.write_object(blob)
+
+        return blob
+
+    def restore_blob(self, blob_oid: str, path: Path, is_executable: bool) -> None:
+        if len(blob_oid) == 0:
+            raise Exception(f'fatal: Invalid blob at {blob_oid}')
+
+        path.parent.mkdir(parents=True, exist_ok=True)
+
+        from model.lfs import LfsPointer
+
+        blob_data = self.read_blob_data(blob_oid)
+        first_data = next(blob_data, b'')
+        lfs_pointer = LfsPointer.parse(first_data)
+
+        # large files are copied from the store, pointers whose content is
+        # not there are checked out as they are
+        if lfs_pointer is None or not self.lfs_store.restore_file(lfs_pointer, path):
+            # chunked blobs are written as they are read, never held whole
+            with open(str(path), 'wb+') as file:
+                file.write(first_data)
+
+                for data in blob_data:
+                    file.write(data)
+
+                file.close()
+
+        path.chmod(0o755 if is_executable else 0o644)
+
     def restore_tree_node(self, tree_node: TreeNode, current_path: Path):
         for entry_key in tree_node.entries:
             entry = tree_node.entries[entry_key]
             entry_path = current_path.joinpath(entry_key)
 
             if entry.type == 'blob':
-                blob = self.read_blob(entry.oid)
-
-                if blob == None:
-                    raise Exception(f'fatal: Invalid blob at {entry.oid}')
-
-                entry_path.parent.mkdir(parents=True, exist_ok=True)
-
-                with open(str(entry_path), 'wb+') as file:
-                    file.write(blob.data)
-                    file.close()
+                self.restore_blob(entry.oid, entry_path, entry.mode == '100755')
             elif entry.type == 'tree' and entry.content:
                 self.restore_tree_node(entry.content, entry_path)
 
         return
 
-    def checkout(self, commit_oid: str):
+    def remove_working_file(self, relative_path: str) -> None:
+        path = self.repo_path.joinpath(relative_path)
+
+        try:
+            path.unlink()
+        except FileNotFoundError:
+            return
+
+        # drop directories left empty, like git does
+        for parent in path.parents:
+            if parent == self.repo_path:
+                break
+
+            try:
+                parent.rmdir()
+            except OSError:
+                break
+
+    def checkout(self, revision: str):
+        commit_oid = self.resolve_oid(revision)
         commit = self.read_commit(commit_oid)
 
         if commit != None:
-            tree_oid = commit.tree_oid
-            tree_node = self.read_tree(
-                tree_oid,
-                [],
-                Path(''),
-                True
-            )
+            stat_cache = StatCache.read_stat_cache(self.storage_path.joinpath('stat-cache'))
+
+            # the stat cache is at the tree last written to the working
+            # tree, which HEAD may have moved away from (fast-import), a
+            # missing cache or tree means every file is written
+            if stat_cache.tree_oid != '' and not self.get_object_path(stat_cache.tree_oid).exists():
+                stat_cache = StatCache(stat_cache.cache_path)
+
+            # only paths whose oid differs between the trees are touched,
+            # identical subtrees are skipped without being read
+            changes = list(diff_trees(
+                self,
+                stat_cache.tree_oid,
+                commit.tree_oid,
+                '',
+                self.get_path_filter(),
+            ))
+            removed_changes = [change for change in changes if change.new_entry is None]
+            written_changes = [change for change in changes if change.new_entry is not None]
+
+            # removals first, a file may be replaced by a directory
+            for change in removed_changes:
+                self.remove_working_file(change.path)
+
+            stat_cache.apply_changes(changes, commit.tree_oid)
+
+            for change in written_changes:
+                assert not change.new_entry is None
 
-            self.restore_tree_node(tree_node, self.repo_path)
+                entry_path = self.repo_path.joinpath(change.path)
+                is_executable = change.new_entry.mode == '100755'
+
+                if entry_path.is_dir():
+                    import shutil
+
+                    shutil.rmtree(str(entry_path))
+
+                self.restore_blob(change.new_oid, entry_path, is_executable)
+                stat_cache.refresh(change.path, change.new_oid, entry_path.stat(), is_executable)
+
+            stat_cache.write()
             self.index.clear()
             self.update_head(commit_oid)
 
-            print(f'{commit_oid} is checked out')
\ No newline at end of file
+            added_count = len([change for change in written_changes if change.old_entry is None])
+            modified_count = len(written_changes) - added_count
+            deleted_count = len(removed_changes)
+
+            print(f'{commit_oid} is checked out')
+            print(f'{added_count} added, {modified_count} modified, {deleted_count} deleted')
+
+    def iter_tree(
+        self,
+        tree_oid: str,
+        should_include: Union[PathFilter, None] = None,
+        current_path: str = '',
+    ) -> Iterator[Tuple[str, str, str]]:
+        """Yields (path, mode, oid) of every blob depth first.
+
+        Only the entries of one tree per level are held at a time, subtrees
+        are read when the walk reaches them.
+        """
+        def read_level(oid: str) -> Iterator[Tuple[str, TreeNodeEntry]]:
+            return iter(sorted(read_tree_entries(self, oid).items()))
+
+        stack: List[Tuple[str, Iterator[Tuple[str, TreeNodeEntry]]]] = [
+            (current_path, read_level(tree_oid)),
+        ]
+
+        while stack:
+            dir_path, entries = stack[-1]
+
+            for entry_key, entry in entries:
+                entry_path = f'{dir_path}/{entry_key}' if dir_path else entry_key
+                is_tree = entry.type == 'tree'
+
+                if should_include is not None and not should_include(entry_path, is_tree):
+                    continue
+
+                if is_tree:
+                    stack.append((entry_path, read_level(entry.oid)))
+
+                    break
+
+                yield entry_path, entry.mode, entry.oid
+            else:
+                stack.pop()
+
+    def resolve_path(self, tree_oid: str, path: str) -> Union[TreeNodeEntry, None]:
+        """Finds the entry at path, reading one tree per path component and
+        nothing else.
+        """
+        entry: Union[TreeNodeEntry, None] = None
+        current_oid = tree_oid
+
+        for name in path.strip('/').split('/'):
+            if entry is not None and entry.type != 'tree':
+                return None
+
+            entry = read_tree_entries(self, current_oid).get(name)
+
+            if entry is None:
+                return None
+
+            current_oid = entry.oid
+
+        return entry
+
+    def set_sparse_checkout(self, prefixes: List[str]) -> None:
+        old_sparse_checkout = self.sparse_checkout
+        new_sparse_checkout = SparseCheckout(old_sparse_checkout.sparse_path, prefixes)
+        stat_cache = StatCache.read_stat_cache(self.storage_path.joinpath('stat-cache'))
+
+        # the cone changes on the tree last written to the working tree,
+        # which HEAD may have moved away from (fast-import)
+        if stat_cache.tree_oid != '' and not self.get_object_path(stat_cache.tree_oid).exists():
+            stat_cache = StatCache(stat_cache.cache_path)
+
+        if stat_cache.tree_oid == '':
+            head_commit = self.read_commit(self.read_head())
+            stat_cache.rebase(self, '' if head_commit is None else head_commit.tree_oid)
+
+        written_paths: List[Tuple[str, str, bool]] = []
+        removed_count = 0
+
+        for relative_path, _, oid in self.iter_tree(stat_cache.tree_oid, old_sparse_checkout.matches):
+            if new_sparse_checkout.includes(relative_path):
+                continue
+
+            cache_entry = stat_cache.entries.pop(relative_path, None)
+            stat_cache.is_dirty = True
+
+            try:
+                stat = self.repo_path.joinpath(relative_path).stat()
+            except FileNotFoundError:
+                continue
+
+            if self.is_working_file_modified(relative_path, oid, stat, cache_entry, stat_cache):
+                print(f'warning: {relative_path} has local changes, it is kept')
+
+                continue
+
+            self.remove_working_file(relative_path)
+            removed_count += 1
+
+        for relative_path, mode, oid in self.iter_tree(stat_cache.tree_oid, new_sparse_checkout.matches):
+            if not old_sparse_checkout.includes(relative_path):
+                self.restore_blob(oid, self.repo_path.joinpath(relative_path), mode == '100755')
+                written_paths.append((relative_path, oid, mode == '100755'))
+
+        new_sparse_checkout.write()
+        self.sparse_checkout = new_sparse_checkout
+
+        # entries still in the cone keep their stat data
+        for relative_path, oid, is_executable in written_paths:
+            stat_cache.refresh(
+                relative_path,
+                oid,
+                self.repo_path.joinpath(relative_path).stat(),
+                is_executable,
+            )
+
+        stat_cache.write()
+
+        print(f'{len(written_paths)} added, {removed_count} removed')
+
+    def is_working_file_modified(
+        self,
+        relative_path: str,
+        oid: str,
+        stat: os.stat_result,
+        cache_entry: Union[IndexEntry, None],
+        stat_cache: StatCache,
+    ) -> bool:
+        index_entry = self.index.entries.get(relative_path)
+
+        if index_entry is not None and index_entry.oid != oid:
+            return True
+
+        if not S_ISREG(stat.st_mode):
+            return True
+
+        if cache_entry is not None and cache_entry.oid == oid and stat_cache.is_clean(cache_entry, stat):
+            return False
+
+        return self.hash_working_file(self.repo_path.joinpath(relative_path), stat.st_size) != oid
+
+    def should_ignore(self, relative_path: str, name: str, is_dir: bool) -> bool:
+        return self.gud_ignore.is_ignored(relative_path, name, is_dir)
+
+    def walk_working_tree(
+        self,
+        relative_dir: str = '',
+    ) -> Iterator[Tuple[str, os.stat_result]]:
+        walker = WorkingTreeWalker(str(self.repo_path), self.should_ignore)
+
+        return walker.walk(relative_dir)
+
+    def is_ignored(self, relative_path: str, is_dir: bool) -> bool:
+        return self.gud_ignore.is_path_ignored(relative_path, is_dir)
+
+    @staticmethod
+    def is_under_prefixes(relative_path: str, prefixes: List[str]) -> bool:
+        for prefix in prefixes:
+            if prefix == '' or relative_path == prefix or relative_path.startswith(prefix + '/'):
+                return True
+
+        return False
+
+    def scan_prefixes(
+        self,
+        prefixes: List[str],
+    ) -> Iterator[Tuple[str, Union[os.stat_result, None]]]:
+        for prefix in prefixes:
+            full_path = self.repo_path.joinpath(prefix)
+
+            if prefix != '' and self.is_ignored(prefix, full_path.is_dir()):
+                continue
+
+            if full_path.is_dir():
+                yield from self.walk_working_tree(prefix)
+            elif full_path.is_file():
+                yield prefix, full_path.stat()
+
+    def stat_paths(
+        self,
+        relative_paths: Iterable[str],
+    ) -> Iterator[Tuple[str, Union[os.stat_result, None]]]:
+        for relative_path in relative_paths:
+            try:
+                stat = os.lstat(os.path.join(str(self.repo_path), relative_path))
+            except OSError:
+                yield relative_path, None
+
+                continue
+
+            yield relative_path, stat if S_ISREG(stat.st_mode) else None
+
+    def scan_changed_paths(
+        self,
+        changed_paths: Set[str],
+        tracked_paths: Set[str],
+        prefixes: List[str],
+    ) -> Iterator[Tuple[str, Union[os.stat_result, None]]]:
+        missing_paths: Set[str] = set()
+
+        for relative_path in sorted(changed_paths):
+            if not self.is_under_prefixes(relative_path, prefixes):
+                continue
+
+            full_path = os.path.join(str(self.repo_path), relative_path)
+
+            try:
+                stat = os.lstat(full_path)
+            except OSError:
+                missing_paths.add(relative_path)
+
+                yield relative_path, None
+
+                continue
+
+            if self.is_ignored(relative_path, S_ISDIR(stat.st_mode)) \
+               and relative_path not in tracked_paths:
+                continue
+
+            if S_ISDIR(stat.st_mode):
+                yield from self.walk_working_tree(relative_path)
+            elif S_ISREG(stat.st_mode):
+                yield relative_path, stat
+
+        if not missing_paths:
+            return
+
+        # a removed directory only shows up as a single event
+        for tracked_path in tracked_paths:
+            for parent in Path(tracked_path).parents:
+                if str(parent) in missing_paths:
+                    yield tracked_path, None
+
+                    break
+
+    @staticmethod
+    def normalize_prefixes(prefixes: List[str]) -> List[str]:
+        normalized_prefixes: List[str] = []
+
+        for prefix in sorted(prefixes):
+            if not Repo.is_under_prefixes(prefix, normalized_prefixes):
+                normalized_prefixes.append(prefix)
+
+        return normalized_prefixes
+
+    def seed_stat_cache(self, commit: Commit) -> None:
+        """Moves the stat cache to a just committed tree, the committed files
+        keep the stat data of their index entries so they are not hashed
+        again by the next status.
+        """
+        stat_cache = StatCache.read_stat_cache(self.storage_path.joinpath('stat-cache'))
+        parent_commit = self.read_commit(commit.parent)
+
+        # a cache left behind by fast-import stays where the working tree is
+        if stat_cache.tree_oid not in ['', '' if parent_commit is None else parent_commit.tree_oid]:
+            return
+
+        stat_cache.rebase(self, commit.tree_oid)
+        index_mtime_s = int(self.index.index_path.stat().st_mtime)
+
+        for entry_key, index_entry in self.index.entries.items():
+            cache_entry = stat_cache.entries.get(entry_key)
+
+            # entries written in the same second as the index could have
+            # been modified right after
+            if cache_entry is not None and cache_entry.oid == index_entry.oid \
+               and index_entry.mtime_s < index_mtime_s:
+                stat_cache.entries[entry_key] = index_entry
+
+        stat_cache.write()
+
+    def status(self, prefixes: Union[List[str], None] = None) -> Status:
+        prefixes = self.normalize_prefixes([''] if prefixes is None else prefixes)
+        is_full_status = prefixes == ['']
+
+        head_commit = self.read_commit(self.read_head())
+        head_tree_oid = '' if head_commit is None else head_commit.tree_oid
+
+        stat_cache = StatCache.read_stat_cache(self.storage_path.joinpath('stat-cache'))
+        # HEAD moved without the working tree (fast-import), the cache keeps
+        # describing the tree on disk until it is checked out
+        is_cache_behind = stat_cache.tree_oid not in ['', head_tree_oid]
+        rebased_paths = stat_cache.rebase(self, head_tree_oid)
+
+        fsmonitor: Union[FsMonitorClient, None] = None
+        fsmonitor_token: Union[str, None] = None
+        fsmonitor_pending_paths: Set[str] = set()
+        changed_paths: Union[Set[str], None] = None
+
+        # the monitor is only looked at when gud fsmonitor started one
+        if os.path.exists(os.path.join(str(self.storage_path), 'fsmonitor', 'pid')):
+            from model.fsmonitor import FsMonitorClient
+
+            fsmonitor = FsMonitorClient(self.storage_path)
+            fsmonitor_state = fsmonitor.read_state()
+            fsmonitor_pending_paths = fsmonitor_state.pending_paths
+            # the new token is taken before looking at any file, so whatever
+            # changes during the scan is reported next time
+            fsmonitor_token, changed_paths = fsmonitor.query(fsmonitor_state.token)
+
+        if changed_paths is not None and any(
+            os.path.basename(changed_path) == IGNORE_FILE_NAME for changed_path in changed_paths
+        ):
+            # previously ignored files may have become untracked ones
+            changed_paths = None
+
+        status = Status()
+
+        for entry_key in self.index.entries:
+            if not self.is_under_prefixes(entry_key, prefixes):
+                continue
+
+            head_entry = stat_cache.entries.get(entry_key)
+
+            if head_entry is None:
+                status.staged_added.append(entry_key)
+            elif head_entry.oid != self.index.entries[entry_key].oid:
+                status.staged_modified.append(entry_key)
+
+        tracked_paths = set(self.index.entries) | set(stat_cache.entries)
+        pending_paths: Set[str] = set()
+
+        seen_paths: Set[str] = set()
+        candidates: Iterator[Tuple[str, Union[os.stat_result, None]]]
+
+        if changed_paths is None:
+            # tracked files stay tracked even when ignore rules hide them
+            # from the walk, whatever is left over is looked at explicitly
+            candidates = itertools.chain(
+                self.scan_prefixes(prefixes),
+                self.stat_paths(
+                    tracked_path for tracked_path in tracked_paths
+                    if tracked_path not in seen_paths and self.is_under_prefixes(tracked_path, prefixes)
+                ),
+            )
+        else:
+            candidate_paths = changed_paths | fsmonitor_pending_paths | \
+                set(self.index.entries) | rebased_paths
+            candidates = self.scan_changed_paths(candidate_paths, tracked_paths, prefixes)
+            pending_paths = set(
+                candidate_path for candidate_path in candidate_paths
+                if not self.is_under_prefixes(candidate_path, prefixes)
+            )
+
+        index_mtime_s = int(self.index.index_path.stat().st_mtime)
+        is_index_dirty = False
+
+        for relative_path, stat in candidates:
+            if relative_path in seen_paths:
+                continue
+
+            seen_paths.add(relative_path)
+
+            index_entry = self.index.entries.get(relative_path)
+            cache_entry = stat_cache.entries.get(relative_path)
+
+            if stat is None:
+                if relative_path in tracked_paths:
+                    status.deleted.append(relative_path)
+
+                continue
+
+            if index_entry is not None:
+                if index_entry.matches_stat(stat) and index_entry.mtime_s < index_mtime_s:
+                    continue
+
+                expected_oid = index_entry.oid
+                expected_mode = index_entry.mode
+            elif cache_entry is not None:
+                if stat_cache.is_clean(cache_entry, stat):
+                    continue
+
+                expected_oid = cache_entry.oid
+                expected_mode = cache_entry.mode
+            else:
+                status.untracked.append(relative_path)
+
+                continue
+
+            full_path = self.repo_path.joinpath(relative_path)
+            actual_oid = self.hash_working_file(full_path, stat.st_size)
+            is_executable = os.access(str(full_path), os.X_OK)
+
+            if actual_oid != expected_oid or is_executable != (expected_mode == EXECUTABLE_MODE):
+                status.modified.append(relative_path)
+            elif index_entry is not None:
+                self.index.entries[relative_path] = IndexEntry.from_stat(
+                    Path(relative_path),
+                    actual_oid,
+                    stat,
+                    is_executable,
+                )
+                is_index_dirty = True
+            else:
+                stat_cache.refresh(relative_path, actual_oid, stat, is_executable)
+
+        if is_index_dirty:
+            self.index.write()
+
+        if stat_cache.is_dirty and not is_cache_behind:
+            stat_cache.write()
+
+        if fsmonitor is not None and fsmonitor_token is not None and (changed_paths is not None or is_full_status):
+            from model.fsmonitor import FsMonitorState
+
+            pending_paths.update(status.modified, status.untracked, status.deleted)
+            fsmonitor.write_state(FsMonitorState(fsmonitor_token, pending_paths))
+
+        return status
@@ -0,0 +1,108 @@
+from __future__ import annotations
+
+import os
+import threading
+
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, List, Tuple, Union
+
+from model.hashing import set_hash_algorithm
+from model.daemon import DAEMON_DIR, GENERATION_NAME
+from model.ignore import IGNORE_FILE_NAME, GudIgnore
+from model.repo import Repo
+
+# files of .gitgud whose change means an open Repo is out of date, the
+# generation file is rewritten by commands that run outside of the daemon
+STATE_FILES: List[str] = [
+    'index',
+    'HEAD',
+    'ref/main',
+    'config',
+    'sparse-checkout',
+    'stat-cache',
+    f'{DAEMON_DIR}/{GENERATION_NAME}',
+    f'../{IGNORE_FILE_NAME}',
+]
+
+OBJECT_CACHE_SIZE = 64 * 1024 * 1024
+# larger objects would push out many small trees and commits
+OBJECT_CACHE_MAX_OBJECT_SIZE = 1024 * 1024
+
+FileSignature = Union[Tuple[int, int, int], None]
+
+
+def get_state_signature(storage_path: Path) -> Tuple[FileSignature, ...]:
+    signature: List[FileSignature] = []
+
+    for file_name in STATE_FILES:
+        try:
+            stat = os.stat(storage_path.joinpath(file_name))
+            signature.append((stat.st_mtime_ns, stat.st_size, stat.st_ino))
+        except FileNotFoundError:
+            signature.append(None)
+
+    return tuple(signature)
+
+
+# objects never change once written, entries only go when space is needed
+class ObjectCache:
+    def __init__(self, max_size: int = OBJECT_CACHE_SIZE):
+        self.max_size = max_size
+        self.size = 0
+        self.entries: OrderedDict[str, bytes] = OrderedDict()
+        # read_objects and AsyncRepo read from several threads
+        self.lock = threading.Lock()
+
+    def get(self, oid: str) -> Union[bytes, None]:
+        with self.lock:
+            data = self.entries.get(oid)
+
+            if data is not None:
+                self.entries.move_to_end(oid)
+
+            return data
+
+    def put(self, oid: str, data: bytes) -> None:
+        if len(data) > OBJECT_CACHE_MAX_OBJECT_SIZE:
+            return
+
+        with self.lock:
+            if oid in self.entries:
+                return
+
+            self.entries[oid] = data
+            self.size += len(data)
+
+            while self.size > self.max_size:
+                _, evicted_data = self.entries.popitem(last=False)
+                self.size -= len(evicted_data)
+
+
+# the object cache of a repository outlives its Repo instances
+class RepoCache:
+    def __init__(self):
+        self.repos: Dict[str, Tuple[Repo, Tuple[FileSignature, ...]]] = {}
+        self.object_caches: Dict[str, ObjectCache] = {}
+
+    def get(self, repo_path: Path) -> Repo:
+        key = str(repo_path.resolve())
+        signature = get_state_signature(Path(key).joinpath('.gitgud'))
+        cached = self.repos.get(key)
+
+        if cached is not None and cached[1] == signature:
+            repo = cached[0]
+            # the algorithm is per process, the last command may have been
+            # for another repository
+            set_hash_algorithm(repo.hash_algorithm.name)
+            # .gudignore files below the root are not part of the
+            # signature, they are read again lazily by every command
+            repo.gud_ignore = GudIgnore(str(repo.repo_path), repo.ignore)
+
+            return repo
+
+        repo = Repo(repo_path)
+        repo.object_cache = self.object_caches.setdefault(key, ObjectCache())
+        self.repos[key] = (repo, signature)
+
+        return repo
@@ -0,0 +1,81 @@
+from __future__ import annotations
+
+from pathlib import Path
+from typing import List
+
+
+class SparseCheckout:
+    """Set of path prefixes (the cone) the working tree is restricted to.
+
+    Stored one prefix per line in .gitgud/sparse-checkout, no file or an
+    empty one means the whole tree is checked out.
+    """
+
+    @staticmethod
+    def read_sparse_checkout(storage_path: Path) -> SparseCheckout:
+        sparse_path = storage_path.joinpath('sparse-checkout')
+
+        try:
+            lines = sparse_path.read_text('utf-8').splitlines()
+        except FileNotFoundError:
+            lines = []
+        except:
+            raise Exception('fatal: Cant read sparse-checkout file')
+
+        return SparseCheckout(sparse_path, lines)
+
+    @staticmethod
+    def normalize_prefix(prefix: str) -> str:
+        return '/'.join(part for part in prefix.strip().split('/') if part not in ['', '.'])
+
+    def __init__(self, sparse_path: Path, prefixes: List[str]):
+        self.sparse_path = sparse_path
+        self.prefixes = sorted(set(
+            self.normalize_prefix(prefix) for prefix in prefixes if prefix.strip()
+        ))
+
+        if '' in self.prefixes:
+            # the root is in the cone, same as no restriction at all
+            self.prefixes = []
+
+    @property
+    def is_enabled(self) -> bool:
+        return len(self.prefixes) > 0
+
+    def includes(self, relative_path: str) -> bool:
+        if not self.is_enabled:
+            return True
+
+        for prefix in self.prefixes:
+            if relative_path == prefix or relative_path.startswith(prefix + '/'):
+                return True
+
+        return False
+
+    def may_contain(self, relative_dir: str) -> bool:
+        if self.includes(relative_dir):
+            return True
+
+        for prefix in self.prefixes:
+            if prefix.startswith(relative_dir + '/'):
+                return True
+
+        return False
+
+    def matches(self, relative_path: str, is_tree: bool) -> bool:
+        """Whether a tree entry has to be looked at: blobs in the cone and
+        trees that are in it or lead to it.
+        """
+        if is_tree:
+            return self.may_contain(relative_path)
+
+        return self.includes(relative_path)
+
+    def write(self) -> None:
+        try:
+            if self.is_enabled:
+                self.sparse_path.write_text(''.join(f'{prefix}\n' for prefix in self.prefixes))
+            elif self.sparse_path.exists():
+                self.sparse_path.unlink()
+        except Exception as exc:
+            raise Exception(f'fatal: Cannot write sparse-checkout file, {exc}')
@@ -0,0 +1,166 @@
+from __future__ import annotations
+
+from os import stat_result
+from pathlib import Path
+from typing import TYPE_CHECKING, List, Set
+
+from model.index import Index, IndexEntry
+from model.tree_diff import TreeChange, diff_trees
+
+if TYPE_CHECKING:
+    from model.repo import Repo
+
+
+class StatCache:
+    """Snapshot of every file of a tree together with the stat data it was
+    last verified against.
+
+    Stored as the oid of the snapshotted tree on the first line followed
+    by the regular index encoding, so the entries are plain IndexEntry's.
+    """
+
+    @staticmethod
+    def read_stat_cache(cache_path: Path) -> StatCache:
+        cache_path = cache_path.resolve()
+        stat_cache = StatCache(cache_path)
+
+        try:
+            content = cache_path.read_bytes()
+            stat_cache.mtime_s = int(cache_path.stat().st_mtime)
+        except FileNotFoundError:
+            return stat_cache
+        except:
+            raise Exception('fatal: Cant read stat cache file')
+
+        split_content = content.split(b'\n', 1)
+
+        try:
+            if len(split_content) != 2:
+                raise Exception('fatal: Corrupted stat cache')
+
+            stat_cache.index = Index.decode_verified(split_content[1], stat_cache.index.index_path)
+            stat_cache.tree_oid = split_content[0].decode('utf-8')
+        except Exception:
+            # the cache is only an optimisation, start over instead of failing
+            stat_cache.index = Index(cache_path)
+            stat_cache.is_dirty = True
+
+        return stat_cache
+
+    def __init__(self, cache_path: Path):
+        self.cache_path = cache_path
+        self.tree_oid = ''
+        self.index = Index(cache_path)
+        self.mtime_s = 0
+        self.is_dirty = False
+
+    @property
+    def entries(self):
+        return self.index.entries
+
+    def is_clean(self, entry: IndexEntry, stat: stat_result) -> bool:
+        # entries written in the same second as the cache could have been
+        # modified right after, their stat data can't be trusted
+        return entry.matches_stat(stat) and entry.mtime_s < self.mtime_s
+
+    def rebase(self, repo: Repo, tree_oid: str) -> Set[str]:
+        if tree_oid == self.tree_oid:
+            return set()
+
+        # only the sparse-checkout cone is cached, trees outside of it
+        # are never read
+        changes = list(diff_trees(repo, self.tree_oid, tree_oid, '', repo.get_path_filter()))
+
+        return self.apply_changes(changes, tree_oid)
+
+    def apply_changes(self, changes: List[TreeChange], tree_oid: str) -> Set[str]:
+        changed_paths: Set[str] = set()
+
+        for change in changes:
+            changed_paths.add(change.path)
+
+            if change.new_entry is None:
+                self.entries.pop(change.path, None)
+
+                continue
+
+            self.entries[change.path] = IndexEntry(
+                Path(change.path),
+                change.new_entry.mode == '100755',
+                change.new_oid,
+                0, 0, 0, 0, 0, 0, 0,
+            )
+
+        self.tree_oid = tree_oid
+        self.is_dirty = True
+
+        return changed_paths
+
+    def refresh(
+        self,
+        path: str,
+        oid: str,
+        stat: stat_result,
+        is_executable: bool,
+    ) -> None:
+        # paths come from a tree, so they can't conflict with other entries
+        self.entries[path] = IndexEntry.from_stat(Path(path), oid, stat, is_executable)
+        self.is_dirty = True
+
+    def write(self) -> None:
+        encoded_data = self.tree_oid.encode('utf-8') + b'\n' + self.index.encode()
+        temp_path = self.cache_path.parent.joinpath(f'.{self.cache_path.name}.tmp')
+
+        try:
+            with open(str(temp_path), 'wb+') as file:
+                file.write(encoded_data)
+                file.close()
+
+            temp_path.rename(self.cache_path)
+        except Exception as exc:
+            raise Exception(f'fatal: Cannot write stat cache, {exc}')
+
+        self.is_dirty = False
+
+
+class Status:
+    def __init__(self):
+        self.staged_added: List[str] = []
+        self.staged_modified: List[str] = []
+        self.modified: List[str] = []
+        self.deleted: List[str] = []
+        self.untracked: List[str] = []
+
+    def is_clean(self) -> bool:
+        return not (
+            self.staged_added or
+            self.staged_modified or
+            self.modified or
+            self.deleted or
+            self.untracked
+        )
+
+    def __str__(self) -> str:
+        if self.is_clean():
+            return 'nothing to commit, working tree clean\n'
+
+        lines: List[str] = []
+
+        if self.staged_added or self.staged_modified:
+            lines.append('Changes to be committed:')
+            lines.extend(f'\tnew file:   {path}' for path in sorted(self.staged_added))
+            lines.extend(f'\tmodified:   {path}' for path in sorted(self.staged_modified))
+            lines.append('')
+
+        if self.modified or self.deleted:
+            lines.append('Changes not staged for commit:')
+            lines.extend(f'\tmodified:   {path}' for path in sorted(self.modified))
+            lines.extend(f'\tdeleted:    {path}' for path in sorted(self.deleted))
+            lines.append('')
+
+        if self.untracked:
+            lines.append('Untracked files:')
+            lines.extend(f'\t{path}' for path in sorted(self.untracked))
+            lines.append('')
+
+        return '\n'.join(lines) + '\n'
@@ -0,0 +1,87 @@
+import asyncio
+import threading
+
+from pathlib import Path
+from model.async_repo import AsyncRepo
+from model.repo import Repo
+from model.testing import write_files
+from model.objects import Blob
+
+
+class TestAsyncRepo:
+    def test_read_blob_and_tree(self, fs):
+        repo_path = Path('/repo')
+        repo_path.mkdir()
+        Repo.init_repo(repo_path)
+        repo = Repo(repo_path)
+        tree_oid = write_files(repo, {'a.txt': b'a', 'dir/b.txt': b'b'}).get_oid()
+
+        async def read():
+            async with AsyncRepo(repo) as async_repo:
+                tree = await async_repo.read_tree(tree_oid)
+                blob = await async_repo.read_blob(tree.entries['a.txt'].oid)
+
+                return tree, blob
+
+        tree, blob = asyncio.run(read())
+
+        assert sorted(tree.entries) == ['a.txt', 'dir']
+        assert tree.entries['dir'].type == 'tree'
+        assert blob.data == b'a'
+
+    def test_duplicate_requests_share_a_read(self, fs):
+        repo_path = Path('/repo')
+        repo_path.mkdir()
+        Repo.init_repo(repo_path)
+        repo = Repo(repo_path)
+        blob = Blob(b'shared')
+        repo.write_object(blob)
+
+        read_oids = []
+        release = threading.Event()
+        read_blob = repo.read_blob
+
+        def slow_read_blob(oid):
+            read_oids.append(oid)
+            release.wait(5)
+
+            return read_blob(oid)
+
+        repo.read_blob = slow_read_blob
+
+        async def read():
+            async with AsyncRepo(repo, max_workers=4) as async_repo:
+                requests = [asyncio.ensure_future(async_repo.read_blob(blob.get_oid())) for _ in range(50)]
+                await asyncio.sleep(0.05)
+                release.set()
+
+                return await asyncio.gather(*requests)
+
+        blobs = asyncio.run(read())
+
+        assert read_oids == [blob.get_oid()]
+        assert all(read.data == b'shared' for read in blobs)
+
+    def test_iter_tree(self, fs):
+        repo_path = Path('/repo')
+        repo_path.mkdir()
+        Repo.init_repo(repo_path)
+        repo = Repo(repo_path)
+        tree_oid = write_files(repo, {
+            'b.txt': b'b',
+            'a/z.txt': b'z',
+            'a/deep/y.txt': b'y',
+            'c/x.txt': b'x',
+            'd/x.txt': b'x',
+        }).get_oid()
+
+        async def iterate(should_include=None):
+            async with AsyncRepo(repo) as async_repo:
+                return [item async for item in async_repo.iter_tree(tree_oid, should_include)]
+
+        assert asyncio.run(iterate()) == list(repo.iter_tree(tree_oid))
+        assert [path for path, _, _ in asyncio.run(iterate(lambda path, is_tree: not path.startswith('a')))] == [
+            'b.txt',
+            'c/x.txt',
+            'd/x.txt',
+        ]
@@ -0,0 +1,32 @@
+import os
+
+from model.background import manage_background_process, read_pid
+
+
+class TestBackgroundProcess:
+    def test_read_pid(self, tmp_path):
+        pid_path = tmp_path.joinpath('pid')
+
+        assert read_pid(pid_path) is None
+
+        pid_path.write_text('not a pid')
+
+        assert read_pid(pid_path) is None
+
+        pid_path.write_text(str(os.getpid()))
+
+        assert read_pid(pid_path) == os.getpid()
+
+    def test_status(self, tmp_path, capsys):
+        pid_path = tmp_path.joinpath('pid')
+        manage_background_process('monitor', 'status', pid_path, tmp_path, ['monitor', 'run'])
+        manage_background_process('monitor', 'stop', pid_path, tmp_path, ['monitor', 'run'])
+        pid_path.write_text(str(os.getpid()))
+        manage_background_process('monitor', 'status', pid_path, tmp_path, ['monitor', 'run'])
+        manage_background_process('monitor', 'start', pid_path, tmp_path, ['monitor', 'run'])
+
+        assert capsys.readouterr().out == \
+            'monitor is not running\n' \
+            'monitor is not running\n' \
+            f'monitor is running with pid {os.getpid()}\n' \
+            f'monitor is already running with pid {os.getpid()}\n'
@@ -0,0 +1,79 @@
+from pathlib import Path
+from model import bitmap
+from model.bitmap import ReachabilityBitmaps, count_bits, walk_objects
+from model.testing import commit_files
+from model.objects import Blob
+from model.repo import Repo
+
+
+def walk_reachable(repo: Repo, commit_oid: str) -> set:
+    return set(walk_objects(repo, [commit_oid], lambda oid: False))
+
+
+def get_reachable_oids(repo: Repo, bitmaps: ReachabilityBitmaps, commit_oid: str) -> set:
+    reachable_bitmap, extra_oids = bitmaps.get_reachable(repo, commit_oid)
+    oids = set(
+        bitmaps.get_oid(position)
+        for position in range(bitmaps.object_count)
+        if reachable_bitmap >> position & 1
+    )
+
+    assert count_bits(reachable_bitmap) == len(oids)
+
+    return oids | extra_oids
+
+
+class TestReachabilityBitmaps:
+    def test_matches_walk(self, fs, monkeypatch):
+        monkeypatch.setattr(bitmap, 'BITMAP_INTERVAL', 3)
+        repo_path = Path('/repo')
+        repo_path.mkdir()
+        Repo.init_repo(repo_path)
+        repo = Repo(repo_path)
+
+        files = dict((f'dir{i}/file.txt', b'x') for i in range(5))
+        commit_oids = []
+
+        for i in range(10):
+            files[f'dir{i % 5}/file.txt'] = b'%d' % i
+            commit_oids.append(commit_files(repo, files, str(i)))
+
+        bitmaps = ReachabilityBitmaps.read_bitmaps(repo.storage_path)
+
+        assert bitmaps.write(repo, [repo.read_head()]) == 4
+
+        bitmaps = ReachabilityBitmaps.read_bitmaps(repo.storage_path)
+
+        for commit_oid in commit_oids:
+            assert get_reachable_oids(repo, bitmaps, commit_oid) == walk_reachable(repo, commit_oid)
+
+        # objects written after the bitmaps have no position yet
+        files['new/file.txt'] = b'new'
+        new_commit_oid = commit_files(repo, files, 'new')
+        _, extra_oids = bitmaps.get_reachable(repo, new_commit_oid)
+
+        assert Blob(b'new').get_oid() in extra_oids
+        assert new_commit_oid in extra_oids
+        assert get_reachable_oids(repo, bitmaps, new_commit_oid) == walk_reachable(repo, new_commit_oid)
+
+    def test_chunks_are_reachable(self, fs):
+        repo_path = Path('/repo')
+        repo_path.mkdir()
+        Repo.init_repo(repo_path)
+
+        with open(str(repo_path.joinpath('.gitgud', 'config')), 'a') as config_file:
+            config_file.write('chunking.threshold = 1024\n')
+
+        repo = Repo(repo_path)
+
+        data = bytes(range(256)) * 1024
+        commit_oid = commit_files(repo, {'large.bin': data}, 'large')
+        bitmaps = ReachabilityBitmaps.read_bitmaps(repo.storage_path)
+        bitmaps.write(repo, [commit_oid])
+
+        chunk_oids = repo.read_blob_chunk_oids(Blob(data).get_oid())
+        reachable_oids = get_reachable_oids(repo, bitmaps, commit_oid)
+
+        assert chunk_oids
+        assert set(chunk_oids) < reachable_oids
+        assert reachable_oids == set(repo.list_object_oids())
@@ -0,0 +1,83 @@
+from pathlib import Path
+from model.bloom import MAX_CHANGED_PATHS, BloomFilter, ChangedPathsFile
+from model.testing import commit_files
+from model.repo import Repo
+
+
+class TestBloomFilter:
+    def test_changed_paths_and_parents(self):
+        paths = [f'services/service{i}/file{i}.py' for i in range(50)]
+        bloom_filter = BloomFilter.from_paths(paths)
+
+        for path in paths:
+            assert bloom_filter.might_contain(path)
+            assert bloom_filter.might_contain(path.rpartition('/')[0])
+
+        assert bloom_filter.might_contain('services')
+
+        false_positives = sum(bloom_filter.might_contain(f'other/file{i}.py') for i in range(1000))
+
+        assert false_positives < 50
+
+    def test_empty_and_oversized(self):
+        assert not BloomFilter.from_paths([]).might_contain('a')
+
+        oversized_filter = BloomFilter.from_paths([f'file{i}' for i in range(MAX_CHANGED_PATHS + 1)])
+
+        assert oversized_filter.might_contain('anything')
+
+    def test_changed_paths_file(self, fs):
+        storage_path = Path('/repo/.gitgud')
+        storage_path.mkdir(parents=True)
+        changed_paths = ChangedPathsFile(storage_path)
+
+        changed_paths.append('ab' * 20, BloomFilter.from_paths(['a/b.txt']))
+        changed_paths.append('cd' * 20, BloomFilter.from_paths([]))
+
+        with open(str(changed_paths.file_path), 'ab') as file:
+            file.write(bytes.fromhex('ef' * 20) + b'\x00')
+
+        filters = changed_paths.read_filters()
+
+        assert sorted(filters) == ['ab' * 20, 'cd' * 20]
+        assert filters['ab' * 20].might_contain('a')
+        assert not filters['cd' * 20].might_contain('a')
+
+
+class TestLogPaths:
+    def test_log_commits(self, fs):
+        repo_path = Path('/repo')
+        repo_path.mkdir()
+        Repo.init_repo(repo_path)
+        repo = Repo(repo_path)
+
+        files = {'services/billing/a.py': b'a', 'services/auth/b.py': b'b', 'README': b'r'}
+        first = commit_files(repo, files, 'first', should_write_filter=True)
+        files['services/auth/b.py'] = b'b2'
+        second = commit_files(repo, files, 'second', should_write_filter=True)
+        files['services/billing/a.py'] = b'a2'
+        third = commit_files(repo, files, 'third')
+        files['README'] = b'r2'
+        fourth = commit_files(repo, files, 'fourth', should_write_filter=True)
+
+        def log(*paths):
+            return [commit.get_oid() for commit in repo.log_commits(list(paths))]
+
+        assert log() == [fourth, third, second, first]
+        assert log('services/billing') == [third, first]
+        assert log('./services/billing/') == [third, first]
+        assert log('services') == [third, second, first]
+        assert log('README', 'services/auth') == [fourth, second, first]
+        assert log('missing') == []
+
+    def test_false_positives_are_diffed(self, fs):
+        repo_path = Path('/repo')
+        repo_path.mkdir()
+        Repo.init_repo(repo_path)
+        repo = Repo(repo_path)
+
+        first = commit_files(repo, {'a.txt': b'a', 'b.txt': b'b'}, 'first', should_write_filter=True)
+        second = commit_files(repo, {'a.txt': b'a2', 'b.txt': b'b'}, 'second')
+        repo.changed_paths.append(second, BloomFilter(b'\xff'))
+
+        assert [commit.get_oid() for commit in repo.log_commits(['b.txt'])] == [first]
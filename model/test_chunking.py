@@ -0,0 +1,30 @@
+import hashlib
+import random
+
+from model.chunking import MAX_CHUNK_SIZE, MIN_CHUNK_SIZE, split_chunks
+
+
+def random_bytes(size: int, seed: int) -> bytes:
+    return random.Random(seed).getrandbits(8 * size).to_bytes(size, 'little')
+
+
+class TestChunking:
+    def test_split_chunks(self):
+        data = random_bytes(2 << 20, 0)
+        chunks = list(split_chunks(data))
+
+        assert b''.join(chunks) == data
+        assert all(MIN_CHUNK_SIZE <= len(chunk) <= MAX_CHUNK_SIZE for chunk in chunks[:-1])
+        assert list(split_chunks(data)) == chunks
+
+    def test_split_chunks_small(self):
+        assert list(split_chunks(b'')) == []
+        assert list(split_chunks(b'small')) == [b'small']
+
+    def test_edit_changes_few_chunks(self):
+        data = random_bytes(2 << 20, 1)
+        edited = data[:1000000] + b'inserted' + data[1000000:]
+        old_chunks = {hashlib.sha1(chunk).digest() for chunk in split_chunks(data)}
+        new_chunks = [hashlib.sha1(chunk).digest() for chunk in split_chunks(edited)]
+
+        assert sum(chunk not in old_chunks for chunk in new_chunks) <= 2
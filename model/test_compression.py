@@ -0,0 +1,50 @@
+import io
+import os
+import zlib
+
+import pytest
+
+from model.compression import (
+    CODEC_LZMA,
+    CODEC_RAW,
+    CODEC_ZLIB,
+    Compressor,
+    decompress_object,
+    detect_codec,
+    read_object_header,
+)
+
+ENCODED_DATA = b'blob 12000\x00' + b'0123456789ab' * 1000
+
+
+class TestCompression:
+    @pytest.mark.parametrize('codec', ['auto', 'zlib', 'lzma', 'raw'])
+    def test_round_trip(self, codec):
+        compressed = Compressor(codec).compress(ENCODED_DATA)
+
+        assert decompress_object(compressed) == ENCODED_DATA
+        assert read_object_header(io.BytesIO(compressed), 64).startswith(b'blob 12000\x00')
+
+    def test_detect_codec(self):
+        assert detect_codec(zlib.compress(ENCODED_DATA)) == CODEC_ZLIB
+        assert detect_codec(zlib.compress(ENCODED_DATA, 9)) == CODEC_ZLIB
+        assert detect_codec(Compressor('lzma').compress(ENCODED_DATA)) == CODEC_LZMA
+        assert detect_codec(Compressor('raw').compress(ENCODED_DATA)) == CODEC_RAW
+
+    def test_auto_stores_incompressible_raw(self):
+        random_data = b'blob 100000\x00' + os.urandom(100000)
+        compressor = Compressor('auto')
+
+        assert detect_codec(compressor.compress(random_data)) == CODEC_RAW
+        assert detect_codec(compressor.compress(ENCODED_DATA)) == CODEC_ZLIB
+
+    def test_zlib_level(self):
+        assert len(Compressor('zlib', 0).compress(ENCODED_DATA)) > len(Compressor('zlib', 9).compress(ENCODED_DATA))
+
+    def test_unknown_codec(self):
+        with pytest.raises(Exception):
+            Compressor('brotli')
+
+    def test_corrupt_data(self):
+        with pytest.raises(Exception):
+            decompress_object(b'\x78\x9cgarbage')
@@ -0,0 +1,146 @@
+import socket
+import sys
+import threading
+
+from pathlib import Path
+from handlers.list_head.list_head import handle_list_head
+from model.testing import commit_files
+from model.daemon import (
+    EXIT_CODE,
+    FRAME_EXIT,
+    FRAME_INPUT,
+    FRAME_REQUEST,
+    FRAME_STDERR,
+    FRAME_STDOUT,
+    GudDaemon,
+    encode_request,
+    invalidate_daemon_repos,
+    receive_frame,
+    send_frame,
+)
+from model.objects import Blob
+from model.repo import Repo
+from model.repo_cache import ObjectCache, RepoCache
+
+
+class TestObjectCache:
+    def test_evicts_least_recently_used(self):
+        cache = ObjectCache(max_size=10)
+        cache.put('a', b'aaaa')
+        cache.put('b', b'bbbb')
+
+        assert cache.get('a') == b'aaaa'
+
+        cache.put('c', b'cccc')
+
+        assert cache.get('b') is None
+        assert cache.get('a') == b'aaaa'
+        assert cache.get('c') == b'cccc'
+        assert cache.size == 8
+
+
+class TestRepoCache:
+    def test_reuses_until_state_changes(self, tmp_path):
+        Repo.init_repo(tmp_path)
+        repo_cache = RepoCache()
+        repo = repo_cache.get(tmp_path)
+        blob = Blob(b'content')
+        repo.write_object(blob)
+
+        assert repo_cache.get(tmp_path) is repo
+        assert repo.read_blob(blob.get_oid()).data == b'content'
+        assert repo.object_cache.get(blob.get_oid()) is not None
+
+        tmp_path.joinpath('file.txt').write_bytes(b'content')
+        repo.add_to_index([repo.repo_path.joinpath('file.txt')])
+        reopened_repo = repo_cache.get(tmp_path)
+
+        assert reopened_repo is not repo
+        assert reopened_repo.object_cache is repo.object_cache
+        assert 'file.txt' in reopened_repo.index.entries
+
+    def test_reopens_after_local_changes(self, tmp_path):
+        Repo.init_repo(tmp_path)
+        repo_cache = RepoCache()
+        repo = repo_cache.get(tmp_path)
+        repo.storage_path.joinpath('daemon').mkdir()
+
+        invalidate_daemon_repos(repo.storage_path)
+        reopened_repo = repo_cache.get(tmp_path)
+
+        assert reopened_repo is not repo
+
+        repo = reopened_repo
+
+        assert repo_cache.get(tmp_path) is repo
+
+        tmp_path.joinpath('.gudignore').write_text('build\n')
+
+        assert repo_cache.get(tmp_path) is not repo
+
+
+def serve_request(daemon: GudDaemon, cwd: Path, argv: list) -> list:
+    server_connection, client_connection = socket.socketpair()
+    thread = threading.Thread(target=daemon.serve, args=(server_connection,))
+    thread.start()
+
+    send_frame(client_connection, FRAME_REQUEST, encode_request(str(cwd), argv))
+    frames = []
+
+    while True:
+        frame_type, payload = receive_frame(client_connection)
+        frames.append((frame_type, payload))
+
+        if frame_type == FRAME_INPUT:
+            send_frame(client_connection, FRAME_INPUT, b'N\n')
+        elif frame_type == FRAME_EXIT:
+            break
+
+    thread.join()
+    server_connection.close()
+    client_connection.close()
+
+    return frames
+
+
+def get_output(frames: list, output_frame_type: bytes) -> bytes:
+    return b''.join(payload for frame_type, payload in frames if frame_type == output_frame_type)
+
+
+class TestGudDaemon:
+    def test_serve(self, tmp_path):
+        def run_command(argv):
+            print(' '.join(argv))
+            print('warning', file=sys.stderr)
+            answer = input('Proceed? Y/N\n')
+            print(f'answer {answer}')
+
+            exit(3)
+
+        saved_stdout = sys.stdout
+        saved_cwd = Path.cwd()
+        frames = serve_request(GudDaemon(tmp_path, run_command), tmp_path, ['log', '--', 'dir'])
+
+        # the prompt is flushed before the input is requested
+        assert frames.index((FRAME_INPUT, b'')) > 0
+        assert get_output(frames, FRAME_STDOUT) == b'log -- dir\nProceed? Y/N\nanswer N\n'
+        assert get_output(frames, FRAME_STDERR) == b'warning\n'
+        assert EXIT_CODE.unpack(frames[-1][1])[0] == 3
+        assert sys.stdout is saved_stdout
+        assert Path.cwd() == saved_cwd
+
+    def test_list_head(self, tmp_path):
+        Repo.init_repo(tmp_path)
+        repo = Repo(tmp_path)
+        commit_oid = commit_files(repo, {'a.txt': b'a', 'dir/b.txt': b'b'})
+
+        def run_command(argv):
+            handle_list_head()
+
+        frames = serve_request(GudDaemon(repo.storage_path, run_command), tmp_path, ['list-head'])
+
+        assert get_output(frames, FRAME_STDOUT).decode('utf-8') == \
+            f'Current commit {commit_oid}\n' \
+            f'a.txt {Blob(b"a").get_oid()}\n' \
+            f'dir/b.txt {Blob(b"b").get_oid()}\n'
+        assert EXIT_CODE.unpack(frames[-1][1])[0] == 0
@@ -0,0 +1,147 @@
+import io
+import time
+
+from pathlib import Path
+from model import fast_import
+from model.fast_import import FastImport, read_import_commits
+from model.objects import Blob, TreeNode, TreeNodeEntry
+from model.repo import Repo
+
+
+def get_tree_oid(files: dict) -> str:
+    tree = TreeNode({})
+
+    for path, content in files.items():
+        tree.add(
+            TreeNodeEntry(Path(path), Blob(content).get_oid(), 'blob', False, None),
+            Path(path).parts,
+        )
+
+    return tree.get_oid()
+
+
+def make_stream(commits: list) -> io.BytesIO:
+    stream = b''
+
+    for i, (message, changes) in enumerate(commits):
+        stream += b'commit\nauthor A U Thor <author@example.com> %d +0000\n' % (1600000000 + i)
+        stream += b'data %d\n%s\n' % (len(message), message)
+
+        for path, content in changes:
+            if content is None:
+                stream += b'D %s\n' % path
+            else:
+                stream += b'M 100644 %s %d\n%s\n' % (path, len(content), content)
+
+        stream += b'\n'
+
+    return io.BytesIO(stream)
+
+
+def import_stream(repo: Repo, stream: io.BytesIO) -> FastImport:
+    importer = FastImport(repo)
+
+    for import_commit in read_import_commits(stream):
+        importer.import_commit(import_commit)
+
+    importer.finish()
+
+    return importer
+
+
+class TestFastImport:
+    def test_parse(self):
+        stream = make_stream([(b'first\nline', [(b'dir/a file.txt', b'a\nb'), (b'old.txt', None)])])
+        [import_commit] = list(read_import_commits(stream))
+
+        assert import_commit.name == 'A U Thor'
+        assert import_commit.email == 'author@example.com'
+        assert import_commit.timestamp == 1600000000
+        assert import_commit.offset == '+0000'
+        assert import_commit.message == 'first\nline'
+        assert import_commit.changes == [
+            (('dir', 'a file.txt'), False, b'a\nb'),
+            (('old.txt',), None, None),
+        ]
+
+    def test_import(self, fs, monkeypatch):
+        # flushes while trees are being written
+        monkeypatch.setattr(fast_import, 'OBJECT_BATCH_COUNT', 3)
+        repo_path = Path('/repo')
+        repo_path.mkdir()
+        Repo.init_repo(repo_path)
+        repo = Repo(repo_path)
+
+        commits = [
+            (b'first', [(b'a/b/c.txt', b'c'), (b'a/d.txt', b'd'), (b'e.txt', b'e')]),
+            (b'second', [(b'a/b/c.txt', b'c2'), (b'a/b/c.txt', b'c3'), (b'f/g.txt', b'g')]),
+            (b'third', [(b'a/b/c.txt', None), (b'e.txt', b'e')]),
+            (b'fourth', [(b'f', b'file replacing a directory')]),
+        ]
+        expected_files = [
+            {'a/b/c.txt': b'c', 'a/d.txt': b'd', 'e.txt': b'e'},
+            {'a/b/c.txt': b'c3', 'a/d.txt': b'd', 'e.txt': b'e', 'f/g.txt': b'g'},
+            {'a/d.txt': b'd', 'e.txt': b'e', 'f/g.txt': b'g'},
+            {'a/d.txt': b'd', 'e.txt': b'e', 'f': b'file replacing a directory'},
+        ]
+
+        importer = import_stream(repo, make_stream(commits))
+        head = repo.read_head()
+
+        assert importer.commit_count == 4
+        assert repo.read_main() == head
+
+        commits_from_head = list(repo.log_commits())
+
+        assert [commit.message for commit in commits_from_head] == ['fourth', 'third', 'second', 'first']
+        assert [commit.tree_oid for commit in reversed(commits_from_head)] == \
+            [get_tree_oid(files) for files in expected_files]
+
+        # c2 was replaced within its commit and never written
+        assert not repo.get_object_path(Blob(b'c2').get_oid()).exists()
+        assert set(repo.list_object_oids()) == importer.written_oids
+
+        # the changed-path filters were written from the import, not diffed
+        assert [commit.message for commit in repo.log_commits(['f/g.txt'])] == ['fourth', 'second']
+        assert [commit.message for commit in repo.log_commits(['a/b'])] == ['third', 'second', 'first']
+
+    def test_continues_from_head(self, fs):
+        repo_path = Path('/repo')
+        repo_path.mkdir()
+        Repo.init_repo(repo_path)
+        repo = Repo(repo_path)
+
+        import_stream(repo, make_stream([(b'first', [(b'a/b.txt', b'b'), (b'c/d.txt', b'd')])]))
+        first_oid = repo.read_head()
+        import_stream(Repo(repo_path), make_stream([(b'second', [(b'a/e.txt', b'e')])]))
+        second_commit = repo.read_commit(repo.read_head())
+
+        assert second_commit.parent == first_oid
+        assert second_commit.tree_oid == get_tree_oid({'a/b.txt': b'b', 'a/e.txt': b'e', 'c/d.txt': b'd'})
+
+    def test_keeps_timestamp_and_offset(self, fs, monkeypatch):
+        # the commit date must not go through the local time zone
+        monkeypatch.setenv('TZ', 'America/New_York')
+        time.tzset()
+        repo_path = Path('/repo')
+        repo_path.mkdir()
+        Repo.init_repo(repo_path)
+        repo = Repo(repo_path)
+        stream = io.BytesIO(
+            b'commit\nauthor A U Thor <author@example.com> 1700000000 -0530\ndata 5\nfirst\n'
+            b'M 100644 a.txt 1\na\n\n'
+            b'commit\nauthor A U Thor <author@example.com> 1700000001\ndata 6\nsecond\n'
+            b'M 100644 a.txt 1\nb\n\n'
+        )
+
+        try:
+            import_stream(repo, stream)
+            second_commit = repo.read_commit(repo.read_head())
+            first_commit = repo.read_commit(second_commit.parent)
+        finally:
+            monkeypatch.undo()
+            time.tzset()
+
+        assert first_commit.timestamp == '1700000000 -0530'
+        assert second_commit.timestamp == '1700000001 +0000'
+        assert first_commit.get_oid() == second_commit.parent
@@ -0,0 +1,73 @@
+import os
+import zlib
+
+from pathlib import Path
+
+import model.fsck
+
+from model.testing import commit_files
+from model.fsck import Fsck
+from model.objects import Blob
+from model.repo import Repo
+
+
+def object_path(repo: Repo, oid: str) -> Path:
+    return repo.storage_path.joinpath('objects', oid[:2], oid[2:])
+
+
+class TestFsck:
+    def test_fsck_clean(self, fs):
+        repo_path = Path('/repo')
+        repo_path.mkdir()
+        Repo.init_repo(repo_path)
+        repo = Repo(repo_path)
+        commit_oid = commit_files(repo, {'a.txt': b'a', 'dir/b.txt': b'b'}, should_update_head=False)
+
+        report = Fsck(repo, max_workers=1).run([commit_oid])
+
+        assert report.is_ok()
+        assert report.checked_count == 5
+        assert report.unreachable == []
+
+    def test_fsck_finds_problems(self, fs):
+        repo_path = Path('/repo')
+        repo_path.mkdir()
+        Repo.init_repo(repo_path)
+        repo = Repo(repo_path)
+        commit_oid = commit_files(repo, {'a.txt': b'a', 'dir/b.txt': b'b', 'c.txt': b'c'}, should_update_head=False)
+        corrupt_oid = Blob(b'a').get_oid()
+        missing_oid = Blob(b'b').get_oid()
+        dangling = Blob(b'dangling')
+
+        object_path(repo, corrupt_oid).write_bytes(zlib.compress(b'blob 1\x00x'))
+        object_path(repo, missing_oid).unlink()
+        repo.write_object(dangling)
+
+        report = Fsck(repo, max_workers=1).run([commit_oid])
+
+        assert not report.is_ok()
+        assert report.corrupt == {corrupt_oid: 'hash mismatch'}
+        assert [oid for oid, _, _ in report.missing] == [missing_oid]
+        assert report.unreachable == [(dangling.get_oid(), 'blob')]
+
+    def test_fsck_process_pool(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(model.fsck, 'PARALLEL_THRESHOLD', 0)
+        monkeypatch.setattr(model.fsck, 'BATCH_SIZE', 2)
+        Repo.init_repo(tmp_path)
+        repo = Repo(tmp_path)
+        commit_oid = commit_files(repo, {f'dir{i}/file{i}.txt': bytes([i]) for i in range(10)}, should_update_head=False)
+
+        report = Fsck(repo, max_workers=2).run([commit_oid])
+
+        assert report.is_ok()
+        assert report.checked_count == 22
+
+    def test_fsck_chunked_blob(self, fs):
+        repo_path = Path('/repo')
+        repo_path.mkdir()
+        Repo.init_repo(repo_path)
+        repo = Repo(repo_path)
+        repo.chunk_threshold = 1 << 16
+        commit_oid = commit_files(repo, {'big.bin': os.urandom(1 << 18)}, should_update_head=False)
+
+        assert Fsck(repo, max_workers=1).run([commit_oid]).is_ok()
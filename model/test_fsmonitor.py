@@ -0,0 +1,101 @@
+import os
+
+from pathlib import Path
+from model.fsmonitor import FsMonitorClient, FsMonitorDaemon, FsMonitorState, PollingWatcher
+
+
+def make_repo(tmp_path: Path) -> Path:
+    tmp_path.joinpath('.gitgud', 'fsmonitor').mkdir(parents=True)
+    tmp_path.joinpath('dir').mkdir()
+    tmp_path.joinpath('dir/a.txt').write_text('a')
+    tmp_path.joinpath('b.txt').write_text('b')
+
+    return tmp_path
+
+
+class TestPollingWatcher:
+    def test_scan(self, tmp_path):
+        repo_path = make_repo(tmp_path)
+        watcher = PollingWatcher(repo_path, ['.gitgud'])
+
+        assert watcher.scan() == []
+
+        repo_path.joinpath('dir/a.txt').write_text('changed a')
+        repo_path.joinpath('dir/new').mkdir()
+        repo_path.joinpath('dir/new/c.txt').write_text('c')
+        repo_path.joinpath('b.txt').unlink()
+
+        assert sorted(watcher.scan()) == ['b.txt', 'dir/a.txt', 'dir/new', 'dir/new/c.txt']
+        assert watcher.scan() == []
+
+    def test_scan_skips_ignored_paths(self, tmp_path):
+        repo_path = make_repo(tmp_path)
+        repo_path.joinpath('.gudignore').write_text('build/\n*.log\n')
+        repo_path.joinpath('build').mkdir()
+        watcher = PollingWatcher(repo_path, ['.gitgud'])
+
+        assert 'build' not in watcher.directories
+
+        repo_path.joinpath('build/out.o').write_text('o')
+        repo_path.joinpath('dir/run.log').write_text('log')
+        repo_path.joinpath('dir/c.txt').write_text('c')
+
+        assert watcher.scan() == ['dir/c.txt']
+
+        repo_path.joinpath('.gudignore').write_text('*.log\n')
+
+        assert {'.gudignore', 'build', 'build/out.o'} <= set(watcher.scan())
+        assert 'dir/run.log' not in watcher.files
+
+    def test_poll_reports_cookies(self, tmp_path):
+        repo_path = make_repo(tmp_path)
+        watcher = PollingWatcher(repo_path, ['.gitgud'], interval=60)
+        repo_path.joinpath('.gitgud/fsmonitor/cookie-1').write_text('')
+
+        assert watcher.poll(0) == ['.gitgud/fsmonitor/cookie-1']
+
+
+class TestFsMonitorClient:
+    def test_query(self, tmp_path, monkeypatch):
+        repo_path = make_repo(tmp_path)
+        daemon = FsMonitorDaemon(repo_path, ['.gitgud'], True)
+        daemon.start_generation()
+        repo_path.joinpath('.gitgud/fsmonitor/pid').write_text(str(os.getpid()))
+
+        client = FsMonitorClient(repo_path.joinpath('.gitgud'))
+        monkeypatch.setattr(client, 'sync', lambda: True)
+
+        token, changed_paths = client.query('')
+
+        assert token == f'{daemon.generation}:0'
+        assert changed_paths is None
+
+        repo_path.joinpath('.gitgud/fsmonitor/cookie-1').write_text('')
+        daemon.record(['dir/a.txt', '.gitgud/fsmonitor/cookie-1', 'b.txt'])
+
+        assert not repo_path.joinpath('.gitgud/fsmonitor/cookie-1').exists()
+
+        new_token, changed_paths = client.query(token)
+
+        assert new_token == f'{daemon.generation}:2'
+        assert changed_paths == {'dir/a.txt', 'b.txt'}
+
+        daemon.record(['dir/a.txt'])
+
+        assert client.query(new_token)[1] == {'dir/a.txt'}
+
+        daemon.start_generation()
+
+        assert client.query(new_token)[1] is None
+
+    def test_state(self, tmp_path):
+        repo_path = make_repo(tmp_path)
+        client = FsMonitorClient(repo_path.joinpath('.gitgud'))
+
+        assert client.read_state().token == ''
+
+        client.write_state(FsMonitorState('gen:3', {'b.txt', 'dir/a.txt'}))
+        state = client.read_state()
+
+        assert state.token == 'gen:3'
+        assert state.pending_paths == {'b.txt', 'dir/a.txt'}
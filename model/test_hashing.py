@@ -0,0 +1,71 @@
+import hashlib
+
+import pytest
+
+from pathlib import Path
+
+from model.fsck import Fsck
+from model.hashing import HASH_ALGORITHMS, get_hash_algorithm, set_hash_algorithm
+from model.index import Index, IndexEntry
+from model.objects import Blob, TreeNode, TreeNodeEntry
+from model.repo import Repo
+
+
+@pytest.fixture(autouse=True)
+def restore_hash_algorithm():
+    yield
+
+    set_hash_algorithm('sha1')
+
+
+class TestHashAlgorithm:
+    def test_algorithms(self):
+        assert HASH_ALGORITHMS['sha1'].hexdigest(b'data') == hashlib.sha1(b'data').hexdigest()
+        assert HASH_ALGORITHMS['sha256'].hex_length == 64
+        assert HASH_ALGORITHMS['blake2b'].hexdigest(b'data') == hashlib.blake2b(b'data', digest_size=32).hexdigest()
+        assert HASH_ALGORITHMS['sha256'].is_valid_oid('a' * 64)
+        assert not HASH_ALGORITHMS['sha256'].is_valid_oid('a' * 40)
+        assert not HASH_ALGORITHMS['sha1'].is_valid_oid('z' * 40)
+
+    def test_unknown_algorithm(self):
+        with pytest.raises(Exception):
+            set_hash_algorithm('md5')
+
+    @pytest.mark.parametrize('name', ['sha256', 'blake2b'])
+    def test_codecs(self, name):
+        set_hash_algorithm(name)
+
+        blob = Blob(b'content')
+        tree = TreeNode({})
+        tree.add(TreeNodeEntry(Path('dir/file'), blob.get_oid(), 'blob', False, None), ('dir', 'file'))
+        decoded_tree = TreeNode.decode(tree.encode())
+
+        assert len(blob.get_oid()) == 64
+        assert decoded_tree.get_oid() == tree.get_oid()
+
+        entry = IndexEntry('file', False, blob.get_oid(), 1, 2, 3, 4, 5, 6, 7)
+        index = Index(Path('/index'))
+        index.entries['file'] = entry
+        encoded_index = index.encode()
+
+        assert Index.validate_data(encoded_index)
+        assert Index.decode(encoded_index, Path('/index')).entries['file'].oid == blob.get_oid()
+
+
+class TestRepoHashAlgorithm:
+    def test_init_records_algorithm(self, tmp_path):
+        Repo.init_repo(tmp_path, 'blake2b')
+        set_hash_algorithm('sha1')
+        repo = Repo(tmp_path)
+
+        assert get_hash_algorithm().name == 'blake2b'
+
+        tmp_path.joinpath('dir').mkdir()
+        tmp_path.joinpath('dir', 'file.txt').write_bytes(b'data')
+        repo.add_to_index([tmp_path])
+
+        oid = repo.index.entries['dir/file.txt'].oid
+
+        assert oid == hashlib.blake2b(b'blob 4\x00data', digest_size=32).hexdigest()
+        assert repo.read_blob(oid).data == b'data'
+        assert Fsck(repo, max_workers=1).run([]).corrupt == {}
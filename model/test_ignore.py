@@ -0,0 +1,79 @@
+from pathlib import Path
+from model.ignore import GudIgnore, IgnoreMatcher, IgnoreRule
+
+
+class TestIgnoreRule:
+    def test_parse(self):
+        assert IgnoreRule.parse('# comment') is None
+        assert IgnoreRule.parse('   ') is None
+
+        rule = IgnoreRule.parse('!/build/\n')
+
+        assert rule is not None
+        assert rule.pattern == 'build'
+        assert rule.is_negated and rule.is_dir_only and rule.is_anchored and rule.is_literal
+
+        rule = IgnoreRule.parse('*.o')
+
+        assert rule is not None
+        assert not rule.is_anchored and not rule.is_literal
+
+        rule = IgnoreRule.parse('\\#file')
+
+        assert rule is not None
+        assert rule.pattern == '#file'
+
+
+class TestIgnoreMatcher:
+    def test_match(self):
+        matcher = IgnoreMatcher.from_lines([
+            'node_modules',
+            '*.o',
+            'dist/',
+            '/root_only.txt',
+            'docs/**/*.tmp',
+            '**/cache',
+            'logs/**',
+            '!keep.o',
+            'file[0-9].txt',
+        ])
+
+        assert matcher.match('node_modules', 'node_modules', True) == True
+        assert matcher.match('a/b/node_modules', 'node_modules', True) == True
+        assert matcher.match('src/main.o', 'main.o', False) == True
+        assert matcher.match('src/keep.o', 'keep.o', False) == False
+        assert matcher.match('src/main.c', 'main.c', False) is None
+        assert matcher.match('dist', 'dist', True) == True
+        assert matcher.match('dist', 'dist', False) is None
+        assert matcher.match('root_only.txt', 'root_only.txt', False) == True
+        assert matcher.match('sub/root_only.txt', 'root_only.txt', False) is None
+        assert matcher.match('docs/a.tmp', 'a.tmp', False) == True
+        assert matcher.match('docs/x/y/a.tmp', 'a.tmp', False) == True
+        assert matcher.match('other/a.tmp', 'a.tmp', False) is None
+        assert matcher.match('x/y/cache', 'cache', True) == True
+        assert matcher.match('logs/a/b.txt', 'b.txt', False) == True
+        assert matcher.match('file1.txt', 'file1.txt', False) == True
+        assert matcher.match('fileA.txt', 'fileA.txt', False) is None
+
+
+class TestGudIgnore:
+    def test_is_ignored(self, tmp_path):
+        tmp_path.joinpath('.gudignore').write_text('*.log\nbuild/\n')
+        tmp_path.joinpath('sub').mkdir()
+        tmp_path.joinpath('sub/.gudignore').write_text('!important.log\n/local\n')
+
+        gud_ignore = GudIgnore(str(tmp_path), ['__pycache__'])
+
+        assert gud_ignore.is_ignored('.gitgud', '.gitgud', True)
+        assert gud_ignore.is_ignored('__pycache__', '__pycache__', True)
+        assert gud_ignore.is_ignored('a.log', 'a.log', False)
+        assert gud_ignore.is_ignored('sub/a.log', 'a.log', False)
+        assert not gud_ignore.is_ignored('sub/important.log', 'important.log', False)
+        assert gud_ignore.is_ignored('sub/local', 'local', False)
+        assert not gud_ignore.is_ignored('local', 'local', False)
+        assert gud_ignore.is_ignored('build', 'build', True)
+        assert not gud_ignore.is_ignored('build', 'build', False)
+
+        assert gud_ignore.is_path_ignored('build/out/main.c', False)
+        assert gud_ignore.is_path_ignored('sub/__pycache__/a.pyc', False)
+        assert not gud_ignore.is_path_ignored('sub/main.c', False)
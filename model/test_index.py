@@ -376,3 +376,19 @@ class TestIndex:
         checksum = bytes.fromhex(hashlib.sha1(valid_data_multiple_entries).hexdigest())
         
         assert index.encode() == valid_data_multiple_entries + checksum
+
+    def test_add_entries(self, fs):
+        index = Index(Path('/index').resolve())
+
+        for path in ['dir', 'other/file.txt', 'keep.txt']:
+            index._add_entry(IndexEntry(
+                Path(path), False, 'abcd'*10, 1, 2, 3, 4, 5, 6, 7,
+            ))
+
+        index.add_entries([
+            IndexEntry(Path('dir/file.txt'), False, 'ef01'*10, 1, 2, 3, 4, 5, 6, 7),
+            IndexEntry(Path('other'), False, 'ef01'*10, 1, 2, 3, 4, 5, 6, 7),
+        ])
+
+        assert sorted(index.entries) == ['dir/file.txt', 'keep.txt', 'other']
+        assert index.entries['other'].oid == 'ef01'*10
@@ -0,0 +1,54 @@
+import hashlib
+import io
+
+from pathlib import Path
+
+from model.lfs import LfsPointer, LfsStore, copy_file_data
+
+
+class TestLfsPointer:
+    def test_encode_parse(self):
+        pointer = LfsPointer('a' * 64, 1234)
+        parsed = LfsPointer.parse(pointer.encode())
+
+        assert pointer.encode() == (
+            b'version https://git-lfs.github.com/spec/v1\n'
+            b'oid sha256:' + b'a' * 64 + b'\n'
+            b'size 1234\n'
+        )
+        assert parsed.oid == 'a' * 64
+        assert parsed.size == 1234
+
+    def test_parse_other_data(self):
+        assert LfsPointer.parse(b'just a file\n') is None
+        assert LfsPointer.parse(b'version 1\noid sha256:abc\nsize 1\n') is None
+        assert LfsPointer.parse(b'version ' + b'x' * 1000) is None
+
+
+class TestLfsStore:
+    def test_store_and_restore(self, tmp_path):
+        store = LfsStore(tmp_path.joinpath('.gitgud'))
+        data = b'large file' * 10000
+        source_path = tmp_path.joinpath('large.bin')
+        source_path.write_bytes(data)
+
+        pointer = store.store_file(source_path)
+
+        assert pointer.oid == hashlib.sha256(data).hexdigest()
+        assert pointer.size == len(data)
+        assert store.get_object_path(pointer.oid).read_bytes() == data
+        assert store.store_file(source_path).oid == pointer.oid
+
+        restored_path = tmp_path.joinpath('restored.bin')
+
+        assert store.restore_file(pointer, restored_path)
+        assert restored_path.read_bytes() == data
+        assert not store.restore_file(LfsPointer('b' * 64, 1), restored_path)
+
+    def test_copy_file_data_fallback(self):
+        source = io.BytesIO(b'data')
+        destination = io.BytesIO()
+
+        copy_file_data(source, destination)
+
+        assert destination.getvalue() == b'data'
@@ -0,0 +1,97 @@
+import difflib
+import random
+
+from model.line_diff import count_changes, diff_lines, unified_diff
+
+
+def apply_opcodes(old_lines, new_lines, opcodes):
+    result = []
+    old_pos, new_pos = 0, 0
+
+    for tag, old_start, old_end, new_start, new_end in opcodes:
+        assert (old_start, new_start) == (old_pos, new_pos)
+
+        if tag == 'equal':
+            assert old_lines[old_start:old_end] == new_lines[new_start:new_end]
+            result.extend(old_lines[old_start:old_end])
+        elif tag == 'insert':
+            result.extend(new_lines[new_start:new_end])
+
+        old_pos, new_pos = old_end, new_end
+
+    assert (old_pos, new_pos) == (len(old_lines), len(new_lines))
+
+    return result
+
+
+class TestDiffLines:
+    def test_diff_lines_is_minimal(self):
+        random.seed(0)
+
+        for _ in range(200):
+            old_lines = [random.choice([b'a\n', b'b\n', b'c\n']) for _ in range(random.randint(0, 20))]
+            new_lines = [random.choice([b'a\n', b'b\n', b'c\n', b'd\n']) for _ in range(random.randint(0, 20))]
+            opcodes = list(diff_lines(old_lines, new_lines))
+
+            assert apply_opcodes(old_lines, new_lines, opcodes) == new_lines
+
+            matched = sum(old_end - old_start for tag, old_start, old_end, _, _ in opcodes if tag == 'equal')
+            longest = sum(block.size for block in difflib.SequenceMatcher(None, old_lines, new_lines, autojunk=False).get_matching_blocks())
+
+            assert matched >= longest
+
+    def test_diff_lines_orders_delete_before_insert(self):
+        opcodes = list(diff_lines([b'a\n', b'b\n', b'c\n'], [b'a\n', b'x\n', b'c\n']))
+
+        assert opcodes == [
+            ('equal', 0, 1, 0, 1),
+            ('delete', 1, 2, 1, 1),
+            ('insert', 2, 2, 1, 2),
+            ('equal', 2, 3, 2, 3),
+        ]
+
+    def test_diff_lines_empty(self):
+        assert list(diff_lines([], [])) == []
+        assert list(diff_lines([], [b'a\n'])) == [('insert', 0, 0, 0, 1)]
+        assert list(diff_lines([b'a\n'], [])) == [('delete', 0, 1, 0, 0)]
+
+
+class TestUnifiedDiff:
+    def test_unified_diff_matches_difflib(self):
+        old_data = b''.join(b'line %d\n' % i for i in range(1000))
+        new_data = old_data.replace(b'line 5\n', b'line five\n').replace(b'line 990\n', b'')
+        diff = b''.join(unified_diff(old_data, new_data, 'a/f', 'b/f')).decode()
+        expected = ''.join(difflib.unified_diff(
+            old_data.decode().splitlines(keepends=True),
+            new_data.decode().splitlines(keepends=True),
+            'a/f',
+            'b/f',
+        ))
+
+        assert diff == expected
+
+    def test_unified_diff_missing_newline(self):
+        diff = b''.join(unified_diff(b'a\nb', b'a\nc\n', 'a/f', 'b/f'))
+
+        assert diff == (
+            b'--- a/f\n+++ b/f\n@@ -1,2 +1,2 @@\n a\n'
+            b'-b\n\\ No newline at end of file\n+c\n'
+        )
+
+    def test_unified_diff_carriage_return(self):
+        diff = b''.join(unified_diff(b'a\rb\nc\n', b'a\rb\nd\n', 'a/f', 'b/f'))
+
+        assert diff == b'--- a/f\n+++ b/f\n@@ -1,2 +1,2 @@\n a\rb\n-c\n+d\n'
+        assert count_changes(b'a\rb\nc\n', b'a\rx\nc\n') == (1, 1)
+
+    def test_unified_diff_binary(self):
+        diff = b''.join(unified_diff(b'\x00\x01', b'\x00\x02', 'a/f', 'b/f'))
+
+        assert diff == b'--- a/f\n+++ b/f\nBinary files differ\n'
+
+    def test_unified_diff_identical(self):
+        assert list(unified_diff(b'same\n', b'same\n', 'a/f', 'b/f')) == []
+
+    def test_count_changes(self):
+        assert count_changes(b'a\nb\nc\n', b'a\nx\ny\nc\n') == (2, 1)
+        assert count_changes(b'\x00', b'\x01') == (0, 0)
@@ -5,7 +5,7 @@ import hashlib
 from datetime import datetime
 from pathlib import Path
 from typing import Dict, List
-from model.objects import Blob, Commit, TreeNode, TreeNodeEntry
+from model.objects import Blob, BlobManifest, Commit, TreeNode, TreeNodeEntry
 
 class TestBlob:
     def test_verify_encoded_data(self):
@@ -337,3 +337,16 @@ class TestCommit:
 
         assert Commit.decode(commit_bytes) == commit
 
+
+
+class TestBlobManifest:
+    def test_encode_decode(self):
+        chunks = [(Blob(b'first').get_oid(), 5), (Blob(b'second').get_oid(), 6)]
+        manifest = BlobManifest(chunks)
+        decoded = BlobManifest.decode(manifest.encode())
+
+        assert decoded.chunks == chunks
+        assert decoded.size == 11
+
+        with pytest.raises(Exception):
+            BlobManifest.decode(b'manifest 3\x00abc')
@@ -0,0 +1,107 @@
+import pytest
+
+from pathlib import Path
+from model import oid_index
+from model.testing import write_commit
+from model.objects import Blob
+from model.repo import Repo
+
+
+# the cached index is validated against directory mtimes, which pyfakefs
+# does not update, so these tests use a real temporary directory
+def init_repo(repo_path: Path) -> Repo:
+    Repo.init_repo(repo_path)
+
+    return Repo(repo_path)
+
+
+def write_blobs(repo: Repo, count: int) -> list:
+    blobs = [Blob(b'%d' % i) for i in range(count)]
+
+    for blob in blobs:
+        repo.write_object(blob)
+
+    return [blob.get_oid() for blob in blobs]
+
+
+class TestOidIndex:
+    def test_find(self, tmp_path):
+        repo = init_repo(tmp_path)
+        oids = write_blobs(repo, 50)
+
+        for oid in oids:
+            assert repo.oid_index.find(oid[:7]) == [oid]
+            assert oid in repo.oid_index.find(oid[:2])
+            assert repo.oid_index.find(oid.upper()[:5]) == [oid]
+
+        assert repo.oid_index.find('0000000') == []
+
+    def test_index_is_reused_until_a_directory_changes(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(oid_index, 'RACY_MTIME_NS', 0)
+        repo = init_repo(tmp_path)
+        oids = write_blobs(repo, 20)
+        listed_fanouts = []
+        list_fanout_oids = repo.oid_index.list_fanout_oids
+
+        def counting_list_fanout_oids(fanout):
+            listed_fanouts.append(fanout)
+
+            return list_fanout_oids(fanout)
+
+        monkeypatch.setattr(repo.oid_index, 'list_fanout_oids', counting_list_fanout_oids)
+
+        assert repo.oid_index.find(oids[0][:6]) == [oids[0]]
+        assert len(listed_fanouts) == oid_index.FANOUT_SIZE
+        assert repo.storage_path.joinpath('oid-index').is_file()
+
+        listed_fanouts.clear()
+
+        for oid in oids:
+            assert repo.oid_index.find(oid[:6]) == [oid]
+
+        assert listed_fanouts == []
+
+        new_blob = Blob(b'new')
+        repo.write_object(new_blob)
+
+        assert repo.oid_index.find(new_blob.get_oid()[:6]) == [new_blob.get_oid()]
+        assert listed_fanouts == [int(new_blob.get_oid()[:2], 16)]
+
+
+class TestResolveOid:
+    def test_abbreviations(self, tmp_path):
+        repo = init_repo(tmp_path)
+        commit_oid = write_commit(repo, Blob(b'').get_oid(), 'first', '').get_oid()
+
+        assert repo.resolve_oid(commit_oid[:4]) == commit_oid
+        assert repo.resolve_oid(commit_oid) == commit_oid
+        assert repo.resolve_commit(commit_oid[:9]).message == 'first'
+
+        with pytest.raises(Exception, match='Unknown revision'):
+            repo.resolve_oid(commit_oid[:3])
+
+        with pytest.raises(Exception, match='Unknown revision'):
+            repo.resolve_oid('xyzw')
+
+    def test_ambiguous_abbreviations(self, tmp_path):
+        repo = init_repo(tmp_path)
+        oids = write_blobs(repo, 1000)
+        prefixes = {}
+
+        for oid in oids:
+            prefixes.setdefault(oid[:4], []).append(oid)
+
+        ambiguous_prefix = next(prefix for prefix, prefix_oids in prefixes.items() if len(prefix_oids) > 1)
+
+        with pytest.raises(Exception, match='Ambiguous revision'):
+            repo.resolve_oid(ambiguous_prefix)
+
+        # a commit sharing its abbreviation with a blob is still found
+        message = 0
+
+        while write_commit(repo, Blob(b'').get_oid(), str(message), '').get_oid()[:4] not in prefixes:
+            message += 1
+
+        commit_oid = write_commit(repo, Blob(b'').get_oid(), str(message), '').get_oid()
+
+        assert repo.resolve_oid(commit_oid[:4]) == commit_oid
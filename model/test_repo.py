@@ -1,7 +1,12 @@
+import os
 import pytest
 
 from pathlib import Path
+from model.compression import Compressor
+from model.testing import commit_files
+from model.lfs import LfsPointer
 from model.repo import Repo
+from model.objects import Blob
 from model.misc import RepoObjPath
 
 class TestRepoObjPath:
@@ -20,3 +25,249 @@ class TestRepoObjPath:
 
         assert test_path_file.exists() == True
         assert test_path_file.is_dir() == False
+
+
+class TestRepo:
+    def test_checkout(self, fs, capsys):
+        repo_path = Path('/repo')
+        repo_path.mkdir()
+        Repo.init_repo(repo_path)
+        repo = Repo(repo_path)
+
+        first_oid = commit_files(repo, {
+            'same/a.txt': b'a',
+            'changed.txt': b'old',
+            'removed/b.txt': b'b',
+        }, should_update_head=False)
+        second_oid = commit_files(repo, {
+            'same/a.txt': b'a',
+            'changed.txt': b'new',
+            'added.txt': b'added',
+        }, should_update_head=False)
+
+        repo.checkout(first_oid)
+
+        assert repo_path.joinpath('changed.txt').read_bytes() == b'old'
+        assert repo_path.joinpath('removed/b.txt').read_bytes() == b'b'
+        assert repo.read_head() == first_oid
+
+        capsys.readouterr()
+        repo.checkout(second_oid)
+
+        assert repo_path.joinpath('changed.txt').read_bytes() == b'new'
+        assert repo_path.joinpath('added.txt').read_bytes() == b'added'
+        assert not repo_path.joinpath('removed').exists()
+        assert capsys.readouterr().out.endswith('1 added, 1 modified, 1 deleted\n')
+        assert repo.status().is_clean()
+
+    def test_checkout_after_head_moved(self, fs):
+        repo_path = Path('/repo')
+        repo_path.mkdir()
+        Repo.init_repo(repo_path)
+        repo = Repo(repo_path)
+
+        repo.checkout(commit_files(repo, {'a.txt': b'a', 'b.txt': b'b'}, should_update_head=False))
+        # HEAD moves without the working tree, like after fast-import
+        commit_files(repo, {'a.txt': b'a2'})
+
+        assert repo.status().modified == ['a.txt']
+
+        repo.checkout('HEAD')
+
+        assert repo_path.joinpath('a.txt').read_bytes() == b'a2'
+        assert not repo_path.joinpath('b.txt').exists()
+        assert repo.status().is_clean()
+
+    def test_resolve_path(self, fs):
+        repo_path = Path('/repo')
+        repo_path.mkdir()
+        Repo.init_repo(repo_path)
+        repo = Repo(repo_path)
+
+        commit_oid = commit_files(repo, {
+            'dir/sub/a.txt': b'a',
+            'other/b.txt': b'b',
+        }, should_update_head=False)
+        tree_oid = repo.read_commit(commit_oid).tree_oid
+        read_oids = []
+        read_tree = repo.read_tree
+
+        def counting_read_tree(oid, *args):
+            read_oids.append(oid)
+
+            return read_tree(oid, *args)
+
+        repo.read_tree = counting_read_tree
+
+        entry = repo.resolve_path(tree_oid, 'dir/sub/a.txt')
+
+        assert entry.type == 'blob'
+        assert repo.read_blob(entry.oid).data == b'a'
+        assert len(read_oids) == 3
+        assert repo.resolve_path(tree_oid, 'dir/sub').type == 'tree'
+        assert repo.resolve_path(tree_oid, 'dir/missing') is None
+        assert repo.resolve_path(tree_oid, 'dir/sub/a.txt/x') is None
+
+    def test_iter_tree(self, fs):
+        repo_path = Path('/repo')
+        repo_path.mkdir()
+        Repo.init_repo(repo_path)
+        repo = Repo(repo_path)
+
+        commit_oid = commit_files(repo, {
+            'b.txt': b'b',
+            'a/z.txt': b'z',
+            'a/deep/y.txt': b'y',
+            'c/x.txt': b'x',
+        }, should_update_head=False)
+        tree_oid = repo.read_commit(commit_oid).tree_oid
+
+        assert [path for path, _, _ in repo.iter_tree(tree_oid)] == [
+            'a/deep/y.txt',
+            'a/z.txt',
+            'b.txt',
+            'c/x.txt',
+        ]
+        assert [
+            path for path, _, _ in repo.iter_tree(tree_oid, lambda path, is_tree: not path.startswith('a'))
+        ] == ['b.txt', 'c/x.txt']
+
+    def test_read_objects(self, fs):
+        repo_path = Path('/repo')
+        repo_path.mkdir()
+        Repo.init_repo(repo_path)
+        repo = Repo(repo_path)
+
+        blobs = [Blob(b'%d' % i) for i in range(100)]
+
+        for blob in blobs:
+            repo.write_object(blob)
+
+        oids = [blob.get_oid() for blob in blobs]
+        read_objects = dict((oid, (object_type, data)) for oid, object_type, data in repo.read_objects(oids + oids[:3]))
+
+        assert read_objects == dict((oid, repo.read_object(oid)) for oid in oids)
+
+        with pytest.raises(Exception, match='Cannot open object'):
+            list(repo.read_objects(oids[:10] + ['ab'*20]))
+
+    def test_read_tree_levels(self, fs):
+        repo_path = Path('/repo')
+        repo_path.mkdir()
+        Repo.init_repo(repo_path)
+        repo = Repo(repo_path)
+
+        files = dict((f'dir{i}/sub{i % 3}/file.txt', b'%d' % (i % 2)) for i in range(20))
+        files['dir0/sub0/deep/file.txt'] = b'deep'
+        commit_oid = commit_files(repo, files, should_update_head=False)
+        tree_oid = repo.read_commit(commit_oid).tree_oid
+
+        tree = repo.read_tree(tree_oid, [], Path(''), True)
+        dir0 = tree.entries['dir0'].content
+
+        assert len(tree.entries) == 20
+        assert dir0.entries['sub0'].content.entries['deep'].content.entries['file.txt'].oid == Blob(b'deep').get_oid()
+        # dir2 and dir8 share their subtree oid but not their nodes
+        assert tree.entries['dir2'].oid == tree.entries['dir8'].oid
+        assert tree.entries['dir2'].content is not tree.entries['dir8'].content
+        assert tree.get_oid() == tree_oid
+
+        partial_tree = repo.read_tree(tree_oid, [Path('dir5/sub2/file.txt')], Path(''), False)
+
+        assert partial_tree.entries['dir5'].content.entries['sub2'].content is not None
+        assert partial_tree.entries['dir4'].content is None
+
+    def test_read_object_info(self, fs):
+        repo_path = Path('/repo')
+        repo_path.mkdir()
+        Repo.init_repo(repo_path)
+        repo = Repo(repo_path)
+
+        large_blob = Blob(os.urandom(1 << 20))
+        repo.write_object(large_blob)
+        commit_oid = commit_files(repo, {'dir/a.txt': b'abc'}, should_update_head=False)
+
+        assert repo.read_object_info(large_blob.get_oid()) == ('blob', 1 << 20)
+        assert repo.read_object_info(Blob(b'abc').get_oid()) == ('blob', 3)
+        assert repo.read_object_info(commit_oid)[0] == 'commit'
+
+        with pytest.raises(Exception):
+            repo.read_object_info('0' * 40)
+
+    def test_read_object(self, fs):
+        repo_path = Path('/repo')
+        repo_path.mkdir()
+        Repo.init_repo(repo_path)
+        repo = Repo(repo_path)
+
+        commit_oid = commit_files(repo, {'a.txt': b'abc'}, should_update_head=False)
+        commit = repo.read_commit(commit_oid)
+
+        assert repo.read_object(Blob(b'abc').get_oid()) == ('blob', b'abc')
+        assert repo.read_object(commit_oid) == ('commit', commit.encode().split(b'\x00', 1)[1])
+
+        with pytest.raises(Exception):
+            repo.read_object('0' * 40)
+
+    def test_repack(self, fs):
+        repo_path = Path('/repo')
+        repo_path.mkdir()
+        Repo.init_repo(repo_path)
+        repo = Repo(repo_path)
+
+        commit_oid = commit_files(repo, {'dir/a.txt': b'a' * 1000, 'b.txt': b'b'}, should_update_head=False)
+        repacked_count, _, _ = repo.repack(Compressor('lzma'))
+
+        assert repacked_count == 5
+        assert repo.read_commit(commit_oid).message == 'test commit'
+        assert repo.read_blob(Blob(b'a' * 1000).get_oid()).data == b'a' * 1000
+        assert repo.read_object_info(Blob(b'b').get_oid()) == ('blob', 1)
+        assert repo.storage_path.joinpath('objects', commit_oid[:2], commit_oid[2:]).read_bytes().startswith(b'\xfd7zXZ')
+
+    def test_chunked_blob(self, fs):
+        repo_path = Path('/repo')
+        repo_path.mkdir()
+        Repo.init_repo(repo_path)
+        repo = Repo(repo_path)
+        repo.chunk_threshold = 1 << 20
+
+        data = os.urandom(2 << 20)
+        blob = Blob(data)
+        repo.write_object(blob)
+        first_count = len(list(repo.list_object_oids()))
+
+        edited = Blob(data[:1000000] + b'edit' + data[1000000:])
+        repo.write_object(edited)
+
+        assert first_count > 2
+        assert len(list(repo.list_object_oids())) - first_count <= 3
+        assert repo.read_blob(blob.get_oid()).data == data
+        assert repo.read_object_info(edited.get_oid()) == ('blob', len(data) + 4)
+
+        repo.restore_blob(edited.get_oid(), repo_path.joinpath('big.bin'), False)
+
+        assert repo_path.joinpath('big.bin').read_bytes() == edited.data
+
+    def test_lfs_file(self, fs):
+        repo_path = Path('/repo')
+        repo_path.mkdir()
+        Repo.init_repo(repo_path)
+        repo = Repo(repo_path)
+        repo.lfs_threshold = 1000
+
+        large_data = b'x' * 5000
+        repo_path.joinpath('large.bin').write_bytes(large_data)
+        repo_path.joinpath('small.txt').write_bytes(b'small')
+        repo.add_to_index([repo_path])
+
+        pointer_oid = repo.index.entries['large.bin'].oid
+        pointer = LfsPointer.parse(repo.read_blob(pointer_oid).data)
+
+        assert pointer.size == len(large_data)
+        assert repo.lfs_store.contains(pointer.oid)
+        assert repo.read_blob(repo.index.entries['small.txt'].oid).data == b'small'
+        assert repo.status().modified == []
+
+        repo.restore_blob(pointer_oid, repo_path.joinpath('restored.bin'), False)
+
+        assert repo_path.joinpath('restored.bin').read_bytes() == large_data
@@ -0,0 +1,90 @@
+from datetime import datetime
+from pathlib import Path
+from model.repo import Repo
+from model.objects import Blob, Commit, TreeNode, TreeNodeEntry
+from model.sparse import SparseCheckout
+from model.status import StatCache
+from model.testing import commit_files
+
+
+class TestSparseCheckout:
+    def test_matches(self):
+        sparse_checkout = SparseCheckout(Path('/sparse-checkout'), ['services/billing/', './docs'])
+
+        assert sparse_checkout.prefixes == ['docs', 'services/billing']
+        assert sparse_checkout.matches('docs/readme.md', False)
+        assert sparse_checkout.matches('services', True)
+        assert sparse_checkout.matches('services/billing/api', True)
+        assert not sparse_checkout.matches('services/auth', True)
+        assert not sparse_checkout.matches('services/readme.md', False)
+        assert not sparse_checkout.matches('docsx', True)
+
+    def test_disabled(self):
+        assert not SparseCheckout(Path('/sparse-checkout'), []).is_enabled
+        assert not SparseCheckout(Path('/sparse-checkout'), ['.']).is_enabled
+
+    def test_read_write(self, fs):
+        Path('/storage').mkdir()
+
+        assert not SparseCheckout.read_sparse_checkout(Path('/storage')).is_enabled
+
+        SparseCheckout(Path('/storage/sparse-checkout'), ['a', 'b/c']).write()
+
+        assert SparseCheckout.read_sparse_checkout(Path('/storage')).prefixes == ['a', 'b/c']
+
+
+class TestSparseRepo:
+    def test_checkout(self, fs, capsys):
+        repo_path = Path('/repo')
+        repo_path.mkdir()
+        Repo.init_repo(repo_path)
+        repo = Repo(repo_path)
+        tree = TreeNode({})
+
+        for path in ['in/a.txt', 'out/b.txt', 'root.txt']:
+            blob = Blob(path.encode())
+            repo.write_object(blob)
+            tree.add(TreeNodeEntry(Path(path), blob.get_oid(), 'blob', False, None), Path(path).parts)
+
+        repo.write_tree(tree)
+        commit = Commit('name', 'email', 'message', tree.get_oid(), datetime(2021, 8, 28), '')
+        repo.write_object(commit)
+
+        repo.set_sparse_checkout(['in'])
+        repo.checkout(commit.get_oid())
+
+        assert repo_path.joinpath('in/a.txt').read_bytes() == b'in/a.txt'
+        assert not repo_path.joinpath('out').exists()
+        assert not repo_path.joinpath('root.txt').exists()
+        assert [path for path, _, _ in repo.iter_tree(tree.get_oid(), repo.get_path_filter())] == ['in/a.txt']
+        assert repo.status().is_clean()
+
+        repo.set_sparse_checkout([])
+
+        assert repo_path.joinpath('out/b.txt').read_bytes() == b'out/b.txt'
+        assert repo.status().is_clean()
+
+    def test_keeps_modified_files(self, fs, capsys):
+        repo_path = Path('/repo')
+        repo_path.mkdir()
+        Repo.init_repo(repo_path)
+        repo = Repo(repo_path)
+
+        repo.checkout(commit_files(repo, {'in/a.txt': b'a', 'out/b.txt': b'b', 'out/c.txt': b'c'}))
+        repo_path.joinpath('out/b.txt').write_bytes(b'changed')
+        cache_path = repo.storage_path.joinpath('stat-cache')
+        in_entry = StatCache.read_stat_cache(cache_path).entries['in/a.txt']
+        capsys.readouterr()
+
+        repo.set_sparse_checkout(['in'])
+
+        assert capsys.readouterr().out == \
+            'warning: out/b.txt has local changes, it is kept\n' \
+            '0 added, 1 removed\n'
+        assert repo_path.joinpath('out/b.txt').read_bytes() == b'changed'
+        assert not repo_path.joinpath('out/c.txt').exists()
+
+        stat_cache = StatCache.read_stat_cache(cache_path)
+
+        assert sorted(stat_cache.entries) == ['in/a.txt']
+        assert stat_cache.entries['in/a.txt'].mtime_s == in_entry.mtime_s != 0
@@ -0,0 +1,136 @@
+import os
+
+from pathlib import Path
+from model.testing import commit_files
+from model.repo import Repo
+from model.status import StatCache, Status
+
+
+class TestStatCache:
+    def test_read_write(self, fs):
+        cache_path = Path('/stat-cache')
+        Path('/file.txt').write_text('content')
+
+        stat_cache = StatCache.read_stat_cache(cache_path)
+
+        assert stat_cache.tree_oid == ''
+        assert len(stat_cache.entries) == 0
+
+        stat_cache.tree_oid = 'abcd'*10
+        stat_cache.refresh('file.txt', 'ef01'*10, Path('/file.txt').stat(), False)
+        stat_cache.write()
+
+        read_cache = StatCache.read_stat_cache(cache_path)
+
+        assert read_cache.tree_oid == 'abcd'*10
+        assert read_cache.entries['file.txt'].oid == 'ef01'*10
+        assert read_cache.entries['file.txt'].matches_stat(Path('/file.txt').stat())
+
+    def test_corrupted_cache_is_discarded(self, fs):
+        cache_path = Path('/stat-cache')
+        cache_path.write_bytes(b'garbage')
+
+        stat_cache = StatCache.read_stat_cache(cache_path)
+
+        assert len(stat_cache.entries) == 0
+        assert stat_cache.is_dirty
+
+        Path('/file.txt').write_text('content')
+        stat_cache.tree_oid = 'abcd'*10
+        stat_cache.refresh('file.txt', 'ef01'*10, Path('/file.txt').stat(), False)
+        stat_cache.write()
+        content = bytearray(cache_path.read_bytes())
+        # a flipped byte inside the entry fails the checksum
+        content[-30] ^= 0xff
+        cache_path.write_bytes(bytes(content))
+
+        stat_cache = StatCache.read_stat_cache(cache_path)
+
+        assert stat_cache.tree_oid == ''
+        assert len(stat_cache.entries) == 0
+        assert stat_cache.is_dirty
+
+
+class TestStatus:
+    def test_status(self, fs):
+        repo_path = Path('/repo')
+        repo_path.mkdir()
+        Repo.init_repo(repo_path)
+        repo = Repo(repo_path)
+
+        repo_path.joinpath('dir').mkdir()
+        repo_path.joinpath('dir/a.txt').write_text('a')
+        repo_path.joinpath('b.txt').write_text('b')
+        repo_path.joinpath('__pycache__').mkdir()
+        repo_path.joinpath('__pycache__/c.pyc').write_text('c')
+
+        status = repo.status()
+
+        assert sorted(status.untracked) == ['b.txt', 'dir/a.txt']
+
+        repo.add_to_index([repo_path.joinpath('dir')])
+        status = repo.status()
+
+        assert status.staged_added == ['dir/a.txt']
+        assert status.untracked == ['b.txt']
+
+        commit_files(repo, {'dir/a.txt': b'a'})
+        repo.index.clear()
+        repo_path.joinpath('b.txt').unlink()
+        status = repo.status()
+
+        assert status.is_clean()
+
+        repo_path.joinpath('dir/a.txt').write_text('changed')
+        status = repo.status()
+
+        assert status.modified == ['dir/a.txt']
+
+        repo_path.joinpath('dir/a.txt').unlink()
+        status = repo.status()
+
+        assert status.deleted == ['dir/a.txt']
+
+    def test_commit_seeds_stat_cache(self, fs):
+        repo_path = Path('/repo')
+        repo_path.mkdir()
+        Repo.init_repo(repo_path)
+        repo = Repo(repo_path)
+
+        for name in ['a.txt', 'b.txt']:
+            repo_path.joinpath(name).write_text(name)
+            # older than the index, so their stat data can be trusted
+            os.utime(str(repo_path.joinpath(name)), (1600000000, 1600000000))
+
+        repo.add_to_index([repo_path])
+        repo.seed_stat_cache(repo.read_commit(commit_files(repo, {'a.txt': b'a.txt', 'b.txt': b'b.txt'})))
+        repo.index.clear()
+
+        hashed_paths = []
+        hash_working_file = repo.hash_working_file
+
+        def counting_hash_working_file(path, size):
+            hashed_paths.append(path)
+
+            return hash_working_file(path, size)
+
+        repo.hash_working_file = counting_hash_working_file
+
+        assert repo.status().is_clean()
+        assert hashed_paths == []
+
+    def test_str(self):
+        status = Status()
+
+        assert str(status) == 'nothing to commit, working tree clean\n'
+
+        status.staged_added.append('a.txt')
+        status.untracked.append('b.txt')
+
+        assert str(status) == \
+            'Changes to be committed:\n' + \
+            '\tnew file:   a.txt\n' + \
+            '\n' + \
+            'Untracked files:\n' + \
+            '\tb.txt\n' + \
+            '\n'
@@ -0,0 +1,88 @@
+from pathlib import Path
+from model.testing import write_files
+from model.repo import Repo
+from model.objects import Blob, TreeNodeEntry
+from model.tree_diff import TreeChange, diff_trees, merge_entries
+
+
+class TestDiffTrees:
+    def test_diff_trees(self, fs):
+        repo_path = Path('/repo')
+        repo_path.mkdir()
+        Repo.init_repo(repo_path)
+        repo = Repo(repo_path)
+
+        old_tree = write_files(repo, {
+            'same/a.txt': b'a',
+            'changed/b.txt': b'b',
+            'changed/c.txt': b'c',
+            'removed.txt': b'removed',
+        })
+        new_tree = write_files(repo, {
+            'same/a.txt': b'a',
+            'changed/b.txt': b'b2',
+            'changed/c.txt': b'c',
+            'added/d.txt': b'd',
+        })
+
+        changes = list(diff_trees(repo, old_tree.get_oid(), new_tree.get_oid()))
+
+        assert [(change.status, change.path) for change in changes] == [
+            ('added', 'added/d.txt'),
+            ('modified', 'changed/b.txt'),
+            ('deleted', 'removed.txt'),
+        ]
+        assert changes[1].new_oid == Blob(b'b2').get_oid()
+
+    def test_identical_trees_are_not_read(self, fs):
+        repo_path = Path('/repo')
+        repo_path.mkdir()
+        Repo.init_repo(repo_path)
+        repo = Repo(repo_path)
+
+        assert list(diff_trees(repo, 'abcd'*10, 'abcd'*10)) == []
+
+    def test_only_changed_trees_are_read(self, fs, monkeypatch):
+        repo_path = Path('/repo')
+        repo_path.mkdir()
+        Repo.init_repo(repo_path)
+        repo = Repo(repo_path)
+
+        files = dict((f'dir{i}/sub/file.txt', b'%d' % i) for i in range(10))
+        old_tree = write_files(repo, files)
+        files['dir3/sub/file.txt'] = b'changed'
+        new_tree = write_files(repo, files)
+
+        read_oids = []
+        read_tree = repo.read_tree
+
+        def counting_read_tree(tree_oid, *args):
+            read_oids.append(tree_oid)
+
+            return read_tree(tree_oid, *args)
+
+        monkeypatch.setattr(repo, 'read_tree', counting_read_tree)
+
+        changes = list(diff_trees(repo, old_tree.get_oid(), new_tree.get_oid()))
+
+        assert [change.path for change in changes] == ['dir3/sub/file.txt']
+        # root, dir3 and dir3/sub of both trees
+        assert len(read_oids) == 6
+
+
+class TestMergeEntries:
+    def test_merge_entries(self):
+        def entry(name):
+            return TreeNodeEntry(Path(name), 'abcd'*10, 'blob', False, None)
+
+        merged = list(merge_entries(
+            {'a': entry('a'), 'c': entry('c')},
+            {'b': entry('b'), 'c': entry('c'), 'd': entry('d')},
+        ))
+
+        assert [(name, old is not None, new is not None) for name, old, new in merged] == [
+            ('a', True, False),
+            ('b', False, True),
+            ('c', True, True),
+            ('d', False, True),
+        ]
@@ -0,0 +1,50 @@
+from pathlib import Path
+
+import model.walker
+from model.walker import WorkingTreeWalker
+
+
+def make_tree(tmp_path: Path) -> None:
+    for relative_path in [
+        'a.txt',
+        'dir/b.txt',
+        'dir/sub/c.txt',
+        'other/d.txt',
+        '__pycache__/e.pyc',
+        'dir/__pycache__/f.pyc',
+    ]:
+        tmp_path.joinpath(relative_path).parent.mkdir(parents=True, exist_ok=True)
+        tmp_path.joinpath(relative_path).write_text(relative_path)
+
+
+class TestWorkingTreeWalker:
+    def test_walk(self, tmp_path):
+        make_tree(tmp_path)
+        visited = []
+
+        def should_ignore(relative_path, name, is_dir):
+            visited.append(relative_path)
+
+            return name == '__pycache__'
+
+        walker = WorkingTreeWalker(str(tmp_path), should_ignore, 1)
+        files = dict(walker.walk())
+
+        assert sorted(files) == ['a.txt', 'dir/b.txt', 'dir/sub/c.txt', 'other/d.txt']
+        assert files['dir/b.txt'].st_size == len('dir/b.txt')
+        assert '__pycache__/e.pyc' not in visited
+
+        assert sorted(dict(walker.walk('dir'))) == ['dir/b.txt', 'dir/sub/c.txt']
+        assert list(walker.walk('missing')) == []
+
+    def test_walk_parallel(self, tmp_path, monkeypatch):
+        make_tree(tmp_path)
+        monkeypatch.setattr(model.walker, 'PARALLEL_THRESHOLD', 1)
+
+        walker = WorkingTreeWalker(
+            str(tmp_path),
+            lambda relative_path, name, is_dir: name == '__pycache__',
+            4,
+        )
+
+        assert sorted(dict(walker.walk())) == ['a.txt', 'dir/b.txt', 'dir/sub/c.txt', 'other/d.txt']
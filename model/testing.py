@@ -0,0 +1,62 @@
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Union
+
+from model.objects import Blob, Commit, TreeNode, TreeNodeEntry
+from model.repo import Repo
+
+# shared by the tests that need objects and history in a repository
+
+
+def write_files(repo: Repo, files: Dict[str, bytes]) -> TreeNode:
+    tree = TreeNode({})
+
+    for path, content in files.items():
+        blob = Blob(content)
+        repo.write_object(blob)
+        tree.add(
+            TreeNodeEntry(Path(path), blob.get_oid(), 'blob', False, None),
+            Path(path).parts,
+        )
+
+    repo.write_tree(tree)
+
+    return tree
+
+
+def write_commit(
+    repo: Repo,
+    tree_oid: str,
+    message: str = 'test commit',
+    parent: Union[str, None] = None,
+) -> Commit:
+    commit = Commit(
+        'test_name',
+        'test_email',
+        message,
+        tree_oid,
+        datetime(2021, 8, 28, 16, 50, 13),
+        repo.read_head() if parent is None else parent,
+    )
+
+    repo.write_object(commit)
+
+    return commit
+
+
+def commit_files(
+    repo: Repo,
+    files: Dict[str, bytes],
+    message: str = 'test commit',
+    should_update_head: bool = True,
+    should_write_filter: bool = False,
+) -> str:
+    commit = write_commit(repo, write_files(repo, files).get_oid(), message)
+
+    if should_write_filter:
+        repo.write_changed_paths(commit)
+
+    if should_update_head:
+        repo.update_head(commit.get_oid())
+
+    return commit.get_oid()
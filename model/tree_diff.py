@@ -0,0 +1,140 @@
+from __future__ import annotations
+
+from pathlib import Path
+from typing import TYPE_CHECKING, Callable, Dict, Iterator, Tuple, Union
+
+from model.objects import TreeNodeEntry
+
+if TYPE_CHECKING:
+    from model.repo import Repo
+
+# relative path, is_tree -> whether the entry should be looked at
+PathFilter = Callable[[str, bool], bool]
+
+
+class TreeChange:
+    def __init__(
+        self,
+        path: str,
+        old_entry: Union[TreeNodeEntry, None],
+        new_entry: Union[TreeNodeEntry, None],
+    ):
+        self.path = path
+        self.old_entry = old_entry
+        self.new_entry = new_entry
+
+    @property
+    def old_oid(self) -> str:
+        return '' if self.old_entry is None else self.old_entry.oid
+
+    @property
+    def new_oid(self) -> str:
+        return '' if self.new_entry is None else self.new_entry.oid
+
+    @property
+    def status_letter(self) -> str:
+        return self.status[0].upper()
+
+    @property
+    def status(self) -> str:
+        if self.old_entry is None:
+            return 'added'
+
+        if self.new_entry is None:
+            return 'deleted'
+
+        return 'modified'
+
+    def __eq__(self, other):
+        if not isinstance(other, TreeChange):
+            return False
+
+        return \
+            self.path == other.path and \
+            self.old_oid == other.old_oid and \
+            self.new_oid == other.new_oid
+
+    def __repr__(self) -> str:
+        return f'TreeChange({self.status} {self.path} {self.old_oid} {self.new_oid})'
+
+
+def read_tree_entries(repo: Repo, tree_oid: str) -> Dict[str, TreeNodeEntry]:
+    tree_node = repo.read_tree(tree_oid, [], Path(''), False)
+
+    if tree_node is None:
+        return {}
+
+    return tree_node.entries
+
+
+def merge_entries(
+    old_entries: Dict[str, TreeNodeEntry],
+    new_entries: Dict[str, TreeNodeEntry],
+) -> Iterator[Tuple[str, Union[TreeNodeEntry, None], Union[TreeNodeEntry, None]]]:
+    """Walks the sorted entries of two trees in lockstep."""
+    old_names = sorted(old_entries)
+    new_names = sorted(new_entries)
+    old_ptr = 0
+    new_ptr = 0
+
+    while old_ptr < len(old_names) or new_ptr < len(new_names):
+        old_name = old_names[old_ptr] if old_ptr < len(old_names) else None
+        new_name = new_names[new_ptr] if new_ptr < len(new_names) else None
+
+        if new_name is None or (old_name is not None and old_name < new_name):
+            assert old_name is not None
+
+            yield old_name, old_entries[old_name], None
+            old_ptr += 1
+        elif old_name is None or new_name < old_name:
+            yield new_name, None, new_entries[new_name]
+            new_ptr += 1
+        else:
+            yield old_name, old_entries[old_name], new_entries[new_name]
+            old_ptr += 1
+            new_ptr += 1
+
+
+def diff_trees(
+    repo: Repo,
+    old_tree_oid: str,
+    new_tree_oid: str,
+    current_path: str = '',
+    should_include: Union[PathFilter, None] = None,
+) -> Iterator[TreeChange]:
+    """Yields blob level changes between two trees.
+
+    Subtrees with identical oids are skipped without being read, so the
+    cost is proportional to the number of trees on changed paths. Entries
+    rejected by should_include are skipped without being read either.
+    """
+    if old_tree_oid == new_tree_oid:
+        return
+
+    old_entries = read_tree_entries(repo, old_tree_oid)
+    new_entries = read_tree_entries(repo, new_tree_oid)
+
+    for name, old_entry, new_entry in merge_entries(old_entries, new_entries):
+        entry_path = f'{current_path}/{name}' if current_path else name
+
+        if old_entry is not None and new_entry is not None \
+           and old_entry.oid == new_entry.oid and old_entry.mode == new_entry.mode:
+            continue
+
+        old_tree_oid = old_entry.oid if old_entry and old_entry.type == 'tree' else ''
+        new_tree_oid = new_entry.oid if new_entry and new_entry.type == 'tree' else ''
+        old_blob = old_entry if old_entry and old_entry.type == 'blob' else None
+        new_blob = new_entry if new_entry and new_entry.type == 'blob' else None
+
+        if should_include is not None:
+            if not should_include(entry_path, False):
+                old_blob = new_blob = None
+
+            if not should_include(entry_path, True):
+                old_tree_oid = new_tree_oid = ''
+
+        if old_blob is not None or new_blob is not None:
+            yield TreeChange(entry_path, old_blob, new_blob)
+
+        if old_tree_oid or new_tree_oid:
+            yield from diff_trees(repo, old_tree_oid, new_tree_oid, entry_path, should_include)
@@ -0,0 +1,98 @@
+from __future__ import annotations
+
+import os
+
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Deque, Iterator, List, Tuple
+
+# relative path, name, is_dir -> whether the entry and everything below
+# it should be skipped
+IgnorePredicate = Callable[[str, str, bool], bool]
+
+# directories listed serially before fanning out to the thread pool, small
+# trees never pay for starting the threads
+PARALLEL_THRESHOLD = 64
+
+ListedDirectory = Tuple[List[Tuple[str, os.stat_result]], List[str]]
+
+
+class WorkingTreeWalker:
+    """Streams (relative path, stat) of every file below a root directory.
+
+    Built on os.scandir: ignored directories are pruned before descending,
+    stat results come from the DirEntry, and on large trees directory
+    listings are spread over a thread pool (scandir and stat release the
+    GIL while they wait on the file system).
+    """
+
+    def __init__(
+        self,
+        root_path: str,
+        should_ignore: IgnorePredicate,
+        max_workers: int = 0,
+    ):
+        self.root_path = root_path
+        self.should_ignore = should_ignore
+        self.max_workers = max_workers if max_workers > 0 else min(8, os.cpu_count() or 1)
+
+    def list_directory(self, relative_dir: str) -> ListedDirectory:
+        files: List[Tuple[str, os.stat_result]] = []
+        directories: List[str] = []
+        full_dir = os.path.join(self.root_path, relative_dir)
+
+        try:
+            dir_entries = os.scandir(full_dir)
+        except (FileNotFoundError, NotADirectoryError):
+            return files, directories
+
+        with dir_entries:
+            for dir_entry in dir_entries:
+                relative_path = f'{relative_dir}/{dir_entry.name}' if relative_dir else dir_entry.name
+
+                try:
+                    is_dir = dir_entry.is_dir(follow_symlinks=False)
+
+                    if self.should_ignore(relative_path, dir_entry.name, is_dir):
+                        continue
+
+                    if is_dir:
+                        directories.append(relative_path)
+                    elif dir_entry.is_file(follow_symlinks=False):
+                        files.append((relative_path, dir_entry.stat(follow_symlinks=False)))
+                except FileNotFoundError:
+                    # removed while we were looking at it
+                    continue
+
+        return files, directories
+
+    def walk(self, relative_dir: str = '') -> Iterator[Tuple[str, os.stat_result]]:
+        pending_dirs: Deque[str] = deque([relative_dir])
+        listed_dirs = 0
+
+        while pending_dirs:
+            if listed_dirs >= PARALLEL_THRESHOLD and self.max_workers > 1:
+                yield from self.walk_parallel(pending_dirs)
+
+                return
+
+            files, directories = self.list_directory(pending_dirs.popleft())
+            listed_dirs += 1
+            pending_dirs.extend(directories)
+
+            yield from files
+
+    def walk_parallel(self, pending_dirs: Deque[str]) -> Iterator[Tuple[str, os.stat_result]]:
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            futures: Deque[Future[ListedDirectory]] = deque(
+                executor.submit(self.list_directory, pending_dir)
+                for pending_dir in pending_dirs
+            )
+
+            while futures:
+                files, directories = futures.popleft().result()
+
+                for directory in directories:
+                    futures.append(executor.submit(self.list_directory, directory))
+
+                yield from files